@@ -19,6 +19,26 @@ const nextConfig: NextConfig = {
           },
         ],
       },
+      {
+        // Bildrutor med innehållshash i filnamnet (se scripts/image_manifest.py) ändras aldrig
+        source: '/data/:path*/:file([^/]+\\.[0-9a-f]{12}\\.png)',
+        headers: [
+          {
+            key: 'Cache-Control',
+            value: 'public, max-age=31536000, immutable',
+          },
+        ],
+      },
+      {
+        // metadata.json pekar ut aktuella bildrutor och ska alltid valideras
+        source: '/data/:path*/metadata.json',
+        headers: [
+          {
+            key: 'Cache-Control',
+            value: 'public, max-age=0, must-revalidate',
+          },
+        ],
+      },
     ];
   },
 };
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Adaptiv quadtree-interpolation för lågminnesläget.
+
+Öresund och Bälten behöver fina pixlar, men öppet vatten i Kattegatt och
+Östersjön ser likadant ut med en bråkdel av upplösningen. Bboxen delas därför
+i kvadratiska block (max_block pixlar) som delas rekursivt i fyra så länge
+blocket innehåller kustlinje (blandat vatten/land) eller värdena varierar mer
+än toleransen. Interpolationen utvärderas bara i bladens hörn och mittpunkt;
+bladens inre pixlar fylls bilinjärt i den slutliga rastern. Block som bara
+innehåller land utvärderas inte alls.
+"""
+
+import numpy as np
+
+from low_memory_grid import create_grid_interpolator
+from lattice_interpolation import lattice_supports
+
+# Största bladstorlek i pixlar (ett tvåpotensvärde)
+DEFAULT_MAX_BLOCK = 32
+
+# Tillåten avvikelse i ett blad som andel av färgskalans spann
+# (ungefär en halv färgnivå i en 8-bitars färgskala)
+DEFAULT_TOLERANCE = 0.002
+
+# Max antal pixlar som fylls bilinjärt per omgång (begränsar temporärt minne)
+_FILL_BATCH_PIXELS = 1 << 20
+
+def _block_counts(integral, r0, c0, r1, c1):
+    """Antal vattenpixlar i blocken [r0..r1] x [c0..c1] (inklusive) via summerad-area-tabell"""
+    return integral[r1 + 1, c1 + 1] - integral[r0, c1 + 1] - integral[r1 + 1, c0] + integral[r0, c0]
+
+def _create_node_evaluator(evaluate, lon_grid, lat_grid, grid_values):
+    """
+    Utvärdera interpolationen i enskilda pixlar, varje pixel högst en gång.
+    Returnerar (values_at, state) där state håller utvärderingsmasken och räknarna.
+    """
+    state = {
+        'evaluated': np.zeros(grid_values.shape, dtype=bool),
+        'evaluated_count': 0,
+        'filled_count': 0,
+    }
+
+    def values_at(rows, cols):
+        """Värden i pixlarna (rows, cols); outvärderade pixlar interpoleras först"""
+        missing = ~state['evaluated'][rows, cols]
+        if missing.any():
+            flat = np.unique(np.ravel_multi_index((rows[missing], cols[missing]), grid_values.shape))
+            new_rows, new_cols = np.unravel_index(flat, grid_values.shape)
+            xi = np.column_stack([lon_grid[new_cols], lat_grid[new_rows]])
+            out = np.empty(flat.size, dtype=np.float64)
+            state['filled_count'] += evaluate(xi, out)
+            grid_values[new_rows, new_cols] = out
+            state['evaluated'][new_rows, new_cols] = True
+            state['evaluated_count'] += flat.size
+        return grid_values[rows, cols]
+
+    return values_at, state
+
+def _fill_bilinear(grid_values, evaluated, corner_values, r0, c0, r1, c1, size):
+    """Fyll bladens pixlar bilinjärt från hörnvärdena (utvärderade pixlar behålls)"""
+    span = np.arange(size + 1)
+    batch = max(1, _FILL_BATCH_PIXELS // ((size + 1) ** 2))
+    v00, v01, v10, v11 = corner_values
+
+    for start in range(0, r0.size, batch):
+        part = slice(start, start + batch)
+        rows = np.minimum(r0[part, None] + span[None, :], r1[part, None])
+        cols = np.minimum(c0[part, None] + span[None, :], c1[part, None])
+        ty = ((rows - r0[part, None]) / np.maximum(r1 - r0, 1)[part, None])[:, :, None]
+        tx = ((cols - c0[part, None]) / np.maximum(c1 - c0, 1)[part, None])[:, None, :]
+
+        top = v00[part, None, None] * (1 - tx) + v01[part, None, None] * tx
+        bottom = v10[part, None, None] * (1 - tx) + v11[part, None, None] * tx
+        block_values = top * (1 - ty) + bottom * ty
+
+        row_index = np.broadcast_to(rows[:, :, None], block_values.shape)
+        col_index = np.broadcast_to(cols[:, None, :], block_values.shape)
+        keep = ~evaluated[row_index, col_index]
+        grid_values[row_index[keep], col_index[keep]] = block_values[keep]
+
+def compute_grid_adaptive(lons, lats, values, water_mask_grid, bbox, parameter, tolerance,
+                          max_block=DEFAULT_MAX_BLOCK, method='cubic', fill_stats=None, lattice=None):
+    """
+    Interpolera till en maskad float32-grid med adaptiv quadtree.
+    tolerance anges i parameterns enhet (största tillåtna avvikelse inom ett blad).
+    fill_stats (dict) får 'filled' = uppskattat antal vattenpixlar som fylldes med nearest
+    (andelen bland de utvärderade noderna, skalad till alla vattenpixlar).
+    Med lattice utvärderas noderna på prognosens regelbundna gitter (se lattice_interpolation).
+    Returnerar (grid, antal utvärderade pixlar).
+    """
+    lon_min, lon_max, lat_min, lat_max = bbox
+    grid_resolution = water_mask_grid.shape[0]
+    lon_grid = np.linspace(lon_min, lon_max, grid_resolution)
+    lat_grid = np.linspace(lat_min, lat_max, grid_resolution)
+    last = grid_resolution - 1
+
+    evaluate, point_count = create_grid_interpolator(lons, lats, values, bbox, method, lattice=lattice)
+    source = 'gitter' if lattice_supports(lattice, method) else 'spridda punkter'
+
+    print(f"🔄 Interpolerar {point_count} punkter till {grid_resolution}x{grid_resolution} grid "
+          f"(adaptiv quadtree, {method}, {source}, block {max_block}→1 px)...")
+
+    grid_values = np.full((grid_resolution, grid_resolution), np.nan, dtype=np.float32)
+    values_at, nodes = _create_node_evaluator(evaluate, lon_grid, lat_grid, grid_values)
+
+    integral = np.zeros((grid_resolution + 1, grid_resolution + 1), dtype=np.int32)
+    np.cumsum(np.cumsum(water_mask_grid, axis=0), axis=1, out=integral[1:, 1:])
+
+    # Rotblock över hela rastern; blocken delar kanter så att bladen möts utan glapp
+    starts = np.arange(0, last, max_block)
+    r0, c0 = [a.ravel() for a in np.meshgrid(starts, starts, indexing='ij')]
+    r1 = np.minimum(r0 + max_block, last)
+    c1 = np.minimum(c0 + max_block, last)
+    size = max_block
+
+    while r0.size:
+        water = _block_counts(integral, r0, c0, r1, c1)
+        area = (r1 - r0 + 1) * (c1 - c0 + 1)
+
+        # Bara land: inget att utvärdera
+        has_water = water > 0
+        r0, c0, r1, c1, water, area = (a[has_water] for a in (r0, c0, r1, c1, water, area))
+        if not r0.size:
+            break
+
+        if size <= 1:
+            # Minsta nivån: varje pixel i blocken utvärderas direkt
+            offsets = np.arange(2)
+            rows = np.minimum(r0[:, None, None] + offsets[None, :, None], r1[:, None, None])
+            cols = np.minimum(c0[:, None, None] + offsets[None, None, :], c1[:, None, None])
+            rows, cols = np.broadcast_arrays(rows, cols)
+            values_at(rows.ravel(), cols.ravel())
+            break
+
+        corner_values = [
+            values_at(r0, c0), values_at(r0, c1),
+            values_at(r1, c0), values_at(r1, c1),
+        ]
+        center_values = values_at((r0 + r1) // 2, (c0 + c1) // 2)
+
+        stacked = np.stack(corner_values)
+        value_range = stacked.max(axis=0) - stacked.min(axis=0)
+        center_error = np.abs(center_values - stacked.mean(axis=0))
+
+        # Kustlinje (blandat vatten/land) eller för stor variation → dela blocket
+        smooth = (water == area) & (value_range <= tolerance) & (center_error <= tolerance)
+
+        _fill_bilinear(
+            grid_values, nodes['evaluated'], [v[smooth] for v in corner_values],
+            r0[smooth], c0[smooth], r1[smooth], c1[smooth], size
+        )
+
+        # Barnblocken för de block som delas (klämda mot förälderns kant)
+        split = ~smooth
+        half = size // 2
+        r0, c0, r1, c1 = r0[split], c0[split], r1[split], c1[split]
+        child_r0 = np.concatenate([r0, r0, r0 + half, r0 + half])
+        child_c0 = np.concatenate([c0, c0 + half, c0, c0 + half])
+        child_r1 = np.minimum(child_r0 + half, np.tile(r1, 4))
+        child_c1 = np.minimum(child_c0 + half, np.tile(c1, 4))
+        valid = (child_r0 < child_r1) & (child_c0 < child_c1)
+        r0, c0, r1, c1 = child_r0[valid], child_c0[valid], child_r1[valid], child_c1[valid]
+        size = half
+
+    if parameter in ['current', 'salinity']:
+        np.maximum(grid_values, 0, out=grid_values)
+    grid_values[~water_mask_grid] = np.nan
+
+    water_pixels = int(np.count_nonzero(water_mask_grid))
+    evaluated_count = nodes['evaluated_count']
+    print(f"   🌳 Utvärderade {evaluated_count} pixlar av {water_pixels} vattenpixlar "
+          f"({100*evaluated_count/max(1, water_pixels):.1f}%, {grid_resolution*grid_resolution} totalt)")
+    print(f"   📊 {nodes['filled_count']} pixlar fylldes med nearest neighbor")
+    if fill_stats is not None:
+        fill_stats['filled'] = int(round(water_pixels * nodes['filled_count'] / max(1, evaluated_count)))
+    return grid_values, evaluated_count
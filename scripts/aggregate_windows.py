@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Aggregerade produkter över prognosfönster ("max ström närmaste 24h",
+"medeltemperatur i morgon") som egna bildlager.
+
+Två källor:
+- points: reducera (punkter x tidssteg)-matrisen över fönstret och interpolera
+  resultatet en gång per statistik (snabbt, approximativt)
+- grids: reducera de interpolerade griddarna pixel för pixel (exakt mot timbilderna).
+  Reduktionen strömmas radblock för radblock: en interpolator per tidssteg byggs
+  en gång och bara fönstrets värden för aktuellt radblock hålls i minnet.
+"""
+
+import re
+import argparse
+import numpy as np
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from forecast_arrays import load_area_parameters, load_forecast_arrays, parameter_values
+from interpolation_backends import INTERPOLATION_BACKENDS, DEFAULT_METHOD
+from low_memory_grid import (
+    plan_chunk_rows, report_memory, create_grid_interpolator, compute_grid_low_memory,
+    _row_block_coordinates, colorize_grid_rgba, save_rgba_png
+)
+from water_mask import (
+    load_clipped_water_polygons, points_in_water, load_water_coverage, water_mask_from_coverage,
+    DEFAULT_BBOX, DEFAULT_MASTER_RESOLUTION, DEFAULT_CACHE_DIR
+)
+from generate_marine_parameter_images import get_parameter_config, create_colormap
+from mercator_remap import PROJECTIONS, projection_remap, remap_rows
+from run_journal import write_json_atomic
+
+# Kalenderdagar räknas i svensk tid
+LOCAL_TIMEZONE = ZoneInfo('Europe/Stockholm')
+
+DEFAULT_WINDOWS = 'next24h=0:24,next48h=0:48,tomorrow=day1'
+DEFAULT_STATISTICS = 'min,max,mean,p90'
+
+# Minst så många giltiga punkter för att ett tidssteg ska ingå
+MIN_POINTS_PER_FRAME = 3
+
+def parse_timestamp(timestamp):
+    """ISO-tidsstämpel (med Z) till datetime i UTC"""
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+def parse_windows(spec, timestamps):
+    """
+    Tolka fönster som 'namn=START:SLUT' (timmar från körningens första tidssteg, SLUT exklusiv)
+    eller 'namn=dayN' (lokal kalenderdag N, 0 = första tidsstegets dag).
+    Returnerar lista med {name, indices, start, end}.
+    """
+    times = [parse_timestamp(t) for t in timestamps]
+    run_start = times[0]
+    start_day = run_start.astimezone(LOCAL_TIMEZONE).date()
+    windows = []
+
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, definition = item.partition('=')
+        day_match = re.fullmatch(r'day(\d+)', definition)
+        hours_match = re.fullmatch(r'(\d+):(\d+)', definition)
+
+        if day_match:
+            day = start_day + timedelta(days=int(day_match.group(1)))
+            indices = [i for i, t in enumerate(times) if t.astimezone(LOCAL_TIMEZONE).date() == day]
+        elif hours_match:
+            start_hour, end_hour = int(hours_match.group(1)), int(hours_match.group(2))
+            indices = [
+                i for i, t in enumerate(times)
+                if start_hour <= (t - run_start).total_seconds() / 3600 < end_hour
+            ]
+        else:
+            raise ValueError(f"Okänt fönster: {item} (använd namn=START:SLUT eller namn=dayN)")
+
+        if not indices:
+            print(f"⚠️ Fönster {name} saknar tidssteg i körningen, hoppar över")
+            continue
+        windows.append({
+            'name': name,
+            'indices': indices,
+            'start': timestamps[indices[0]],
+            'end': timestamps[indices[-1]],
+        })
+    return windows
+
+def parse_statistics(spec):
+    """Tolka statistik: min, max, mean och percentiler som p90"""
+    statistics = []
+    for item in spec.split(','):
+        item = item.strip()
+        if item in ('min', 'max', 'mean') or re.fullmatch(r'p\d{1,2}(\.\d+)?', item):
+            statistics.append(item)
+        elif item:
+            raise ValueError(f"Okänd statistik: {item} (min, max, mean eller pNN)")
+    return statistics
+
+def reduce_stack(stack, statistics, axis=0):
+    """Beräkna statistik längs tidsaxeln (NaN ignoreras)"""
+    results = {}
+    percentiles = [s for s in statistics if s.startswith('p')]
+    if 'min' in statistics:
+        results['min'] = np.nanmin(stack, axis=axis)
+    if 'max' in statistics:
+        results['max'] = np.nanmax(stack, axis=axis)
+    if 'mean' in statistics:
+        results['mean'] = np.nanmean(stack, axis=axis, dtype=np.float64)
+    if percentiles:
+        values = np.nanpercentile(stack, [float(p[1:]) for p in percentiles], axis=axis)
+        for statistic, value in zip(percentiles, values):
+            results[statistic] = value
+    return results
+
+def aggregate_from_points(lons, lats, matrix, indices, statistics, water_mask_grid, bbox, parameter, chunk_rows, method):
+    """Reducera punktmatrisen över fönstret och interpolera varje statistik en gång"""
+    window_values = matrix[:, indices]
+    has_data = np.any(np.isfinite(window_values), axis=1)
+    with np.errstate(all='ignore'):
+        reduced = reduce_stack(window_values[has_data], statistics, axis=1)
+
+    grids = {}
+    for statistic, values in reduced.items():
+        grids[statistic] = compute_grid_low_memory(
+            lons[has_data], lats[has_data], np.asarray(values, dtype=np.float64),
+            water_mask_grid, bbox, parameter, chunk_rows, method
+        )
+    return grids
+
+def aggregate_from_grids(lons, lats, matrix, indices, statistics, water_mask_grid, bbox, parameter, chunk_rows, method):
+    """
+    Strömmande reduktion över interpolerade griddar: för varje radblock utvärderas
+    alla tidsstegens interpolatorer och reduceras direkt, så att bara ett radblock
+    per tidssteg finns i minnet samtidigt.
+    """
+    lon_min, lon_max, lat_min, lat_max = bbox
+    grid_resolution = water_mask_grid.shape[0]
+    lon_grid = np.linspace(lon_min, lon_max, grid_resolution)
+    lat_grid = np.linspace(lat_min, lat_max, grid_resolution)
+
+    evaluators = []
+    for t in indices:
+        valid = np.isfinite(matrix[:, t])
+        if np.count_nonzero(valid) >= MIN_POINTS_PER_FRAME:
+            evaluate, _ = create_grid_interpolator(lons[valid], lats[valid], matrix[valid, t], bbox, method)
+            evaluators.append(evaluate)
+
+    print(f"🔄 Strömmande reduktion över {len(evaluators)} tidssteg, "
+          f"{grid_resolution}x{grid_resolution} grid, {chunk_rows} rader per block...")
+
+    grids = {statistic: np.full((grid_resolution, grid_resolution), np.nan, dtype=np.float32)
+             for statistic in statistics}
+    if not evaluators:
+        return grids
+
+    clamp_negative = parameter in ['current', 'salinity']
+    for row_start in range(0, grid_resolution, chunk_rows):
+        row_end = min(row_start + chunk_rows, grid_resolution)
+        block_mask = water_mask_grid[row_start:row_end].reshape(-1)
+        if not np.any(block_mask):
+            continue
+
+        # Bara vattenpixlar behöver utvärderas
+        xi = _row_block_coordinates(lon_grid, lat_grid, row_start, row_end)[block_mask]
+        stack = np.empty((len(evaluators), xi.shape[0]), dtype=np.float32)
+        for k, evaluate in enumerate(evaluators):
+            evaluate(xi, stack[k])
+        if clamp_negative:
+            np.maximum(stack, 0, out=stack)
+
+        for statistic, values in reduce_stack(stack, statistics).items():
+            grids[statistic][row_start:row_end].reshape(-1)[block_mask] = values
+        del xi, stack
+
+    return grids
+
+def generate_aggregates_for_parameter(parameter, arrays, used_points, water_mask_grid, water_coverage, bbox, windows, statistics, args):
+    """Beräkna och rendera alla fönster och statistikmått för en parameter"""
+    config = get_parameter_config(parameter)
+    cmap, vmin, vmax = create_colormap(parameter)
+    output_dir = Path(args.output_base_dir) / config['output_dir'].replace('-images', '-aggregates')
+    output_dir.mkdir(parents=True, exist_ok=True)
+    print(f"\n🚀 Aggregerar {config['name']} ({args.source}) till {output_dir}")
+
+    lons = arrays['lons'][used_points]
+    lats = arrays['lats'][used_points]
+    matrix = parameter_values(arrays, parameter)[used_points]
+
+    grid_resolution = water_mask_grid.shape[0]
+    if args.source == 'grids':
+        # Radblocket håller en float32-rad per tidssteg plus percentilernas sorteringskopia
+        max_frames = max(len(window['indices']) for window in windows)
+        chunk_rows = plan_chunk_rows(
+            grid_resolution, args.memory_budget_mb,
+            working_bytes_per_pixel=(8 * max_frames + 32),
+            resident_bytes_per_pixel=(4 * len(statistics) + 8)
+        )
+    else:
+        chunk_rows = plan_chunk_rows(grid_resolution, args.memory_budget_mb)
+
+    aggregate = aggregate_from_grids if args.source == 'grids' else aggregate_from_points
+    window_metadata = []
+
+    # Web Mercator som timbilderna: täckningsrastern flyttas om en gång, varje grid efter maskningen
+    row_remap = projection_remap(args.projection, bbox, grid_resolution)
+    if row_remap is not None:
+        water_coverage = remap_rows(water_coverage, row_remap)
+
+    for window in windows:
+        print(f"\n📊 {config['name'].title()} {window['name']}: {len(window['indices'])} tidssteg "
+              f"({window['start']} – {window['end']})")
+        grids = aggregate(
+            lons, lats, matrix, window['indices'], statistics,
+            water_mask_grid, bbox, parameter, chunk_rows, args.method
+        )
+
+        images = {}
+        for statistic, grid_values in grids.items():
+            grid_values[~water_mask_grid] = np.nan
+            if row_remap is not None:
+                grid_values = remap_rows(grid_values, row_remap)
+            filename = f"{config['name_en']}_{window['name']}_{statistic}.png"
+            rgba = colorize_grid_rgba(grid_values, cmap, vmin, vmax, chunk_rows, coverage=water_coverage)
+            save_rgba_png(rgba, output_dir / filename)
+            del rgba
+
+            if np.any(np.isfinite(grid_values)):
+                print(f"   ✅ {statistic}: {np.nanmin(grid_values):.3f}–{np.nanmax(grid_values):.3f} "
+                      f"{config['unit']} → {filename}")
+            images[statistic] = filename
+        del grids
+
+        window_metadata.append({
+            'name': window['name'],
+            'start': window['start'],
+            'end': window['end'],
+            'frames': len(window['indices']),
+            'images': images,
+        })
+
+    report_memory(args.memory_budget_mb)
+
+    metadata = {
+        "parameter": parameter,
+        "parameter_name": config['name'],
+        "unit": config['unit'],
+        "bbox": bbox,
+        "source": args.source,
+        "statistics": statistics,
+        "windows": window_metadata,
+        "colormap": config['colormap'],
+        "resolution": grid_resolution,
+        "interpolation_method": args.method,
+        "projection": PROJECTIONS[args.projection],
+        "generated_at": datetime.now().isoformat()
+    }
+    write_json_atomic(metadata, output_dir / "metadata.json", indent=2, ensure_ascii=False)
+    print(f"📋 Metadata sparad i: {output_dir / 'metadata.json'}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Aggregerade bildlager (min/max/medel/percentiler) över prognosfönster')
+    parser.add_argument('--parameter', choices=['current', 'temperature', 'salinity', 'all'], default='all',
+                       help='Parameter att aggregera (default: all)')
+    parser.add_argument('--input', default='public/data/area-parameters-extended.json.gz',
+                       help='Sökväg till komprimerad area-parameters fil')
+    parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Sökväg till vattenmask GeoJSON')
+    parser.add_argument('--output-base-dir', default='public/data',
+                       help='Bas-directory för output (parameter-specifika *-aggregates mappar skapas automatiskt)')
+    parser.add_argument('--windows', default=DEFAULT_WINDOWS,
+                       help=f'Fönster som namn=START:SLUT (timmar) eller namn=dayN (default: {DEFAULT_WINDOWS})')
+    parser.add_argument('--statistics', default=DEFAULT_STATISTICS,
+                       help=f'Statistik: min, max, mean, pNN (default: {DEFAULT_STATISTICS})')
+    parser.add_argument('--source', choices=['points', 'grids'], default='grids',
+                       help='Reducera punktdata före interpolation eller de interpolerade griddarna (default: grids)')
+    parser.add_argument('--resolution', type=int, default=1200,
+                       help='Grid-upplösning (default: 1200x1200)')
+    parser.add_argument('--method', choices=list(INTERPOLATION_BACKENDS), default=DEFAULT_METHOD,
+                       help=f'Interpolationsmetod (default: {DEFAULT_METHOD})')
+    parser.add_argument('--memory-budget-mb', type=float, default=1024,
+                       help='Minnesbudget för processen, styr radblockens storlek; körningen avbryts om topp-RSS överskrider den (default: 1024 MB)')
+    parser.add_argument('--projection', choices=list(PROJECTIONS), default='mercator',
+                       help='mercator: rader likformiga i Web Mercator (exakt kartpassning), latlon: likformiga i latitud (default: mercator)')
+    parser.add_argument('--mask-master-resolution', type=int, default=DEFAULT_MASTER_RESOLUTION,
+                       help=f'Upplösning för master-rastern (default: {DEFAULT_MASTER_RESOLUTION})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+
+    args = parser.parse_args(argv)
+    parameters = ['current', 'temperature', 'salinity'] if args.parameter == 'all' else [args.parameter]
+    bbox = DEFAULT_BBOX
+
+    print("📈 AGGREGERADE PROGNOSFÖNSTER")
+    print("=" * 50)
+
+    geometry_resolution = max(args.resolution, args.mask_master_resolution)
+    water_polygons = load_clipped_water_polygons(args.water_mask, bbox, geometry_resolution, args.cache_dir)
+    water_coverage = load_water_coverage(
+        water_polygons, bbox, args.resolution, args.water_mask,
+        args.mask_master_resolution, args.cache_dir
+    )
+    water_mask_grid = water_mask_from_coverage(water_coverage)
+
+    area_data = load_area_parameters(args.input)
+    arrays = load_forecast_arrays(area_data)
+    del area_data
+
+    used_points = points_in_water(arrays['lons'], arrays['lats'], water_polygons)
+    del water_polygons
+
+    try:
+        windows = parse_windows(args.windows, arrays['timestamps'])
+        statistics = parse_statistics(args.statistics)
+    except ValueError as e:
+        parser.error(str(e))
+    if not windows:
+        parser.error("Inga fönster med tidssteg i körningen")
+
+    for parameter in parameters:
+        generate_aggregates_for_parameter(
+            parameter, arrays, used_points, water_mask_grid, water_coverage,
+            bbox, windows, statistics, args
+        )
+
+if __name__ == "__main__":
+    main()
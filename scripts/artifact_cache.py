@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Artefaktcache för bildgenereringens steg.
+
+Nattkörningen går fetch → gzip JSON → mask → interpolation → bilder. Här
+behandlas varje stegs utdata som en artefakt på disk vars nyckel är en hash av
+indatans nycklar och stegets inställningar. Ett steg vars indata och
+inställningar är oförändrade läses från cachen istället för att räknas om, och
+allt nedströms behåller sina nycklar. En ändrad färgskala ger alltså nya
+bildnycklar men samma gridnycklar, så bara kodningssteget körs om.
+
+Stegen (ARTIFACT_STAGES) och deras indata:
+
+    forecast        ← indatafilens innehåll
+    water-points    ← forecast, vattenmaskens innehåll, bbox, geometriupplösning
+    water-coverage  ← vattenmaskens innehåll, bbox, upplösning, master-upplösning
+    grid            ← water-points, water-coverage, parameter, tidssteg, interpolationsinställningar
+    image           ← grid, water-coverage, färgskala
+    stats           ← grid, histogramspann (statistiken till metadata.json)
+
+Klippt vattengeometri och master-raster cachas redan av water_mask och
+interpolationsoperatorer (Laplace-faktoriseringen) i minnet av water_fill;
+de ingår i nycklarna via vattenmaskens innehåll och inställningarna.
+Artefakter skrivs via temp-fil och rename, så parallella arbetsprocesser kan
+dela cachen. Grids och bilder som inte använts på ARTIFACT_MAX_AGE_DAYS dagar rensas.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+# Ingår i alla nycklar; höj när ett stegs beräkning eller filformat ändras
+ARTIFACT_FORMAT_VERSION = 1
+
+# Underkatalog i --cache-dir
+ARTIFACT_DIRNAME = 'artifacts'
+
+# Steg → filändelse för artefakten
+ARTIFACT_STAGES = {
+    'forecast': '.npz',
+    'water-points': '.npy',
+    'water-coverage': '.npy',
+    'grid': '.npy',
+    'image': '.png',
+    'stats': '.json',
+}
+
+# Steg som växer med varje prognoskörning och därför rensas
+PRUNED_STAGES = ('grid', 'image', 'stats')
+
+# Grids och bilder som inte lästs eller skrivits på så här många dagar tas bort
+# (en grid är ~6 MB i 1200x1200, och en ny prognos ger alltid nya nycklar)
+ARTIFACT_MAX_AGE_DAYS = 2
+
+def open_artifact_cache(cache_dir):
+    """Artefaktcache under cache_dir (katalogen skapas vid första skrivningen)"""
+    root = Path(cache_dir) / ARTIFACT_DIRNAME
+    print(f"🗃️ Artefaktcache: {root}")
+    return {
+        'root': root,
+        'stats': {stage: {'hits': 0, 'misses': 0} for stage in ARTIFACT_STAGES},
+    }
+
+def artifact_key(stage, *input_keys, **settings):
+    """Nyckel för en artefakt: hash av steget, indatans nycklar och stegets inställningar"""
+    payload = {'version': ARTIFACT_FORMAT_VERSION, 'stage': stage, 'inputs': list(input_keys), 'settings': settings}
+    encoded = json.dumps(payload, sort_keys=True, default=list).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()
+
+def artifact_path(artifacts, stage, key):
+    """Sökväg till en artefakt (uppdelad på stegkatalog och nyckelprefix)"""
+    return artifacts['root'] / stage / key[:2] / f"{key}{ARTIFACT_STAGES[stage]}"
+
+def _record(artifacts, stage, hit):
+    artifacts['stats'][stage]['hits' if hit else 'misses'] += 1
+
+def _temporary_path(path):
+    # Unikt per process så att arbetsprocesser som räknar samma artefakt inte krockar
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+def _touch(path):
+    """Markera artefakten som använd (styr rensningen)"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def save_array(path, array):
+    with open(path, 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+
+def load_array(path):
+    return np.load(path, allow_pickle=False)
+
+def save_arrays(path, arrays):
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+def load_arrays(path):
+    with np.load(path, allow_pickle=False) as stored:
+        return {name: stored[name] for name in stored.files}
+
+def save_json(path, value):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def cached_artifact(artifacts, stage, key, compute, save=save_array, load=load_array):
+    """
+    Läs artefakten (stage, key) från cachen, eller räkna ut den med compute() och spara den.
+    Utan cache (artifacts None) anropas bara compute().
+    """
+    if artifacts is None:
+        return compute()
+
+    path = artifact_path(artifacts, stage, key)
+    if path.exists():
+        try:
+            value = load(path)
+        except (OSError, ValueError) as e:  # JSONDecodeError är en ValueError
+            print(f"⚠️ Trasig artefakt {path.name} ({e}), räknar om")
+        else:
+            _touch(path)
+            _record(artifacts, stage, True)
+            return value
+
+    value = compute()
+    if value is None:
+        return value
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _temporary_path(path)
+    save(tmp_path, value)
+    os.replace(tmp_path, path)
+    _record(artifacts, stage, False)
+    return value
+
+def restore_artifact_file(artifacts, stage, key, output_path):
+    """Kopiera en cachad fil-artefakt till output_path (via temp-fil). Sant vid träff."""
+    if artifacts is None:
+        return False
+    path = artifact_path(artifacts, stage, key)
+    if not path.exists():
+        return False
+
+    output_path = Path(output_path)
+    tmp_path = _temporary_path(output_path)
+    shutil.copyfile(path, tmp_path)
+    os.replace(tmp_path, output_path)
+    _touch(path)
+    _record(artifacts, stage, True)
+    return True
+
+def store_artifact_file(artifacts, stage, key, source_path):
+    """Spara en färdig utfil som artefakt (hårdlänk om möjligt, annars kopia)"""
+    if artifacts is None:
+        return
+    path = artifact_path(artifacts, stage, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = _temporary_path(path)
+    try:
+        os.link(source_path, tmp_path)
+    except OSError:
+        shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, path)
+    _record(artifacts, stage, False)
+
+def prune_artifacts(artifacts, max_age_days=ARTIFACT_MAX_AGE_DAYS):
+    """Ta bort grids och bilder som inte använts på max_age_days dagar"""
+    if artifacts is None:
+        return
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    freed = 0
+    for stage in PRUNED_STAGES:
+        stage_dir = artifacts['root'] / stage
+        if not stage_dir.exists():
+            continue
+        for path in stage_dir.glob('*/*'):
+            try:
+                info = path.stat()
+                if info.st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+                    freed += info.st_size
+            except OSError:
+                continue
+    if removed:
+        print(f"🗑️ Rensade {removed} gamla artefakter ({freed / 1024 / 1024:.0f} MB)")
+
+def report_artifact_cache(artifacts):
+    """Skriv ut träffar/missar per steg (räknas i den här processen)"""
+    if artifacts is None:
+        return
+    parts = [
+        f"{stage} {counts['hits']}/{counts['hits'] + counts['misses']}"
+        for stage, counts in artifacts['stats'].items()
+        if counts['hits'] or counts['misses']
+    ]
+    if parts:
+        print(f"🗃️ Artefaktcache (träffar/totalt): {', '.join(parts)}")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Korsvalidering och tidsmätning av interpolationsmetoderna.
+
+För varje metod hålls en andel av datapunkterna undan (k-fold), interpolatorn
+byggs på resten och felet mot de undanhållna punkterna mäts - med samma
+nearest-fallback som bildgeneratorerna använder utanför triangulering.
+Dessutom mäts väggtid för en hel grid per upplösning, så att valet mellan
+hastighet och kvalitet görs på mätningar.
+"""
+
+import json
+import time
+import argparse
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+from forecast_arrays import load_area_parameters, load_forecast_arrays, parameter_values
+from interpolation_backends import create_interpolator, evaluate_on_grid, INTERPOLATION_BACKENDS
+from water_mask import load_clipped_water_polygons, points_in_water, DEFAULT_BBOX, DEFAULT_CACHE_DIR
+
+# Drogden Lt - området debug_interpolation.py undersöker
+DROGDEN = (55.5344, 12.7036)
+
+KM_PER_DEGREE = 111.0
+
+def _with_nearest_fallback(interpolator, train_points, train_values, xi):
+    """Utvärdera och fyll NaN med nearest (som i create_interpolated_image)"""
+    predicted = np.asarray(interpolator(xi), dtype=np.float64)
+    missing = ~np.isfinite(predicted)
+    if np.any(missing):
+        nearest = create_interpolator('nearest', train_points, train_values)
+        predicted[missing] = nearest(xi[missing])
+    return predicted, missing
+
+def cross_validate(method, points, values, folds, rng):
+    """k-fold korsvalidering för en metod och ett tidssteg (fel i punkternas ordning)"""
+    order = rng.permutation(len(values))
+    errors = np.full(len(values), np.nan)
+    fallback = np.zeros(len(values), dtype=bool)
+    elapsed = 0.0
+
+    for fold in np.array_split(order, folds):
+        train = np.ones(len(values), dtype=bool)
+        train[fold] = False
+
+        start = time.perf_counter()
+        interpolator = create_interpolator(method, points[train], values[train])
+        predicted, missing = _with_nearest_fallback(interpolator, points[train], values[train], points[fold])
+        elapsed += time.perf_counter() - start
+
+        errors[fold] = predicted - values[fold]
+        fallback[fold] = missing
+
+    return errors, fallback, elapsed
+
+def summarize_errors(errors, fallback):
+    """RMSE, MAE, maxfel och andel fallback"""
+    if errors.size == 0:
+        return {'rmse': None, 'mae': None, 'max_abs': None, 'fallback_share': None, 'n': 0}
+    return {
+        'rmse': float(np.sqrt(np.mean(errors**2))),
+        'mae': float(np.mean(np.abs(errors))),
+        'max_abs': float(np.max(np.abs(errors))),
+        'fallback_share': float(fallback.mean()),
+        'n': int(errors.size),
+    }
+
+def time_grid(method, points, values, bbox, resolution):
+    """Väggtid för att bygga interpolatorn och utvärdera en hel grid"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    lon_grid = np.linspace(lon_min, lon_max, resolution)
+    lat_grid = np.linspace(lat_min, lat_max, resolution)
+
+    start = time.perf_counter()
+    interpolator = create_interpolator(method, points, values)
+    build_seconds = time.perf_counter() - start
+    evaluate_on_grid(interpolator, lon_grid, lat_grid, dtype=np.float32)
+    total_seconds = time.perf_counter() - start
+    return {'build_s': round(build_seconds, 4), 'total_s': round(total_seconds, 4)}
+
+def run_benchmark(arrays, used_points, parameters, methods, timestamp_indices, folds, resolutions, bbox, seed, focus=None):
+    """Kör korsvalidering och tidsmätning för alla kombinationer"""
+    rng = np.random.default_rng(seed)
+    results = {}
+
+    for parameter in parameters:
+        matrix = parameter_values(arrays, parameter)
+        results[parameter] = {}
+
+        for method in methods:
+            all_errors, all_fallback, cv_seconds = [], [], 0.0
+            focus_errors, focus_fallback = [], []
+            timings = {}
+
+            for t in timestamp_indices:
+                valid = used_points & np.isfinite(matrix[:, t])
+                points = np.column_stack([arrays['lons'][valid], arrays['lats'][valid]])
+                values = matrix[valid, t]
+                if len(values) < 10:
+                    continue
+
+                focus_mask = None
+                if focus is not None:
+                    focus_lat, focus_lon, radius_km = focus
+                    distance_km = KM_PER_DEGREE * np.hypot(
+                        points[:, 1] - focus_lat,
+                        (points[:, 0] - focus_lon) * np.cos(np.radians(focus_lat))
+                    )
+                    focus_mask = distance_km <= radius_km
+
+                errors, fallback, elapsed = cross_validate(method, points, values, folds, rng)
+                all_errors.append(errors)
+                all_fallback.append(fallback)
+                cv_seconds += elapsed
+                if focus_mask is not None:
+                    focus_errors.append(errors[focus_mask])
+                    focus_fallback.append(fallback[focus_mask])
+
+                if t == timestamp_indices[0]:
+                    for resolution in resolutions:
+                        timings[str(resolution)] = time_grid(method, points, values, bbox, resolution)
+
+            entry = summarize_errors(
+                np.concatenate(all_errors) if all_errors else np.array([]),
+                np.concatenate(all_fallback) if all_fallback else np.array([], dtype=bool)
+            )
+            entry['cv_seconds'] = round(cv_seconds, 3)
+            entry['grid_timings'] = timings
+            if focus is not None:
+                entry['focus'] = summarize_errors(
+                    np.concatenate(focus_errors) if focus_errors else np.array([]),
+                    np.concatenate(focus_fallback) if focus_fallback else np.array([], dtype=bool)
+                )
+            results[parameter][method] = entry
+
+    return results
+
+def print_results(results, resolutions):
+    """Skriv ut resultattabell per parameter"""
+    for parameter, methods in results.items():
+        print(f"\n📊 {parameter}")
+        header = f"   {'metod':8} {'RMSE':>8} {'MAE':>8} {'max':>8} {'fallback':>9} {'CV-tid':>8}"
+        header += ''.join(f" {str(r) + 'px':>9}" for r in resolutions)
+        print(header)
+        for method, entry in methods.items():
+            if entry['rmse'] is None:
+                print(f"   {method:8} (för lite data)")
+                continue
+            line = (f"   {method:8} {entry['rmse']:8.4f} {entry['mae']:8.4f} {entry['max_abs']:8.4f} "
+                    f"{100*entry['fallback_share']:8.1f}% {entry['cv_seconds']:7.2f}s")
+            line += ''.join(
+                f" {entry['grid_timings'][str(r)]['total_s']:8.2f}s" if str(r) in entry['grid_timings'] else f" {'-':>9}"
+                for r in resolutions
+            )
+            print(line)
+            if entry.get('focus') and entry['focus']['rmse'] is not None:
+                focus = entry['focus']
+                print(f"   {'':8} fokusområde: RMSE {focus['rmse']:.4f}, MAE {focus['mae']:.4f} ({focus['n']} punkter)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Korsvalidering och tidsmätning av interpolationsmetoder')
+    parser.add_argument('--input', default='public/data/area-parameters-extended.json.gz',
+                       help='Sökväg till komprimerad area-parameters fil')
+    parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Vattenmask för att välja samma punkter som generatorerna (hoppas över om den saknas)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--parameter', choices=['current', 'temperature', 'salinity', 'all'], default='all',
+                       help='Parameter att utvärdera (default: all)')
+    parser.add_argument('--methods', default=','.join(INTERPOLATION_BACKENDS),
+                       help='Kommaseparerade metoder (default: alla)')
+    parser.add_argument('--timestamps', type=int, default=3,
+                       help='Antal jämnt fördelade tidssteg att utvärdera (default: 3)')
+    parser.add_argument('--folds', type=int, default=5,
+                       help='Antal folds i korsvalideringen (default: 5)')
+    parser.add_argument('--resolutions', default='300,600,1200',
+                       help='Kommaseparerade grid-upplösningar för tidsmätning (default: 300,600,1200)')
+    parser.add_argument('--focus-radius-km', type=float, default=None,
+                       help='Rapportera även fel inom denna radie från Drogden Lt')
+    parser.add_argument('--seed', type=int, default=0,
+                       help='Slumpfrö för fold-indelning')
+    parser.add_argument('--output', default=None,
+                       help='Spara resultat som JSON')
+
+    args = parser.parse_args(argv)
+
+    methods = [m.strip() for m in args.methods.split(',') if m.strip()]
+    for method in methods:
+        if method not in INTERPOLATION_BACKENDS:
+            parser.error(f"Okänd metod: {method}")
+    resolutions = [int(r) for r in args.resolutions.split(',') if r.strip()]
+    parameters = ['current', 'temperature', 'salinity'] if args.parameter == 'all' else [args.parameter]
+    bbox = DEFAULT_BBOX
+
+    area_data = load_area_parameters(args.input)
+    arrays = load_forecast_arrays(area_data)
+    del area_data
+
+    lons, lats = arrays['lons'], arrays['lats']
+    used_points = (lons >= bbox[0]) & (lons <= bbox[1]) & (lats >= bbox[2]) & (lats <= bbox[3])
+    if Path(args.water_mask).exists():
+        water_polygons = load_clipped_water_polygons(args.water_mask, bbox, cache_dir=args.cache_dir)
+        used_points &= points_in_water(lons, lats, water_polygons)
+
+    n_times = len(arrays['timestamps'])
+    timestamp_indices = sorted(set(np.linspace(0, n_times - 1, min(args.timestamps, n_times)).astype(int).tolist()))
+    focus = (DROGDEN[0], DROGDEN[1], args.focus_radius_km) if args.focus_radius_km else None
+
+    print(f"🧪 {len(methods)} metoder x {len(parameters)} parametrar x {len(timestamp_indices)} tidssteg, "
+          f"{args.folds}-fold korsvalidering")
+    results = run_benchmark(
+        arrays, used_points, parameters, methods, timestamp_indices,
+        args.folds, resolutions, bbox, args.seed, focus
+    )
+    print_results(results, resolutions)
+
+    if args.output:
+        payload = {
+            'generated_at': datetime.now().isoformat(),
+            'timestamps': [arrays['timestamps'][t] for t in timestamp_indices],
+            'folds': args.folds,
+            'resolutions': resolutions,
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultat sparade i {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,125 +1,265 @@
 #!/usr/bin/env python3
+"""
+Täckningsanalys för HELA prognoskörningen.
+Räknar giltiga värden per parameter och tidssteg med array-operationer,
+rapporterar gap mot bbox, punkter som faller bort i vattenmasken och hur stor
+andel av vattenpixlarna som måste fyllas utanför datapunkternas täckning.
+"""
+
 import json
-import gzip
-import matplotlib.pyplot as plt
+import argparse
 import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+from forecast_arrays import load_area_parameters, load_forecast_arrays
+from water_mask import (
+    load_clipped_water_polygons, points_in_water, load_water_coverage,
+    DEFAULT_BBOX, DEFAULT_MASTER_RESOLUTION, DEFAULT_CACHE_DIR
+)
+
+COVERAGE_PARAMETERS = ['current', 'temperature', 'salinity']
+
+KM_PER_DEGREE = 111.0
+
+def validity_matrices(arrays):
+    """Bool-matriser (punkter x tidssteg) för vilka värden som finns per parameter"""
+    return {
+        'current': np.isfinite(arrays['u']) & np.isfinite(arrays['v']),
+        'temperature': np.isfinite(arrays['temperature']),
+        'salinity': np.isfinite(arrays['salinity']),
+    }
+
+def bbox_gaps(lons, lats, bbox):
+    """Avstånd från datagränserna till bbox-kanterna (grader och km)"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    if lons.size == 0:
+        return None
+
+    actual = (float(lons.min()), float(lons.max()), float(lats.min()), float(lats.max()))
+    km_per_lon_degree = KM_PER_DEGREE * np.cos(np.radians((lat_min + lat_max) / 2))
+    gaps = {
+        'left': actual[0] - lon_min,
+        'right': lon_max - actual[1],
+        'bottom': actual[2] - lat_min,
+        'top': lat_max - actual[3],
+    }
+    return {
+        'data_bounds': actual,
+        'gaps_deg': {edge: round(gap, 4) for edge, gap in gaps.items()},
+        'gaps_km': {
+            edge: round(gap * (km_per_lon_degree if edge in ('left', 'right') else KM_PER_DEGREE), 1)
+            for edge, gap in gaps.items()
+        },
+    }
+
+def fallback_shares(valid, lons, lats, water_pixels_xy):
+    """
+    Andel vattenpixlar utanför trianguleringen av giltiga punkter per tidssteg,
+    dvs pixlar som bara kan fyllas via edge points/nearest neighbor.
+    Tidssteg med identiskt giltighetsmönster delar samma beräkning.
+    """
+    from scipy.spatial import Delaunay
+
+    n_times = valid.shape[1]
+    shares = np.full(n_times, np.nan)
+    if water_pixels_xy.shape[0] == 0:
+        return shares, 0
+
+    packed = np.packbits(valid, axis=0)
+    patterns, inverse = np.unique(packed.T, axis=0, return_inverse=True)
+    inverse = np.ravel(inverse)
+
+    for pattern_index in range(patterns.shape[0]):
+        columns = np.flatnonzero(inverse == pattern_index)
+        point_mask = valid[:, columns[0]]
+        if np.count_nonzero(point_mask) < 3:
+            shares[columns] = 1.0
+            continue
+
+        try:
+            tri = Delaunay(np.column_stack([lons[point_mask], lats[point_mask]]))
+            outside = tri.find_simplex(water_pixels_xy) < 0
+            shares[columns] = outside.mean()
+        except Exception:
+            shares[columns] = np.nan
+
+    return shares, patterns.shape[0]
+
+def analyze_data_coverage(arrays, bbox, water_polygons=None, water_coverage=None):
+    """Beräkna täckningsrapport för alla parametrar och tidssteg"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    lons, lats = arrays['lons'], arrays['lats']
+    in_bbox = (lons >= lon_min) & (lons <= lon_max) & (lats >= lat_min) & (lats <= lat_max)
+
+    validity = validity_matrices(arrays)
+    any_valid = np.zeros(lons.size, dtype=bool)
+    for valid in validity.values():
+        any_valid |= valid.any(axis=1)
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'bbox': bbox,
+        'timestamps': arrays['timestamps'],
+        'points_total': int(lons.size),
+        'points_in_bbox': int(np.count_nonzero(in_bbox)),
+        'points_point_specific': int(np.count_nonzero(arrays['is_point_specific'])),
+        'bbox_gaps': bbox_gaps(lons[in_bbox & any_valid], lats[in_bbox & any_valid], bbox),
+        'parameters': {},
+    }
+
+    in_water = None
+    if water_polygons is not None:
+        in_water = points_in_water(lons, lats, water_polygons)
+        lost = in_bbox & any_valid & ~in_water
+        report['water_mask'] = {
+            'points_with_data_in_bbox': int(np.count_nonzero(in_bbox & any_valid)),
+            'points_lost_to_mask': int(np.count_nonzero(lost)),
+            'lost_point_specific': [
+                arrays['names'][i] for i in np.flatnonzero(lost & arrays['is_point_specific'])
+            ],
+        }
+
+    water_pixels_xy = None
+    if water_coverage is not None:
+        resolution = water_coverage.shape[0]
+        lon_grid = np.linspace(lon_min, lon_max, resolution)
+        lat_grid = np.linspace(lat_min, lat_max, resolution)
+        rows, cols = np.nonzero(water_coverage > 0)
+        water_pixels_xy = np.column_stack([lon_grid[cols], lat_grid[rows]])
+
+    used_points = in_bbox if in_water is None else in_bbox & in_water
+    for parameter, valid in validity.items():
+        used_valid = valid & used_points[:, None]
+        counts = used_valid.sum(axis=0)
+        entry = {
+            'valid_counts': counts.tolist(),
+            'min_valid': int(counts.min()) if counts.size else 0,
+            'max_valid': int(counts.max()) if counts.size else 0,
+            'timestamps_without_data': [
+                arrays['timestamps'][t] for t in np.flatnonzero(counts == 0)
+            ],
+            'points_never_valid': int(np.count_nonzero(used_points & ~valid.any(axis=1))),
+        }
+        if water_pixels_xy is not None:
+            shares, pattern_count = fallback_shares(used_valid, lons, lats, water_pixels_xy)
+            entry['fallback_share'] = [None if np.isnan(s) else round(float(s), 4) for s in shares]
+            entry['fallback_share_max'] = None if np.all(np.isnan(shares)) else round(float(np.nanmax(shares)), 4)
+            entry['validity_patterns'] = pattern_count
+        report['parameters'][parameter] = entry
+
+    return report, validity, in_bbox
 
-def load_area_parameters(file_path):
-    """Ladda och dekomprimera area-parameters data"""
-    print(f"📦 Laddar area-parameters från {file_path}")
-    
-    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"✅ Laddade {len(data['points'])} punkter med {len(data['metadata']['timestamps'])} tidssteg")
-    return data
-
-def analyze_data_coverage():
-    # Hårdkodad bbox (samma som i scripts)
-    bbox = (10.3, 16.6, 54.9, 59.6)  # lon_min, lon_max, lat_min, lat_max
-    
-    # Ladda data
-    area_data = load_area_parameters('public/data/area-parameters-extended.json.gz')
-    
-    # Extrahera alla punkter
-    lons = []
-    lats = []
-    salinity_points = []
-    current_points = []
-    
-    # Ta första tidsstämpeln för analys
-    target_time = "2025-06-29T12:00:00.000Z"
-    
-    for point in area_data['points']:
-        lat, lon = point['lat'], point['lon']
-        
-        # Kolla om punkten är inom bbox
-        if bbox[0] <= lon <= bbox[1] and bbox[2] <= lat <= bbox[3]:
-            lons.append(lon)
-            lats.append(lat)
-            
-            # Kolla vad för data som finns
-            for data_entry in point['data']:
-                if data_entry['time'] == target_time:
-                    if 'salinity' in data_entry and data_entry['salinity'] is not None:
-                        salinity_points.append((lon, lat))
-                    if 'current' in data_entry and data_entry['current']:
-                        u = data_entry['current'].get('u')
-                        v = data_entry['current'].get('v')
-                        if u is not None and v is not None:
-                            current_points.append((lon, lat))
-                    break
-    
-    lons = np.array(lons)
-    lats = np.array(lats)
-    
-    print(f"\n🗺️ BBOX COVERAGE ANALYS för {target_time}")
-    print(f"📦 Bbox: {bbox}")
-    print(f"📍 Totalt {len(lons)} punkter inom bbox")
-    print(f"🧂 {len(salinity_points)} punkter med salinity-data")
-    print(f"🌊 {len(current_points)} punkter med current-data")
-    
-    # Analysera täckning
-    if len(lons) > 0:
-        actual_bounds = (np.min(lons), np.max(lons), np.min(lats), np.max(lats))
-        print(f"📏 Faktiska data-gränser: {actual_bounds}")
-        
-        # Beräkna avstånd till bbox-kanter
-        lon_gap_left = actual_bounds[0] - bbox[0]
-        lon_gap_right = bbox[1] - actual_bounds[1] 
-        lat_gap_bottom = actual_bounds[2] - bbox[2]
-        lat_gap_top = bbox[3] - actual_bounds[3]
-        
+def print_report(report):
+    """Skriv ut en kort sammanfattning"""
+    print(f"\n🗺️ TÄCKNINGSANALYS för {len(report['timestamps'])} tidssteg")
+    print(f"📦 Bbox: {report['bbox']}")
+    print(f"📍 {report['points_in_bbox']}/{report['points_total']} punkter inom bbox "
+          f"({report['points_point_specific']} punktspecifika)")
+
+    gaps = report['bbox_gaps']
+    if gaps:
+        print(f"📏 Faktiska data-gränser: {tuple(round(v, 3) for v in gaps['data_bounds'])}")
         print(f"📐 Gap till bbox-kanter:")
-        print(f"   Vänster:  {lon_gap_left:.3f}° ({lon_gap_left*111:.1f}km)")
-        print(f"   Höger:    {lon_gap_right:.3f}° ({lon_gap_right*111:.1f}km)")
-        print(f"   Botten:   {lat_gap_bottom:.3f}° ({lat_gap_bottom*111:.1f}km)")
-        print(f"   Topp:     {lat_gap_top:.3f}° ({lat_gap_top*111:.1f}km)")
-    
-    # Visualisera
+        for edge, label in [('left', 'Vänster'), ('right', 'Höger'), ('bottom', 'Botten'), ('top', 'Topp')]:
+            print(f"   {label + ':':9} {gaps['gaps_deg'][edge]:.3f}° ({gaps['gaps_km'][edge]:.1f}km)")
+
+    if 'water_mask' in report:
+        mask_report = report['water_mask']
+        print(f"🌊 Vattenmask: {mask_report['points_lost_to_mask']}/{mask_report['points_with_data_in_bbox']} "
+              f"punkter med data hamnar utanför masken")
+        for name in mask_report['lost_point_specific']:
+            print(f"   ❌ Punktspecifik punkt utanför masken: {name}")
+
+    for parameter, entry in report['parameters'].items():
+        line = f"📊 {parameter}: {entry['min_valid']}-{entry['max_valid']} giltiga punkter per tidssteg"
+        if entry.get('fallback_share_max') is not None:
+            line += f", max {100*entry['fallback_share_max']:.1f}% vattenpixlar via fallback"
+        print(line)
+        if entry['timestamps_without_data']:
+            print(f"   ⚠️ {len(entry['timestamps_without_data'])} tidssteg helt utan data")
+
+def plot_coverage(report, arrays, validity, in_bbox, plot_path):
+    """Rita giltiga punkter över tid och karta över andel giltiga tidssteg"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    bbox = report['bbox']
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-    
-    # Plot 1: Alla punkter
-    ax1.scatter(lons, lats, c='blue', s=1, alpha=0.6, label=f'Alla punkter ({len(lons)})')
-    
-    # Rita bbox
-    bbox_x = [bbox[0], bbox[1], bbox[1], bbox[0], bbox[0]]
-    bbox_y = [bbox[2], bbox[2], bbox[3], bbox[3], bbox[2]]
-    ax1.plot(bbox_x, bbox_y, 'r-', linewidth=2, label='Target Bbox')
-    
-    # Rita faktiska gränser
-    if len(lons) > 0:
-        actual_x = [actual_bounds[0], actual_bounds[1], actual_bounds[1], actual_bounds[0], actual_bounds[0]]
-        actual_y = [actual_bounds[2], actual_bounds[2], actual_bounds[3], actual_bounds[3], actual_bounds[2]]
-        ax1.plot(actual_x, actual_y, 'g--', linewidth=2, label='Faktiska data-gränser')
-    
-    ax1.set_xlabel('Longitude')
-    ax1.set_ylabel('Latitude')
-    ax1.set_title('Data Point Coverage')
+
+    hours = np.arange(len(report['timestamps']))
+    for parameter, entry in report['parameters'].items():
+        ax1.plot(hours, entry['valid_counts'], label=parameter)
+    ax1.set_xlabel('Tidssteg (timmar från start)')
+    ax1.set_ylabel('Giltiga punkter')
+    ax1.set_title('Giltiga punkter per tidssteg')
     ax1.legend()
     ax1.grid(True, alpha=0.3)
-    
-    # Plot 2: Salinity vs Current coverage
-    if salinity_points:
-        sal_lons, sal_lats = zip(*salinity_points)
-        ax2.scatter(sal_lons, sal_lats, c='green', s=2, alpha=0.7, label=f'Salinity ({len(salinity_points)})')
-    
-    if current_points:
-        cur_lons, cur_lats = zip(*current_points)
-        ax2.scatter(cur_lons, cur_lats, c='blue', s=2, alpha=0.7, label=f'Current ({len(current_points)})')
-    
+
+    valid_share = validity['current'][in_bbox].mean(axis=1)
+    scatter = ax2.scatter(arrays['lons'][in_bbox], arrays['lats'][in_bbox], c=valid_share,
+                          s=2, cmap='viridis', vmin=0, vmax=1)
+    bbox_x = [bbox[0], bbox[1], bbox[1], bbox[0], bbox[0]]
+    bbox_y = [bbox[2], bbox[2], bbox[3], bbox[3], bbox[2]]
     ax2.plot(bbox_x, bbox_y, 'r-', linewidth=2, label='Target Bbox')
+    fig.colorbar(scatter, ax=ax2, label='Andel tidssteg med strömdata')
     ax2.set_xlabel('Longitude')
     ax2.set_ylabel('Latitude')
-    ax2.set_title('Parameter-Specific Coverage')
+    ax2.set_title('Strömdata-täckning per punkt')
     ax2.legend()
     ax2.grid(True, alpha=0.3)
-    
+
     plt.tight_layout()
-    plt.savefig('data_coverage_analysis.png', dpi=150, bbox_inches='tight')
-    plt.show()
-    
-    print(f"\n💾 Analys sparad som 'data_coverage_analysis.png'")
+    plt.savefig(plot_path, dpi=150, bbox_inches='tight')
+    plt.close()
+    print(f"💾 Diagram sparat som '{plot_path}'")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Täckningsanalys för alla tidssteg i area-parameters')
+    parser.add_argument('--input', default='public/data/area-parameters-extended.json.gz',
+                       help='Sökväg till komprimerad area-parameters fil')
+    parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Sökväg till vattenmask GeoJSON (hoppas över om filen saknas)')
+    parser.add_argument('--resolution', type=int, default=400,
+                       help='Upplösning för analys av fallback-andel (default: 400x400)')
+    parser.add_argument('--mask-master-resolution', type=int, default=DEFAULT_MASTER_RESOLUTION,
+                       help=f'Master-raster för vattenmasken (default: {DEFAULT_MASTER_RESOLUTION})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--output', default='data_coverage_report.json',
+                       help='Sökväg för JSON-rapporten')
+    parser.add_argument('--plot', default=None,
+                       help='Spara även diagram (t.ex. data_coverage_analysis.png)')
+
+    args = parser.parse_args(argv)
+    bbox = DEFAULT_BBOX
+
+    area_data = load_area_parameters(args.input)
+    arrays = load_forecast_arrays(area_data)
+    del area_data
+
+    water_polygons = None
+    water_coverage = None
+    if Path(args.water_mask).exists():
+        geometry_resolution = max(args.resolution, args.mask_master_resolution)
+        water_polygons = load_clipped_water_polygons(args.water_mask, bbox, geometry_resolution, args.cache_dir)
+        water_coverage = load_water_coverage(
+            water_polygons, bbox, args.resolution, args.water_mask,
+            args.mask_master_resolution, args.cache_dir
+        )
+    else:
+        print(f"⚠️ Hittar inte vattenmask {args.water_mask}, hoppar över mask-analys")
+
+    report, validity, in_bbox = analyze_data_coverage(arrays, bbox, water_polygons, water_coverage)
+    print_report(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"\n💾 Rapport sparad som '{args.output}'")
+
+    if args.plot:
+        plot_coverage(report, arrays, validity, in_bbox, args.plot)
 
 if __name__ == "__main__":
-    analyze_data_coverage() 
\ No newline at end of file
+    main()
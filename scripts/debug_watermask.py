@@ -4,10 +4,11 @@ Debug vattenmask för att se om Drogden Lt felaktigt filtreras bort
 """
 
 import json
-import geojson
-from shapely.geometry import shape, Point
+from shapely.geometry import Point
 from pathlib import Path
 
+from water_mask import load_clipped_water_polygons, DEFAULT_BBOX
+
 def debug_watermask_for_point(target_lat, target_lon):
     """Kontrollera om en punkt är i vattenmask"""
     
@@ -19,16 +20,8 @@ def debug_watermask_for_point(target_lat, target_lon):
         print(f"❌ Hittar inte GeoJSON: {geojson_path}")
         return
     
-    with open(geojson_path, 'r', encoding='utf-8') as f:
-        water_geojson = geojson.load(f)
-    
-    print(f"🌊 Laddade vattenmask med {len(water_geojson['features'])} features")
-    
-    # Skapa Shapely-geometrier
-    water_polygons = []
-    for feature in water_geojson['features']:
-        if feature['geometry']['type'] in ['Polygon', 'MultiPolygon']:
-            water_polygons.append(shape(feature['geometry']))
+    # Samma klippta och förenklade geometri som bildgeneratorerna använder
+    water_polygons = load_clipped_water_polygons(geojson_path, DEFAULT_BBOX)
     
     print(f"🗺️ Totalt {len(water_polygons)} vattenpolygoner")
     
@@ -60,7 +53,7 @@ def debug_watermask_for_point(target_lat, target_lon):
         min_distance = float('inf')
         nearest_polygon = None
         
-        for i, polygon in enumerate(water_polygons[:10]):  # Kolla bara första 10 för prestanda
+        for i, polygon in enumerate(water_polygons):  # Klippt geometri är liten nog att kolla allt
             distance = target_point.distance(polygon)
             if distance < min_distance:
                 min_distance = distance
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Härledda parametrar: lager som räknas ut ur andra parametrars färdiga grids.
+
+Ett härlett lager definieras i get_parameter_config med källparametrar, en
+vektoriserad funktion (dict källa → grid, inställningar) → grid och
+inställningarna som ingår i artefaktnyckeln. Funktionerna arbetar på hela
+float32-grids i en operation; NaN (land, ingen data) följer med till resultatet.
+"""
+
+import numpy as np
+
+# Makrillindex: trapetsformade gynnsamhetsintervall per källparameter
+# (värde under a eller över d ger 0, mellan b och c ger 1, linjärt däremellan)
+MACKEREL_SUITABILITY = {
+    'temperature': (6.0, 9.0, 15.0, 20.0),   # °C, makrillen trivs i ungefär 9-15 °C
+    'salinity': (10.0, 20.0, 36.0, 40.0),    # g/kg, undviker bräckt östersjövatten
+    'current': (0.0, 0.1, 0.5, 1.2),         # m/s, måttlig ström samlar byte, stark ström undviks
+}
+
+def trapezoid_score(values, band):
+    """Gynnsamhet 0-1 för values i ett trapetsintervall (a, b, c, d)"""
+    a, b, c, d = band
+    rising = (values - a) / (b - a) if b > a else np.where(values >= a, 1.0, 0.0)
+    falling = (d - values) / (d - c) if d > c else np.where(values <= d, 1.0, 0.0)
+    return np.clip(np.minimum(rising, falling), 0.0, 1.0)
+
+def mackerel_suitability(grids, bands=MACKEREL_SUITABILITY):
+    """
+    Makrillindex 0-1: geometriskt medel av gynnsamheten för temperatur, salthalt
+    och strömstyrka (ett ogynnsamt värde drar ner hela indexet).
+    """
+    score = np.ones_like(grids['temperature'], dtype=np.float32)
+    for parameter, band in bands.items():
+        score *= trapezoid_score(grids[parameter], band)
+    return np.power(score, np.float32(1.0 / len(bands)))
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Export av isoband (fyllda konturpolygoner) som GeoJSON eller TopoJSON.
+
+Varje maskad grid delas upp i band mellan colormap-stoppen (CURRENT_COLORMAP,
+TEMPERATURE_COLORMAP, SALINITY_COLORMAP) med marching squares (contourpy,
+samma motor som matplotlib.contourf). Polygonerna förenklas till visnings-
+toleransen (en halv pixel vid vald upplösning) och koordinaterna kvantiseras,
+så filerna blir små och upplösningsoberoende i klienten.
+"""
+
+import math
+import argparse
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+from forecast_arrays import load_area_parameters, load_forecast_arrays, parameter_values
+from interpolation_backends import INTERPOLATION_BACKENDS, DEFAULT_METHOD
+from low_memory_grid import compute_grid_low_memory
+from parallel_frames import run_frames
+from water_mask import (
+    load_clipped_water_polygons, points_in_water, load_water_coverage, water_mask_from_coverage,
+    simplify_tolerance_for_resolution, file_fingerprint, DEFAULT_BBOX, DEFAULT_MASTER_RESOLUTION, DEFAULT_CACHE_DIR
+)
+from generate_marine_parameter_images import get_parameter_config, create_colormap
+from run_journal import build_run_key, previous_run_key, write_json_atomic, FORCE_HELP
+
+# Antal steg per axel i TopoJSON-kvantiseringen
+TOPOJSON_QUANTIZATION = 100_000
+
+# Radblock vid grid-interpolation
+GRID_CHUNK_ROWS = 256
+
+def isoband_levels(colormap):
+    """
+    Band mellan colormap-stoppen, plus öppna band under första och över sista stoppet.
+    Returnerar lista med (lower, upper) där None betyder obegränsat.
+    """
+    stops = [value for value, _ in colormap]
+    return [(None, stops[0])] + list(zip(stops[:-1], stops[1:])) + [(stops[-1], None)]
+
+def band_color(cmap, vmin, vmax, lower, upper):
+    """Hex-färg för ett band (colormap vid bandets mitt, ändstoppets färg för öppna band)"""
+    from matplotlib.colors import to_hex
+
+    if lower is None:
+        value = upper
+    elif upper is None:
+        value = lower
+    else:
+        value = (lower + upper) / 2
+    return to_hex(cmap((value - vmin) / (vmax - vmin)))
+
+def extract_isobands(grid_values, lon_grid, lat_grid, bands):
+    """
+    Marching squares på den maskade griden (NaN = land/utanför).
+    Returnerar lista med (lower, upper, [shapely Polygon]) för band som har innehåll.
+    """
+    from contourpy import contour_generator, FillType
+    from shapely.geometry import Polygon
+
+    z = np.ma.masked_invalid(grid_values)
+    if z.count() == 0:
+        return []
+    z_min, z_max = float(z.min()), float(z.max())
+
+    generator = contour_generator(lon_grid, lat_grid, z, fill_type=FillType.OuterOffset)
+    result = []
+    for lower, upper in bands:
+        # Öppna band begränsas till gridens eget värdeintervall
+        low = z_min - 1.0 if lower is None else lower
+        high = z_max + 1.0 if upper is None else upper
+        if (lower is not None and low >= z_max) or (upper is not None and high <= z_min):
+            continue
+
+        points_list, offsets_list = generator.filled(low, high)
+        polygons = []
+        for points, offsets in zip(points_list, offsets_list):
+            rings = [points[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+            polygon = Polygon(rings[0], rings[1:])
+            if not polygon.is_empty:
+                polygons.append(polygon)
+        if polygons:
+            result.append((lower, upper, polygons))
+    return result
+
+def simplify_isobands(isobands, tolerance):
+    """Förenkla till visningstoleransen och orientera ringarna enligt RFC 7946"""
+    from shapely.geometry.polygon import orient
+
+    simplified = []
+    for lower, upper, polygons in isobands:
+        parts = []
+        for polygon in polygons:
+            geometry = polygon.simplify(tolerance, preserve_topology=True)
+            for part in getattr(geometry, 'geoms', [geometry]):
+                if part.geom_type == 'Polygon' and not part.is_empty and part.area > tolerance * tolerance:
+                    parts.append(orient(part, 1.0))
+        if parts:
+            simplified.append((lower, upper, parts))
+    return simplified
+
+def coordinate_decimals(tolerance):
+    """Antal decimaler som räcker för given förenklingstolerans (en decimal marginal)"""
+    return max(0, math.ceil(-math.log10(tolerance))) + 1
+
+def band_properties(lower, upper, color):
+    """Egenskaper per band i exporten"""
+    return {'lower': lower, 'upper': upper, 'color': color}
+
+def to_geojson(isobands, colors_by_band, decimals):
+    """Kompakt GeoJSON FeatureCollection, en MultiPolygon per band"""
+    def rounded(ring):
+        coords = [[round(x, decimals), round(y, decimals)] for x, y in ring.coords]
+        # Ta bort punkter som sammanfaller efter avrundning
+        return [c for i, c in enumerate(coords) if i == 0 or c != coords[i - 1]]
+
+    features = []
+    for lower, upper, polygons in isobands:
+        coordinates = []
+        for polygon in polygons:
+            rings = [rounded(polygon.exterior)] + [rounded(ring) for ring in polygon.interiors]
+            rings = [ring for ring in rings if len(ring) >= 4]
+            if rings and len(rings[0]) >= 4:
+                coordinates.append(rings)
+        if coordinates:
+            features.append({
+                'type': 'Feature',
+                'properties': band_properties(lower, upper, colors_by_band[(lower, upper)]),
+                'geometry': {'type': 'MultiPolygon', 'coordinates': coordinates},
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+def to_topojson(isobands, colors_by_band, bbox, quantization=TOPOJSON_QUANTIZATION):
+    """
+    TopoJSON med kvantiserade, delta-kodade bågar (en båge per ring).
+    Banden delar inte bågar eftersom de förenklas var för sig.
+    """
+    lon_min, lon_max, lat_min, lat_max = bbox
+    scale_x = (lon_max - lon_min) / (quantization - 1)
+    scale_y = (lat_max - lat_min) / (quantization - 1)
+    arcs = []
+
+    def add_arc(ring):
+        coords = np.asarray(ring.coords)
+        quantized = np.empty((len(coords), 2), dtype=np.int64)
+        quantized[:, 0] = np.rint((coords[:, 0] - lon_min) / scale_x)
+        quantized[:, 1] = np.rint((coords[:, 1] - lat_min) / scale_y)
+        # Ta bort punkter som sammanfaller efter kvantisering
+        keep = np.ones(len(quantized), dtype=bool)
+        keep[1:] = np.any(quantized[1:] != quantized[:-1], axis=1)
+        quantized = quantized[keep]
+        if len(quantized) < 4:
+            return None
+        deltas = np.vstack([quantized[:1], np.diff(quantized, axis=0)])
+        arcs.append(deltas.tolist())
+        return len(arcs) - 1
+
+    geometries = []
+    for lower, upper, polygons in isobands:
+        polygon_arcs = []
+        for polygon in polygons:
+            exterior = add_arc(polygon.exterior)
+            if exterior is None:
+                continue
+            holes = [add_arc(ring) for ring in polygon.interiors]
+            polygon_arcs.append([[exterior]] + [[hole] for hole in holes if hole is not None])
+        if polygon_arcs:
+            geometries.append({
+                'type': 'MultiPolygon',
+                'arcs': polygon_arcs,
+                'properties': band_properties(lower, upper, colors_by_band[(lower, upper)]),
+            })
+
+    return {
+        'type': 'Topology',
+        'bbox': [lon_min, lat_min, lon_max, lat_max],
+        'transform': {'scale': [scale_x, scale_y], 'translate': [lon_min, lat_min]},
+        'objects': {'isobands': {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs,
+    }
+
+def render_isoband_frame(context, task):
+    """Interpolera, extrahera och skriv isoband för ett tidssteg (körs i arbetsprocess när --workers > 1)"""
+    time_index, timestamp, output_path = task
+    parameter = context['parameter']
+    print(f"\n🗾 {parameter} {time_index+1}/{context['total']}: {timestamp}")
+
+    values = context['values'][:, time_index]
+    valid = np.isfinite(values)
+    if np.count_nonzero(valid) < 3:
+        print(f"⚠️ Ingen {parameter}-data för {timestamp}")
+        return None
+
+    try:
+        grid_values = compute_grid_low_memory(
+            context['lons'][valid], context['lats'][valid], values[valid],
+            context['water_mask_grid'], context['bbox'], parameter, GRID_CHUNK_ROWS, context['method']
+        )
+        isobands = extract_isobands(grid_values, context['lon_grid'], context['lat_grid'], context['bands'])
+        isobands = simplify_isobands(isobands, context['tolerance'])
+    except Exception as e:
+        print(f"❌ Isoband-extraktion misslyckades för {parameter} {timestamp}: {e}")
+        return None
+
+    if context['format'] == 'topojson':
+        payload = to_topojson(isobands, context['colors'], context['bbox'])
+    else:
+        payload = to_geojson(isobands, context['colors'], context['decimals'])
+
+    write_json_atomic(payload, output_path, separators=(',', ':'))
+
+    size = output_path.stat().st_size
+    print(f"   ✅ {len(isobands)} band, {sum(len(p) for _, _, p in isobands)} polygoner, "
+          f"{size / 1024:.0f} KB → {output_path.name}")
+    return size
+
+def export_parameter(parameter, arrays, used_points, water_mask_grid, bbox, args, run_key):
+    """
+    Exportera isoband för alla tidssteg av en parameter. Befintliga filer återanvänds
+    bara om förra exporten gjordes med samma run_key (indata och inställningar).
+    """
+    config = get_parameter_config(parameter)
+    cmap, vmin, vmax = create_colormap(parameter)
+    bands = isoband_levels(config['colormap'])
+    colors_by_band = {band: band_color(cmap, vmin, vmax, *band) for band in bands}
+
+    resolution = water_mask_grid.shape[0]
+    tolerance = simplify_tolerance_for_resolution(bbox, resolution)
+    lon_min, lon_max, lat_min, lat_max = bbox
+
+    extension = 'topojson' if args.format == 'topojson' else 'geojson'
+    output_dir = Path(args.output_base_dir) / config['output_dir'].replace('-images', '-isobands')
+    output_dir.mkdir(parents=True, exist_ok=True)
+    print(f"\n🚀 Exporterar {config['name']}-isoband ({len(bands)} band, {extension}) till {output_dir}")
+
+    all_timestamps = arrays['timestamps']
+    timestamps = all_timestamps[:args.max_images] if args.max_images else all_timestamps
+
+    reuse = not args.force and previous_run_key(output_dir / "metadata.json") == run_key
+    tasks = []
+    for i, timestamp in enumerate(timestamps):
+        safe_timestamp = timestamp.replace(':', '-').replace('+', 'plus')
+        output_path = output_dir / f"{config['name_en']}_{safe_timestamp}.{extension}"
+        if reuse and output_path.exists():
+            continue
+        tasks.append((i, timestamp, output_path))
+
+    context = {
+        'parameter': parameter,
+        'total': len(timestamps),
+        'lons': arrays['lons'][used_points],
+        'lats': arrays['lats'][used_points],
+        'values': parameter_values(arrays, parameter)[used_points].astype(np.float32),
+        'water_mask_grid': water_mask_grid,
+        'lon_grid': np.linspace(lon_min, lon_max, resolution),
+        'lat_grid': np.linspace(lat_min, lat_max, resolution),
+        'bbox': bbox,
+        'method': args.method,
+        'bands': bands,
+        'colors': colors_by_band,
+        'tolerance': tolerance,
+        'decimals': coordinate_decimals(tolerance),
+        'format': args.format,
+    }
+    sizes = [size for size in run_frames(render_isoband_frame, tasks, context, args.workers) if size is not None]
+    skipped = len(timestamps) - len(tasks)
+
+    if sizes:
+        print(f"\n🎉 {config['name'].title()}: {len(sizes)} filer, snitt {np.mean(sizes) / 1024:.0f} KB per tidssteg")
+    if skipped:
+        print(f"⏭️ {skipped} befintliga filer hoppades över")
+
+    metadata = {
+        "parameter": parameter,
+        "parameter_name": config['name'],
+        "unit": config['unit'],
+        "format": extension,
+        "bbox": bbox,
+        "bands": [band_properties(lower, upper, colors_by_band[(lower, upper)]) for lower, upper in bands],
+        "timestamps": all_timestamps,
+        "total_files": len(sizes) + skipped,
+        "resolution": resolution,
+        "simplify_tolerance": tolerance,
+        "interpolation_method": args.method,
+        "run_key": run_key,
+        "generated_at": datetime.now().isoformat()
+    }
+    write_json_atomic(metadata, output_dir / "metadata.json", indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exportera isoband som GeoJSON/TopoJSON för marina parametrar')
+    parser.add_argument('--parameter', choices=['current', 'temperature', 'salinity', 'all'], default='all',
+                       help='Parameter att exportera (default: all)')
+    parser.add_argument('--input', default='public/data/area-parameters-extended.json.gz',
+                       help='Sökväg till komprimerad area-parameters fil')
+    parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Sökväg till vattenmask GeoJSON')
+    parser.add_argument('--output-base-dir', default='public/data',
+                       help='Bas-directory för output (parameter-specifika *-isobands mappar skapas automatiskt)')
+    parser.add_argument('--format', choices=['geojson', 'topojson'], default='geojson',
+                       help='Utdataformat (default: geojson)')
+    parser.add_argument('--resolution', type=int, default=600,
+                       help='Grid-upplösning för konturextraktion, styr även förenklingstoleransen (default: 600)')
+    parser.add_argument('--max-images', type=int, default=None,
+                       help='Maximal antal tidssteg per parameter (för testning)')
+    parser.add_argument('--method', choices=list(INTERPOLATION_BACKENDS), default=DEFAULT_METHOD,
+                       help=f'Interpolationsmetod (default: {DEFAULT_METHOD})')
+    parser.add_argument('--mask-master-resolution', type=int, default=DEFAULT_MASTER_RESOLUTION,
+                       help=f'Upplösning för master-rastern (default: {DEFAULT_MASTER_RESOLUTION})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Antal processer för parallell export av tidssteg (default: 1)')
+    parser.add_argument('--force', action='store_true', help=FORCE_HELP)
+
+    args = parser.parse_args(argv)
+    parameters = ['current', 'temperature', 'salinity'] if args.parameter == 'all' else [args.parameter]
+    bbox = DEFAULT_BBOX
+
+    print("🗾 ISOBAND-EXPORT")
+    print("=" * 50)
+
+    geometry_resolution = max(args.resolution, args.mask_master_resolution)
+    water_polygons = load_clipped_water_polygons(args.water_mask, bbox, geometry_resolution, args.cache_dir)
+    water_coverage = load_water_coverage(
+        water_polygons, bbox, args.resolution, args.water_mask,
+        args.mask_master_resolution, args.cache_dir
+    )
+    water_mask_grid = water_mask_from_coverage(water_coverage)
+
+    area_data = load_area_parameters(args.input)
+    arrays = load_forecast_arrays(area_data)
+    del area_data
+
+    used_points = points_in_water(arrays['lons'], arrays['lats'], water_polygons)
+    del water_polygons
+
+    run_key = build_run_key(
+        args.input, water_mask=file_fingerprint(args.water_mask), format=args.format, resolution=args.resolution,
+        method=args.method, mask_master_resolution=args.mask_master_resolution
+    )
+    for parameter in parameters:
+        export_parameter(parameter, arrays, used_points, water_mask_grid, bbox, args, run_key)
+
+if __name__ == "__main__":
+    main()
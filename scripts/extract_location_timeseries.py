@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Extrahera prognoskurvor (ström, temperatur, salthalt) för fasta platser.
+Alla platser och alla tidssteg beräknas i EN vektoriserad operation:
+grannar/trianglar söks upp en gång per plats och återanvänds för alla 121 timmar.
+Resultatet sparas som kompakt JSON eller CSV för frontend.
+"""
+
+import re
+import csv
+import json
+import argparse
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+from forecast_arrays import (
+    load_area_parameters, load_forecast_arrays,
+    current_magnitude, current_direction
+)
+
+# Fält som interpoleras (ström interpoleras som u/v och magnitud/riktning räknas efteråt)
+TIMESERIES_FIELDS = ['u', 'v', 'temperature', 'salinity']
+
+# Antal grannar som provas vid nearest (om närmaste punkt saknar värde för ett tidssteg)
+NEAREST_CANDIDATES = 8
+
+def load_locations_from_points_ts(points_ts_path):
+    """Läs DMI_GRID_POINTS från src/lib/points.ts"""
+    text = Path(points_ts_path).read_text(encoding='utf-8')
+    pattern = re.compile(
+        r"\{\s*lat:\s*(-?[\d.]+),\s*lon:\s*(-?[\d.]+),\s*name:\s*'([^']*)'"
+    )
+    return [
+        {'name': name, 'lat': float(lat), 'lon': float(lon)}
+        for lat, lon, name in pattern.findall(text)
+    ]
+
+def load_locations_from_json(json_path):
+    """Läs platser från JSON-lista med {name, lat, lon}"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    return [
+        {'name': entry.get('name', f"Plats {i+1}"), 'lat': float(entry['lat']), 'lon': float(entry['lon'])}
+        for i, entry in enumerate(entries)
+    ]
+
+def parse_location_argument(value):
+    """Tolka '--location Namn=lat,lon'"""
+    name, _, coords = value.rpartition('=')
+    lat, lon = (float(part) for part in coords.split(','))
+    return {'name': name or f"{lat:.4f},{lon:.4f}", 'lat': lat, 'lon': lon}
+
+def _scaled_coordinates(lons, lats, ref_lat):
+    """Skala longitud med cos(lat) så att avstånd blir ungefär isotropa"""
+    return np.column_stack([np.asarray(lons) * np.cos(np.radians(ref_lat)), np.asarray(lats)])
+
+def _first_finite(candidates):
+    """Välj första ändliga värdet längs axel 1 i (platser, kandidater, tidssteg)"""
+    finite = np.isfinite(candidates)
+    first = np.argmax(finite, axis=1)
+    values = np.take_along_axis(candidates, first[:, None, :], axis=1)[:, 0, :]
+    values[~finite.any(axis=1)] = np.nan
+    return values
+
+def extract_nearest(arrays, query_xy, point_xy):
+    """Nearest neighbour för alla platser och tidssteg (hoppar till nästa granne vid NaN)"""
+    from scipy.spatial import cKDTree
+
+    k = min(NEAREST_CANDIDATES, len(point_xy))
+    distances, indices = cKDTree(point_xy).query(query_xy, k=k)
+    if k == 1:
+        distances, indices = distances[:, None], indices[:, None]
+
+    result = {field: _first_finite(arrays[field][indices]) for field in TIMESERIES_FIELDS}
+    return result, distances[:, 0]
+
+def extract_linear(arrays, query_xy, point_xy):
+    """
+    Linjär (barycentrisk) interpolation för alla platser och tidssteg.
+    Triangulering och vikter beräknas en gång; varje fält blir en viktad summa
+    över (platser, 3, tidssteg). Platser utanför triangulering eller med
+    saknade hörnvärden faller tillbaka på nearest.
+    """
+    from scipy.spatial import Delaunay
+
+    tri = Delaunay(point_xy)
+    simplex = tri.find_simplex(query_xy)
+    inside = simplex >= 0
+
+    transform = tri.transform[np.maximum(simplex, 0)]
+    bary = np.einsum('nij,nj->ni', transform[:, :2, :], query_xy - transform[:, 2, :])
+    weights = np.column_stack([bary, 1.0 - bary.sum(axis=1)])
+    vertices = tri.simplices[np.maximum(simplex, 0)]
+
+    nearest, distances = extract_nearest(arrays, query_xy, point_xy)
+
+    result = {}
+    for field in TIMESERIES_FIELDS:
+        values = np.einsum('nk,nkt->nt', weights, arrays[field][vertices])
+        values[~inside] = np.nan
+        fallback = ~np.isfinite(values)
+        values[fallback] = nearest[field][fallback]
+        result[field] = values
+
+    return result, distances
+
+def extract_location_timeseries(arrays, locations, method='nearest'):
+    """
+    Beräkna tidsserier för en lista med platser ({name, lat, lon}).
+    Returnerar dict med (platser x tidssteg)-arrayer för u, v, temperatur,
+    salthalt, strömstyrka och strömriktning.
+    """
+    if not locations:
+        raise ValueError("Inga platser angivna")
+
+    ref_lat = float(np.mean(arrays['lats']))
+    point_xy = _scaled_coordinates(arrays['lons'], arrays['lats'], ref_lat)
+    query_xy = _scaled_coordinates(
+        [loc['lon'] for loc in locations], [loc['lat'] for loc in locations], ref_lat
+    )
+
+    if method == 'nearest':
+        series, distances = extract_nearest(arrays, query_xy, point_xy)
+    elif method == 'linear':
+        series, distances = extract_linear(arrays, query_xy, point_xy)
+    else:
+        raise ValueError(f"Okänd metod: {method}")
+
+    series['current_magnitude'] = current_magnitude(series['u'], series['v'])
+    series['current_direction'] = current_direction(series['u'], series['v'])
+    series['nearest_distance_km'] = distances * 111.0
+    return series
+
+def _rounded_list(values, decimals):
+    """Avrunda och ersätt NaN med None för kompakt JSON"""
+    rounded = np.round(values, decimals)
+    return [None if not np.isfinite(v) else float(v) for v in rounded]
+
+SERIES_DECIMALS = {
+    'current_magnitude': 3,
+    'current_direction': 0,
+    'u': 3,
+    'v': 3,
+    'temperature': 2,
+    'salinity': 2,
+}
+
+def save_timeseries_json(output_path, locations, series, timestamps, method):
+    """Spara kompakt JSON (en lista per parameter och plats)"""
+    payload = {
+        'generated_at': datetime.now().isoformat(),
+        'method': method,
+        'timestamps': timestamps,
+        'units': {
+            'current_magnitude': 'm/s',
+            'current_direction': 'grader (mot)',
+            'u': 'm/s',
+            'v': 'm/s',
+            'temperature': '°C',
+            'salinity': 'g/kg',
+        },
+        'locations': [],
+    }
+
+    for i, location in enumerate(locations):
+        entry = {
+            'name': location['name'],
+            'lat': location['lat'],
+            'lon': location['lon'],
+            'nearest_distance_km': round(float(series['nearest_distance_km'][i]), 2),
+        }
+        for key, decimals in SERIES_DECIMALS.items():
+            entry[key] = _rounded_list(series[key][i], decimals)
+        payload['locations'].append(entry)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+
+def save_timeseries_csv(output_path, locations, series, timestamps):
+    """Spara CSV i långt format (en rad per plats och tidssteg)"""
+    keys = list(SERIES_DECIMALS.keys())
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name', 'lat', 'lon', 'time'] + keys)
+        for i, location in enumerate(locations):
+            columns = [_rounded_list(series[key][i], SERIES_DECIMALS[key]) for key in keys]
+            for t, timestamp in enumerate(timestamps):
+                row = [location['name'], location['lat'], location['lon'], timestamp]
+                row.extend('' if column[t] is None else column[t] for column in columns)
+                writer.writerow(row)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extrahera prognoskurvor för fasta platser')
+    parser.add_argument('--input', default='public/data/area-parameters-extended.json.gz',
+                       help='Sökväg till komprimerad area-parameters fil')
+    parser.add_argument('--locations', default=None,
+                       help='JSON-fil med platser [{"name", "lat", "lon"}]')
+    parser.add_argument('--location', action='append', default=[],
+                       help='Extra plats som "Namn=lat,lon" (kan upprepas)')
+    parser.add_argument('--points-ts', default='src/lib/points.ts',
+                       help='Läs DMI_GRID_POINTS från denna fil om inga andra platser anges')
+    parser.add_argument('--method', choices=['nearest', 'linear'], default='nearest',
+                       help='Nearest neighbour eller linjär interpolation (default: nearest)')
+    parser.add_argument('--output', default='public/data/location-timeseries.json',
+                       help='Output-fil (.json eller .csv)')
+
+    args = parser.parse_args(argv)
+
+    locations = []
+    if args.locations:
+        locations.extend(load_locations_from_json(args.locations))
+    locations.extend(parse_location_argument(value) for value in args.location)
+    if not locations:
+        locations = load_locations_from_points_ts(args.points_ts)
+        print(f"📍 Använder {len(locations)} kritiska punkter från {args.points_ts}")
+
+    area_data = load_area_parameters(args.input)
+    arrays = load_forecast_arrays(area_data)
+    del area_data
+
+    print(f"🔄 Extraherar {len(locations)} platser x {len(arrays['timestamps'])} tidssteg ({args.method})...")
+    series = extract_location_timeseries(arrays, locations, args.method)
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if output_path.suffix == '.csv':
+        save_timeseries_csv(output_path, locations, series, arrays['timestamps'])
+    else:
+        save_timeseries_json(output_path, locations, series, arrays['timestamps'], args.method)
+
+    print(f"✅ Sparade tidsserier i: {output_path} ({output_path.stat().st_size / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    main()
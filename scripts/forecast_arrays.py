@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Gemensam laddning av area-parameters som numpy-arrayer.
+All prognosdata packas EN GÅNG till (punkter x tidssteg)-matriser så att
+analyser över alla 121 timmar kan göras med array-operationer istället för
+att loopa över punkter och tidssteg för varje tidsstämpel.
+"""
+
+import json
+import gzip
+import numpy as np
+
+# Parametrar som lagras per punkt och tidssteg (current delas upp i u/v)
+FORECAST_FIELDS = ['u', 'v', 'temperature', 'salinity']
+
+# Största avvikelse från en gitternod (andel av gittersteget) för att räknas som gitterpunkt
+LATTICE_TOLERANCE = 1e-3
+
+# Minsta andel av punkterna som måste ligga på gittret (resten är extrapunkter)
+MIN_LATTICE_SHARE = 0.9
+
+def load_area_parameters(file_path):
+    """Ladda och dekomprimera area-parameters data"""
+    print(f"📦 Laddar area-parameters från {file_path}")
+
+    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+
+    print(f"✅ Laddade {len(data['points'])} punkter med {len(data['metadata']['timestamps'])} tidssteg")
+    return data
+
+def _to_float(value):
+    """Konvertera JSON-värde till float (None/saknas → NaN)"""
+    return np.nan if value is None else float(value)
+
+def load_forecast_arrays(area_data):
+    """
+    Packa area-parameters till arrayer med formen (antal punkter, antal tidssteg).
+    Saknade värden blir NaN. Tidssteg matchas på prefix (YYYY-MM-DDTHH) precis
+    som i bildgeneratorerna.
+    """
+    timestamps = area_data['metadata']['timestamps']
+    points = area_data['points']
+    n_points, n_times = len(points), len(timestamps)
+
+    time_index = {timestamp[:13]: t for t, timestamp in enumerate(timestamps)}
+
+    lons = np.empty(n_points)
+    lats = np.empty(n_points)
+    names = []
+    is_point_specific = np.zeros(n_points, dtype=bool)
+    fields = {field: np.full((n_points, n_times), np.nan) for field in FORECAST_FIELDS}
+
+    for i, point in enumerate(points):
+        lons[i] = point['lon']
+        lats[i] = point['lat']
+        names.append(point.get('name'))
+        is_point_specific[i] = bool(point.get('isPointSpecific', False))
+
+        for data_entry in point['data']:
+            t = time_index.get(data_entry['time'][:13])
+            if t is None:
+                continue
+
+            current = data_entry.get('current')
+            if current:
+                fields['u'][i, t] = _to_float(current.get('u'))
+                fields['v'][i, t] = _to_float(current.get('v'))
+            fields['temperature'][i, t] = _to_float(data_entry.get('temperature'))
+            fields['salinity'][i, t] = _to_float(data_entry.get('salinity'))
+
+    arrays = {
+        'timestamps': list(timestamps),
+        'lons': lons,
+        'lats': lats,
+        'names': names,
+        'is_point_specific': is_point_specific,
+    }
+    arrays.update(fields)
+
+    valid = np.isfinite(fields['u']) & np.isfinite(fields['v'])
+    print(f"✅ Forecast-arrayer: {n_points} punkter x {n_times} tidssteg "
+          f"({100*valid.mean() if valid.size else 0:.1f}% med strömdata)")
+    return arrays
+
+def current_magnitude(u, v):
+    """Strömstyrka (m/s) från u/v-komponenter"""
+    return np.hypot(u, v)
+
+def current_direction(u, v):
+    """
+    Strömriktning i grader (0 = mot norr, 90 = mot öster).
+    Oceanografisk konvention: riktningen strömmen går MOT.
+    """
+    return np.mod(np.degrees(np.arctan2(u, v)), 360.0)
+
+def parameter_values(arrays, parameter):
+    """Hämta (punkter x tidssteg)-matris för en parameter ('current' ger strömstyrka)"""
+    if parameter == 'current':
+        return current_magnitude(arrays['u'], arrays['v'])
+    elif parameter in ('temperature', 'salinity', 'u', 'v'):
+        return arrays[parameter]
+    else:
+        raise ValueError(f"Okänd parameter: {parameter}")
+
+def _lattice_axis(values):
+    """
+    (start, steg, antal) för en regelbunden axel genom koordinatvärden som
+    förekommer minst två gånger (enstaka extrapunkter ingår inte), eller None
+    """
+    unique, counts = np.unique(np.round(values, 7), return_counts=True)
+    axis_values = unique[counts >= 2]
+    if axis_values.size < 2:
+        return None
+    step = float(np.median(np.diff(axis_values)))
+    if step <= 0:
+        return None
+    offsets = (axis_values - axis_values[0]) / step
+    if np.abs(offsets - np.rint(offsets)).max() > LATTICE_TOLERANCE:
+        return None
+    return float(axis_values[0]), step, int(np.rint(offsets[-1])) + 1
+
+def lattice_cells(lattice, lons, lats):
+    """(rader, kolumner, ligger på gittret) för punkter i ett gitter från detect_regular_lattice"""
+    rows_exact = (np.asarray(lats) - lattice['lat0']) / lattice['dlat']
+    cols_exact = (np.asarray(lons) - lattice['lon0']) / lattice['dlon']
+    rows = np.rint(rows_exact).astype(np.int64)
+    cols = np.rint(cols_exact).astype(np.int64)
+    on_lattice = (
+        (np.abs(rows_exact - rows) <= LATTICE_TOLERANCE) & (np.abs(cols_exact - cols) <= LATTICE_TOLERANCE) &
+        (rows >= 0) & (rows < lattice['nlat']) & (cols >= 0) & (cols < lattice['nlon'])
+    )
+    return rows, cols, on_lattice
+
+def detect_regular_lattice(lons, lats):
+    """
+    Känn igen ett regelbundet lat/lon-gitter (t.ex. DKSS-kuben) bland punkterna.
+    Gitterceller utan punkt (land) är tillåtna; punkter utanför gittret (punktspecifika
+    extrapunkter) får vara högst 1 - MIN_LATTICE_SHARE av alla. Returnerar
+    {'lon0', 'dlon', 'nlon', 'lat0', 'dlat', 'nlat', 'cells', 'extras'} eller None.
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    lon_axis, lat_axis = _lattice_axis(lons), _lattice_axis(lats)
+    if lon_axis is None or lat_axis is None:
+        return None
+
+    lattice = dict(zip(['lon0', 'dlon', 'nlon'], lon_axis))
+    lattice.update(zip(['lat0', 'dlat', 'nlat'], lat_axis))
+    rows, cols, on_lattice = lattice_cells(lattice, lons, lats)
+    flat = rows[on_lattice] * lattice['nlon'] + cols[on_lattice]
+    if on_lattice.mean() < MIN_LATTICE_SHARE or np.unique(flat).size != flat.size:
+        return None
+
+    lattice['cells'] = int(flat.size)
+    lattice['extras'] = int(lons.size - flat.size)
+    print(f"✅ Regelbundet gitter: {lattice['nlat']}x{lattice['nlon']} celler "
+          f"({lattice['dlat']:.4f}° x {lattice['dlon']:.4f}°), {lattice['cells']} med punkt, "
+          f"{lattice['extras']} extrapunkter")
+    return lattice
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Deltakomprimerade frame packs för arkivering av en hel prognoskörning.
+
+Istället för 121 separata PNG-bilder per lager sparas körningens griddar i en fil:
+- vattenmasken sparas en gång (packbits), bara vattenpixlar lagras per bildruta
+- värdena kvantiseras till uint16 med fast steg per parameter (0 = saknas)
+- var K:e bildruta är en nyckelruta, övriga lagras som skillnad mot föregående
+  (uint16 modulo 2^16, alltså exakt återställbar)
+- byte-planen delas upp (hög/låg byte) före zlib/lzma, eftersom små deltan
+  ger nästan bara nollor i höga byten
+
+Filformat: MAGIC, block (mask + bildrutor), JSON-index, 8 byte indexposition, MAGIC.
+Indexet ligger sist så att bildrutorna kan skrivas strömmande en i taget.
+Avkodning av en godtycklig bildruta kräver högst K-1 deltan från närmaste nyckelruta.
+"""
+
+import io
+import json
+import time
+import zlib
+import lzma
+import struct
+import argparse
+import tempfile
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+from forecast_arrays import load_area_parameters, load_forecast_arrays, parameter_values
+from interpolation_backends import INTERPOLATION_BACKENDS, DEFAULT_METHOD
+from low_memory_grid import compute_grid_low_memory, colorize_grid_rgba, save_rgba_png
+from water_mask import (
+    load_clipped_water_polygons, points_in_water, load_water_coverage, water_mask_from_coverage,
+    DEFAULT_BBOX, DEFAULT_MASTER_RESOLUTION, DEFAULT_CACHE_DIR
+)
+from generate_marine_parameter_images import get_parameter_config, create_colormap
+
+MAGIC = b'MKFP'
+FORMAT_VERSION = 1
+
+# Kvantiseringsnivåer över colormap-intervallet: dubbelt så fint som PNG-bildernas
+# 256 färgnivåer (halva steget är max avrundningsfel)
+QUANTIZATION_LEVELS = 512
+
+# Reserverat kvantiserat värde för saknade data (NaN i vattenpixel)
+NODATA = 0
+
+DEFAULT_KEYFRAME_INTERVAL = 24
+
+CODECS = {
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+    'lzma': (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+def quantization_for_parameter(parameter):
+    """(offset, steg) så att colormap-intervallet med marginal ryms i uint16"""
+    config = get_parameter_config(parameter)
+    stops = [value for value, _ in config['colormap']]
+    step = (max(stops) - min(stops)) / QUANTIZATION_LEVELS
+    # Värde 1 motsvarar offset; marginal under lägsta stoppet för under-/översläng
+    offset = min(stops) - (max(stops) - min(stops))
+    return offset, step
+
+def quantize(values, offset, step):
+    """float → uint16 (1..65535), NaN → NODATA"""
+    quantized = np.rint((values - offset) / step) + 1
+    quantized = np.clip(np.nan_to_num(quantized, nan=NODATA), 1, 65535)
+    quantized[np.isnan(values)] = NODATA
+    return quantized.astype(np.uint16)
+
+def dequantize(quantized, offset, step):
+    """uint16 → float32, NODATA → NaN"""
+    values = (quantized.astype(np.float32) - 1) * np.float32(step) + np.float32(offset)
+    values[quantized == NODATA] = np.nan
+    return values
+
+def _shuffle(values):
+    """Dela upp uint16 i låg- och högbyteplan (little endian)"""
+    return values.astype('<u2').view(np.uint8).reshape(-1, 2).T.tobytes()
+
+def _unshuffle(data, count):
+    """Inversen av _shuffle"""
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(2, count)
+    return np.ascontiguousarray(planes.T).view('<u2').reshape(count)
+
+def write_frame_pack(output_path, frames, water_mask_grid, metadata, offset, step,
+                     keyframe_interval=DEFAULT_KEYFRAME_INTERVAL, codec='zlib'):
+    """
+    Skriv frame pack strömmande. frames är en iterator av (timestamp, grid) där
+    grid är maskad float-grid (NaN utanför vatten). Skrivs atomiskt via temp-fil.
+    Returnerar indexet.
+    """
+    compress, _ = CODECS[codec]
+    mask_flat = water_mask_grid.reshape(-1)
+    water_count = int(np.count_nonzero(mask_flat))
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+
+    index = {
+        'version': FORMAT_VERSION,
+        'shape': list(water_mask_grid.shape),
+        'water_pixels': water_count,
+        'offset': offset,
+        'step': step,
+        'keyframe_interval': keyframe_interval,
+        'codec': codec,
+        'frames': [],
+        **metadata,
+    }
+
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+
+        mask_block = compress(np.packbits(mask_flat).tobytes())
+        index['mask'] = [f.tell(), len(mask_block)]
+        f.write(mask_block)
+
+        previous = None
+        for frame_number, (timestamp, grid_values) in enumerate(frames):
+            current = quantize(grid_values.reshape(-1)[mask_flat], offset, step)
+            is_keyframe = previous is None or frame_number % keyframe_interval == 0
+            # uint16-subtraktion wrappar modulo 2^16 och återställs exakt vid avkodning
+            payload = current if is_keyframe else current - previous
+            block = compress(_shuffle(payload))
+
+            index['frames'].append({
+                'timestamp': timestamp,
+                'keyframe': is_keyframe,
+                'position': [f.tell(), len(block)],
+            })
+            f.write(block)
+            previous = current
+
+        index_bytes = json.dumps(index, separators=(',', ':')).encode('utf-8')
+        index_position = f.tell()
+        f.write(index_bytes)
+        f.write(struct.pack('<Q', index_position))
+        f.write(MAGIC)
+
+    tmp_path.replace(output_path)
+    return index
+
+def open_frame_pack(path):
+    """Läs indexet och masken. Returnerar ett pack-objekt (dict) för decode_frame."""
+    with open(path, 'rb') as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f"{path} är inte en frame pack")
+        f.seek(-12, io.SEEK_END)
+        index_position = struct.unpack('<Q', f.read(8))[0]
+        if f.read(4) != MAGIC:
+            raise ValueError(f"{path} är trunkerad (saknar index)")
+        end = f.seek(-12, io.SEEK_END)
+        f.seek(index_position)
+        index = json.loads(f.read(end - index_position).decode('utf-8'))
+
+        _, decompress = CODECS[index['codec']]
+        mask_start, mask_length = index['mask']
+        f.seek(mask_start)
+        pixels = index['shape'][0] * index['shape'][1]
+        mask_bits = np.frombuffer(decompress(f.read(mask_length)), dtype=np.uint8)
+        mask = np.unpackbits(mask_bits, count=pixels).astype(bool)
+
+    return {
+        'path': Path(path),
+        'index': index,
+        'mask': mask,
+        'timestamps': [frame['timestamp'] for frame in index['frames']],
+        # Senast avkodade bildruta (för snabb sekventiell avkodning)
+        'last': None,
+    }
+
+def _read_payload(f, pack, frame_number):
+    """Läs och packa upp en bildrutas uint16-värden (nyckelruta eller delta)"""
+    _, decompress = CODECS[pack['index']['codec']]
+    start, length = pack['index']['frames'][frame_number]['position']
+    f.seek(start)
+    return _unshuffle(decompress(f.read(length)), pack['index']['water_pixels'])
+
+def decode_quantized(pack, frame_number):
+    """Återställ kvantiserade vattenvärden för en bildruta från närmaste nyckelruta"""
+    frames = pack['index']['frames']
+    start = frame_number
+    while not frames[start]['keyframe']:
+        start -= 1
+    values = None
+
+    # Fortsätt från senast avkodade bildruta om den ligger mellan nyckelrutan och målet
+    last = pack['last']
+    if last is not None and start <= last[0] <= frame_number:
+        start, values = last[0], last[1].copy()
+
+    with open(pack['path'], 'rb') as f:
+        if values is None:
+            values = _read_payload(f, pack, start).copy()
+        for number in range(start + 1, frame_number + 1):
+            values += _read_payload(f, pack, number)
+
+    pack['last'] = (frame_number, values)
+    return values
+
+def decode_frame(pack, frame_number):
+    """Avkoda en bildruta till float32-grid (NaN utanför vatten och där data saknas)"""
+    index = pack['index']
+    grid_values = np.full(index['shape'][0] * index['shape'][1], np.nan, dtype=np.float32)
+    grid_values[pack['mask']] = dequantize(decode_quantized(pack, frame_number), index['offset'], index['step'])
+    return grid_values.reshape(index['shape'])
+
+def generate_grids(arrays, used_points, parameter, water_mask_grid, bbox, method, timestamps):
+    """Generator av (timestamp, maskad grid) i samma ordning som körningen"""
+    lons = arrays['lons'][used_points]
+    lats = arrays['lats'][used_points]
+    matrix = parameter_values(arrays, parameter)[used_points]
+
+    for t, timestamp in enumerate(timestamps):
+        valid = np.isfinite(matrix[:, t])
+        if np.count_nonzero(valid) < 3:
+            grid_values = np.full(water_mask_grid.shape, np.nan, dtype=np.float32)
+        else:
+            grid_values = compute_grid_low_memory(
+                lons[valid], lats[valid], matrix[valid, t], water_mask_grid,
+                bbox, parameter, water_mask_grid.shape[0], method
+            )
+        yield timestamp, grid_values
+
+def measure_against_png(pack, parameter, water_coverage, sample_frames=10, png_dir=None):
+    """
+    Jämför storlek och avkodningstid mot PNG per bildruta. Utan png_dir renderas
+    PNG-bilderna från pack-innehållet med samma färgsättning som lågminnesläget.
+    """
+    from PIL import Image
+
+    index = pack['index']
+    frame_count = len(index['frames'])
+    pack_size = pack['path'].stat().st_size
+    result = {'frames': frame_count, 'pack_bytes': pack_size}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if png_dir is None:
+            cmap, vmin, vmax = create_colormap(parameter)
+            png_paths = []
+            for number in range(frame_count):
+                png_path = Path(tmp) / f"frame_{number:03d}.png"
+                rgba = colorize_grid_rgba(decode_frame(pack, number), cmap, vmin, vmax,
+                                          index['shape'][0], coverage=water_coverage)
+                save_rgba_png(rgba, png_path)
+                png_paths.append(png_path)
+        else:
+            png_paths = sorted(Path(png_dir).glob('*.png'))
+
+        png_size = sum(path.stat().st_size for path in png_paths)
+        result['png_bytes'] = png_size
+        result['png_files'] = len(png_paths)
+
+        rng = np.random.default_rng(0)
+        samples = rng.choice(frame_count, size=min(sample_frames, frame_count), replace=False)
+
+        start = time.perf_counter()
+        for number in samples:
+            pack['last'] = None
+            decode_frame(pack, int(number))
+        result['pack_random_decode_ms'] = 1000 * (time.perf_counter() - start) / len(samples)
+
+        pack['last'] = None
+        start = time.perf_counter()
+        for number in range(frame_count):
+            decode_frame(pack, number)
+        result['pack_sequential_decode_ms'] = 1000 * (time.perf_counter() - start) / frame_count
+
+        png_samples = [png_paths[int(n) % len(png_paths)] for n in samples] if png_paths else []
+        start = time.perf_counter()
+        for path in png_samples:
+            with Image.open(path) as image:
+                np.asarray(image)
+        result['png_decode_ms'] = 1000 * (time.perf_counter() - start) / max(1, len(png_samples))
+
+    return result
+
+def print_measurements(result):
+    """Skriv ut jämförelsen mot PNG"""
+    ratio = result['png_bytes'] / result['pack_bytes'] if result['pack_bytes'] else float('nan')
+    print(f"\n📏 {result['frames']} bildrutor:")
+    print(f"   📦 Frame pack: {result['pack_bytes'] / 1024:.0f} KB")
+    print(f"   🖼️ PNG: {result['png_bytes'] / 1024:.0f} KB i {result['png_files']} filer "
+          f"({ratio:.1f}x större)")
+    print(f"   ⏱️ Avkodning: pack {result['pack_random_decode_ms']:.1f} ms (slumpvis), "
+          f"{result['pack_sequential_decode_ms']:.1f} ms (sekventiellt), PNG {result['png_decode_ms']:.1f} ms")
+
+def encode_command(args):
+    """Interpolera körningens griddar och skriv frame packs"""
+    parameters = ['current', 'temperature', 'salinity'] if args.parameter == 'all' else [args.parameter]
+    bbox = DEFAULT_BBOX
+
+    geometry_resolution = max(args.resolution, args.mask_master_resolution)
+    water_polygons = load_clipped_water_polygons(args.water_mask, bbox, geometry_resolution, args.cache_dir)
+    water_coverage = load_water_coverage(
+        water_polygons, bbox, args.resolution, args.water_mask,
+        args.mask_master_resolution, args.cache_dir
+    )
+    water_mask_grid = water_mask_from_coverage(water_coverage)
+
+    area_data = load_area_parameters(args.input)
+    arrays = load_forecast_arrays(area_data)
+    del area_data
+    used_points = points_in_water(arrays['lons'], arrays['lats'], water_polygons)
+    del water_polygons
+
+    timestamps = arrays['timestamps'][:args.max_images] if args.max_images else arrays['timestamps']
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for parameter in parameters:
+        config = get_parameter_config(parameter)
+        offset, step = quantization_for_parameter(parameter)
+        output_path = output_dir / f"{config['name_en']}.mkfp"
+        print(f"\n🗜️ Packar {len(timestamps)} {config['name']}-griddar till {output_path} "
+              f"(steg {step:.4f} {config['unit']}, nyckelruta var {args.keyframe_interval}:e, {args.codec})")
+
+        metadata = {
+            'parameter': parameter,
+            'unit': config['unit'],
+            'bbox': list(bbox),
+            'interpolation_method': args.method,
+            'generated_at': datetime.now().isoformat(),
+        }
+        write_frame_pack(
+            output_path,
+            generate_grids(arrays, used_points, parameter, water_mask_grid, bbox, args.method, timestamps),
+            water_mask_grid, metadata, offset, step, args.keyframe_interval, args.codec
+        )
+        print(f"✅ {output_path} ({output_path.stat().st_size / 1024:.0f} KB)")
+
+        if args.measure:
+            pack = open_frame_pack(output_path)
+            print_measurements(measure_against_png(pack, parameter, water_coverage, png_dir=args.compare_png_dir))
+
+def decode_command(args):
+    """Avkoda en bildruta till PNG eller .npy"""
+    pack = open_frame_pack(args.pack)
+    timestamps = pack['timestamps']
+    frame_number = timestamps.index(args.timestamp) if args.timestamp else args.frame
+    grid_values = decode_frame(pack, frame_number)
+
+    if args.output.endswith('.npy'):
+        np.save(args.output, grid_values)
+    else:
+        cmap, vmin, vmax = create_colormap(pack['index']['parameter'])
+        rgba = colorize_grid_rgba(grid_values, cmap, vmin, vmax, grid_values.shape[0])
+        save_rgba_png(rgba, args.output)
+    print(f"✅ Bildruta {frame_number} ({timestamps[frame_number]}) sparad i {args.output}")
+
+def measure_command(args):
+    """Mät befintlig pack mot PNG-bilder"""
+    pack = open_frame_pack(args.pack)
+    print_measurements(measure_against_png(pack, pack['index']['parameter'], None, png_dir=args.compare_png_dir))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Deltakomprimerade frame packs för arkivering av prognoskörningar')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    encode = subparsers.add_parser('encode', help='Interpolera och packa en hel körning')
+    encode.add_argument('--parameter', choices=['current', 'temperature', 'salinity', 'all'], default='all',
+                       help='Parameter att packa (default: all)')
+    encode.add_argument('--input', default='public/data/area-parameters-extended.json.gz',
+                       help='Sökväg till komprimerad area-parameters fil')
+    encode.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Sökväg till vattenmask GeoJSON')
+    encode.add_argument('--output-dir', default='frame-packs',
+                       help='Katalog för .mkfp-filer (default: frame-packs)')
+    encode.add_argument('--resolution', type=int, default=1200,
+                       help='Grid-upplösning (default: 1200x1200)')
+    encode.add_argument('--max-images', type=int, default=None,
+                       help='Maximal antal tidssteg (för testning)')
+    encode.add_argument('--method', choices=list(INTERPOLATION_BACKENDS), default=DEFAULT_METHOD,
+                       help=f'Interpolationsmetod (default: {DEFAULT_METHOD})')
+    encode.add_argument('--keyframe-interval', type=int, default=DEFAULT_KEYFRAME_INTERVAL,
+                       help=f'Nyckelruta var N:e bildruta (default: {DEFAULT_KEYFRAME_INTERVAL})')
+    encode.add_argument('--codec', choices=list(CODECS), default='zlib',
+                       help='Komprimering av blocken (default: zlib)')
+    encode.add_argument('--measure', action='store_true',
+                       help='Jämför storlek och avkodningstid mot PNG per bildruta')
+    encode.add_argument('--compare-png-dir', default=None,
+                       help='Befintliga PNG-bilder att jämföra mot (annars renderas de från packen)')
+    encode.add_argument('--mask-master-resolution', type=int, default=DEFAULT_MASTER_RESOLUTION,
+                       help=f'Upplösning för master-rastern (default: {DEFAULT_MASTER_RESOLUTION})')
+    encode.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+    encode.set_defaults(handler=encode_command)
+
+    decode = subparsers.add_parser('decode', help='Avkoda en bildruta')
+    decode.add_argument('pack', help='Sökväg till .mkfp-fil')
+    decode.add_argument('--frame', type=int, default=0, help='Bildrutans nummer (default: 0)')
+    decode.add_argument('--timestamp', default=None, help='Bildrutans tidsstämpel (istället för --frame)')
+    decode.add_argument('--output', required=True, help='Utfil (.png eller .npy)')
+    decode.set_defaults(handler=decode_command)
+
+    measure = subparsers.add_parser('measure', help='Jämför en pack mot PNG-bilder')
+    measure.add_argument('pack', help='Sökväg till .mkfp-fil')
+    measure.add_argument('--compare-png-dir', default=None,
+                        help='Befintliga PNG-bilder (annars renderas de från packen)')
+    measure.set_defaults(handler=measure_command)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Trådad pipeline för bildrutor: interpolation → färgsättning → PNG-kodning/skrivning.
+
+Varje steg körs i egna trådar och stegen kopplas med begränsade köer, så att
+interpolation av bildruta N+1 överlappar färgsättning och PNG-kodning av
+bildruta N utan att fler än ett fåtal bildrutor ligger i minnet samtidigt.
+numpy, zlib och Pillow släpper GIL:en under det tunga arbetet.
+
+Per steg mäts arbetstid, väntan på indata (steget svälter) och väntan på plats
+i nästa kö (steget blockeras av ett långsammare steg efter), så att flaskhalsen syns.
+"""
+
+import time
+import queue
+import threading
+
+# Markerar att inga fler bildrutor kommer
+_DONE = object()
+
+def _new_stats(name, threads):
+    return {'name': name, 'threads': threads, 'items': 0, 'busy_s': 0.0,
+            'wait_input_s': 0.0, 'wait_output_s': 0.0, 'errors': 0}
+
+def run_pipeline(items, stages, queue_size=2, on_result=None):
+    """
+    Kör items genom stages = [(namn, funktion, antal trådar), ...].
+    Varje funktion tar föregående stegs resultat; första steget tar själva item.
+    Ett undantag i ett steg loggas och bildrutan hoppas över i resten av kedjan (resultat None).
+    on_result(item, resultat) anropas när en bildruta har passerat sista steget.
+    Returnerar (resultat i items ordning, statistik per steg, väggtid).
+    """
+    items = list(items)
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    stats = [_new_stats(name, threads) for name, _, threads in stages]
+    results = [None] * len(items)
+    lock = threading.Lock()
+
+    def worker(stage_index, function, remaining):
+        inbox, outbox = queues[stage_index], queues[stage_index + 1]
+        stage_stats = stats[stage_index]
+        while True:
+            start = time.perf_counter()
+            message = inbox.get()
+            waited = time.perf_counter() - start
+
+            if message is _DONE:
+                with lock:
+                    stage_stats['wait_input_s'] += waited
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                # Sista tråden i steget skickar vidare slutmarkeringen
+                if last:
+                    outbox.put(_DONE)
+                return
+
+            index, payload = message
+            start = time.perf_counter()
+            if payload is not None:
+                try:
+                    payload = function(payload)
+                except Exception as e:
+                    print(f"❌ Steg {stage_stats['name']} misslyckades för bildruta {index + 1}: {e}")
+                    payload = None
+                    with lock:
+                        stage_stats['errors'] += 1
+            busy = time.perf_counter() - start
+
+            start = time.perf_counter()
+            outbox.put((index, payload))
+            blocked = time.perf_counter() - start
+
+            with lock:
+                stage_stats['items'] += 1
+                stage_stats['busy_s'] += busy
+                stage_stats['wait_input_s'] += waited
+                stage_stats['wait_output_s'] += blocked
+
+    started = time.perf_counter()
+    threads = []
+    for stage_index, (_, function, thread_count) in enumerate(stages):
+        remaining = [thread_count]
+        for _ in range(thread_count):
+            thread = threading.Thread(target=worker, args=(stage_index, function, remaining), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    def feed():
+        for index, item in enumerate(items):
+            queues[0].put((index, item))
+        for _ in range(stages[0][2]):
+            queues[0].put(_DONE)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    # Huvudtråden tömmer sista kön
+    while True:
+        message = queues[-1].get()
+        if message is _DONE:
+            break
+        index, payload = message
+        results[index] = payload
+        if on_result is not None:
+            on_result(items[index], payload)
+
+    feeder.join()
+    for thread in threads:
+        thread.join()
+    return results, stats, time.perf_counter() - started
+
+def report_utilization(stats, wall_seconds):
+    """Skriv ut beläggning per steg; steget med högst beläggning är flaskhalsen"""
+    if wall_seconds <= 0:
+        return
+    print(f"   🏭 Pipeline: {wall_seconds:.1f} s väggtid")
+    utilizations = []
+    for stage in stats:
+        capacity = wall_seconds * stage['threads']
+        utilization = stage['busy_s'] / capacity
+        utilizations.append(utilization)
+        print(f"      {stage['name']:14} {100*utilization:5.1f}% beläggning, "
+              f"{stage['busy_s'] / max(1, stage['items']):.2f} s/bildruta, "
+              f"väntar på indata {stage['wait_input_s']:.1f} s, blockerad av nästa steg {stage['wait_output_s']:.1f} s"
+              + (f", {stage['errors']} fel" if stage['errors'] else ''))
+    bottleneck = stats[utilizations.index(max(utilizations))]['name']
+    print(f"      🔎 Flaskhals: {bottleneck}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Statistik per bildruta för metadata.json.
+
+För varje färdig grid (samma pixlar som bilden) beräknas min, max, medel,
+5/95-percentiler, antal vattenpixlar med data, andelen vattenpixlar som
+fylldes av fallback (nearest eller Laplace) och ett histogram med fasta fack
+över färgskalans spann. Allt räknas på en enda utplockad array med
+datapixlarna. Frontend kan därmed skala legender och visa sammanfattningar
+utan att ladda ner eller avkoda någon bild.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+# Antal histogramfack över färgskalans spann (värden utanför hamnar i ytterfacken)
+HISTOGRAM_BINS = 32
+
+# Decimaler i metadata.json
+STATISTICS_DECIMALS = 4
+
+def _rounded(value):
+    return round(float(value), STATISTICS_DECIMALS)
+
+def grid_statistics(grid_values, value_range, filled_share=None, bins=HISTOGRAM_BINS):
+    """Statistik för en grid (NaN = ingen data) med histogram över value_range = (vmin, vmax)"""
+    valid = grid_values[~np.isnan(grid_values)]
+    if valid.size == 0:
+        return {'water_pixels': 0, 'filled_share': filled_share, 'histogram': [0] * bins}
+
+    vmin, vmax = value_range
+    p5, p95 = np.percentile(valid, [5, 95])
+    counts, _ = np.histogram(np.clip(valid, vmin, vmax), bins=bins, range=(vmin, vmax))
+    return {
+        'min': _rounded(valid.min()),
+        'max': _rounded(valid.max()),
+        'mean': _rounded(valid.mean(dtype=np.float64)),
+        'p5': _rounded(p5),
+        'p95': _rounded(p95),
+        'water_pixels': int(valid.size),
+        'filled_share': None if filled_share is None else _rounded(filled_share),
+        'histogram': counts.tolist(),
+    }
+
+def summarize_statistics(frames):
+    """Sammanfattning över alla bildrutor: extremvärden, percentilspann, viktat medel och summerat histogram"""
+    frames = [frame for frame in frames if frame.get('water_pixels')]
+    if not frames:
+        return None
+
+    pixels = np.array([frame['water_pixels'] for frame in frames], dtype=np.float64)
+    return {
+        'min': min(frame['min'] for frame in frames),
+        'max': max(frame['max'] for frame in frames),
+        'p5': min(frame['p5'] for frame in frames),
+        'p95': max(frame['p95'] for frame in frames),
+        'mean': _rounded(np.dot(pixels, [frame['mean'] for frame in frames]) / pixels.sum()),
+        'histogram': np.sum([frame['histogram'] for frame in frames], axis=0).tolist(),
+    }
+
+def statistics_metadata(frame_statistics, value_range, bins=HISTOGRAM_BINS):
+    """Statistikblocket i metadata.json (frames: tidsstämpel → statistik)"""
+    return {
+        'histogram_range': list(value_range),
+        'histogram_bins': bins,
+        'summary': summarize_statistics(frame_statistics.values()),
+        'frames': frame_statistics,
+    }
+
+def load_frame_statistics(metadata_path, value_range, bins=HISTOGRAM_BINS):
+    """
+    Statistik per bildruta (tidsstämpel → statistik) ur en tidigare skriven metadata.json,
+    för bildrutor som återanvänds utan att renderas om. Tom om filen saknas eller om
+    histogrammet gällde ett annat spann eller antal fack.
+    """
+    metadata_path = Path(metadata_path)
+    if not metadata_path.exists():
+        return {}
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            statistics = json.load(f).get('statistics') or {}
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if statistics.get('histogram_range') != list(value_range) or statistics.get('histogram_bins') != bins:
+        return {}
+    return statistics.get('frames') or {}
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Script för att generera färdigrenderade strömpil-bilder (pilar eller strömlinjer).
+
+u och v interpoleras var för sig med samma backend, edge points och nearest-fallback
+som strömstyrkebilderna, och pilarna glesas ut per zoomnivå så att avståndet
+mellan pilarna blir ungefär konstant i skärmpixlar. Bilderna ritas i Web Mercator-
+proportioner (konform projektion) så att pilarnas riktning stämmer på kartan.
+Frontend behöver då inte räkna några vektorer alls.
+"""
+
+import json
+import argparse
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+
+from forecast_arrays import load_area_parameters, load_forecast_arrays, current_magnitude
+from interpolation_backends import create_interpolator, INTERPOLATION_BACKENDS, DEFAULT_METHOD
+from low_memory_grid import create_edge_points
+from mercator_remap import mercator_y, inverse_mercator_y
+from parallel_frames import run_frames
+from water_mask import (
+    load_clipped_water_polygons, points_in_water, load_water_coverage,
+    DEFAULT_BBOX, DEFAULT_MASTER_RESOLUTION, DEFAULT_CACHE_DIR, file_fingerprint
+)
+from generate_marine_parameter_images import create_colormap, remove_stale_images, CURRENT_COLORMAP
+from image_manifest import publish_frame, published_entry, ordered_manifest
+from run_journal import build_run_key, write_json_atomic, FORCE_HELP
+
+# Kartplattornas storlek i pixlar (MapLibre/Web Mercator)
+TILE_SIZE = 256
+
+# Zoomnivåer som får egna bilder (glesare pilar vid lägre zoom)
+DEFAULT_ZOOM_LEVELS = [6, 7, 8, 9]
+
+# Önskat avstånd mellan pilar på skärmen
+DEFAULT_ARROW_SPACING_PX = 40
+
+# Pillängd som andel av pilavståndet
+ARROW_LENGTH_FRACTION = 0.7
+
+# Pilar med lägre strömstyrka ritas inte (samma gräns som CurrentVectorsLayer)
+MIN_ARROW_MAGNITUDE = 0.01
+
+# Andel vatten som krävs i pixeln under en pil/strömlinje
+WATER_COVERAGE_THRESHOLD = 0.5
+
+def zoom_layout(bbox, zoom, spacing_px, max_width):
+    """
+    Bildstorlek och pilavstånd för en zoomnivå.
+    Bilden får samma proportioner som bbox i Web Mercator och begränsas till max_width.
+    """
+    lon_min, lon_max, lat_min, lat_max = bbox
+    lon_span = lon_max - lon_min
+    y_span = mercator_y(lat_max) - mercator_y(lat_min)
+
+    screen_width = TILE_SIZE * 2**zoom * lon_span / 360
+    image_scale = min(1.0, max_width / screen_width)
+    width = int(round(screen_width * image_scale))
+    height = int(round(width * y_span / lon_span))
+
+    return {
+        'zoom': zoom,
+        'width': width,
+        'height': height,
+        # Avstånd mellan pilar i grader (lon och mercator-y) och i bildpixlar
+        'spacing_deg': spacing_px * 360 / (TILE_SIZE * 2**zoom),
+        'spacing_image_px': spacing_px * image_scale,
+    }
+
+def arrow_positions(bbox, spacing_deg):
+    """Regelbundet pilgitter i (lon, mercator-y), förskjutet ett halvt steg från kanterna"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    xs = np.arange(lon_min + spacing_deg / 2, lon_max, spacing_deg)
+    ys = np.arange(mercator_y(lat_min) + spacing_deg / 2, mercator_y(lat_max), spacing_deg)
+    x_mesh, y_mesh = np.meshgrid(xs, ys)
+    return x_mesh.ravel(), y_mesh.ravel()
+
+def water_at(lons, lats, water_coverage, bbox):
+    """Slå upp vattenandel i täckningsrastern (närmaste pixel) för godtyckliga koordinater"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    resolution = water_coverage.shape[0]
+    cols = np.rint((lons - lon_min) / (lon_max - lon_min) * (resolution - 1)).astype(np.intp)
+    rows = np.rint((lats - lat_min) / (lat_max - lat_min) * (resolution - 1)).astype(np.intp)
+    np.clip(cols, 0, resolution - 1, out=cols)
+    np.clip(rows, 0, resolution - 1, out=rows)
+    return water_coverage[rows, cols] >= WATER_COVERAGE_THRESHOLD
+
+def create_vector_interpolator(lons, lats, u, v, bbox, method):
+    """
+    Interpolera u och v var för sig (edge points + vald metod + nearest-fallback).
+    Returnerar en funktion xi (M, 2) → (u, v).
+    """
+    components = []
+    for values in (u, v):
+        edge_lons, edge_lats, edge_values = create_edge_points(lons, lats, values, bbox)
+        points = np.column_stack([np.concatenate([lons, edge_lons]), np.concatenate([lats, edge_lats])])
+        point_values = np.concatenate([values, edge_values])
+        components.append((
+            create_interpolator(method, points, point_values),
+            create_interpolator('nearest', points, point_values),
+        ))
+
+    def evaluate(xi):
+        result = []
+        for interpolator, nearest in components:
+            component = np.asarray(interpolator(xi), dtype=np.float64)
+            missing = ~np.isfinite(component)
+            if np.any(missing):
+                component[missing] = nearest(xi[missing])
+            result.append(component)
+        return result[0], result[1]
+    return evaluate
+
+def draw_arrows(ax, x, y, u, v, magnitude, layout, cmap, norm):
+    """Pilar med fast längd, färgade efter strömstyrka"""
+    spacing = layout['spacing_image_px']
+    # Enhetsvektorer; quiver med angles='uv' ritar riktningen i bildpixlar,
+    # vilket är rätt eftersom bilden har Mercator-proportioner
+    ax.quiver(
+        x, y, u / magnitude, v / magnitude, magnitude,
+        cmap=cmap, norm=norm, angles='uv',
+        scale_units='dots', scale=1.0 / (ARROW_LENGTH_FRACTION * spacing),
+        units='dots', width=max(1.0, 0.06 * spacing),
+        headwidth=3.5, headlength=4, headaxislength=3.5, pivot='middle'
+    )
+
+def draw_streamlines(ax, evaluate, bbox, layout, water_coverage, cmap, norm):
+    """Strömlinjer på ett regelbundet (lon, mercator-y)-gitter, maskade till vatten"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    # Ett gitterssteg per fjärdedels pilavstånd räcker för jämna linjer
+    step = layout['spacing_deg'] / 4
+    xs = np.linspace(lon_min, lon_max, max(2, int(round((lon_max - lon_min) / step)) + 1))
+    ys = np.linspace(mercator_y(lat_min), mercator_y(lat_max),
+                     max(2, int(round((mercator_y(lat_max) - mercator_y(lat_min)) / step)) + 1))
+    x_mesh, y_mesh = np.meshgrid(xs, ys)
+    lat_mesh = inverse_mercator_y(y_mesh)
+
+    u, v = evaluate(np.column_stack([x_mesh.ravel(), lat_mesh.ravel()]))
+    land = ~water_at(x_mesh.ravel(), lat_mesh.ravel(), water_coverage, bbox)
+    u = np.ma.masked_array(u, land).reshape(x_mesh.shape)
+    v = np.ma.masked_array(v, land).reshape(x_mesh.shape)
+    magnitude = np.ma.masked_array(current_magnitude(u, v), land.reshape(x_mesh.shape))
+
+    # streamplot: density 1 ≈ 30 linjer över bilden
+    density = (layout['width'] / layout['spacing_image_px'] / 30,
+               layout['height'] / layout['spacing_image_px'] / 30)
+    ax.streamplot(
+        xs, ys, u, v, color=magnitude, cmap=cmap, norm=norm, density=density,
+        linewidth=max(0.6, 0.03 * layout['spacing_image_px']), arrowsize=0.8
+    )
+
+def create_vector_image(evaluate, water_coverage, bbox, layout, style, output_path):
+    """Rendera pil- eller strömlinjebild för en zoomnivå"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.colors as colors
+    
+    lon_min, lon_max, lat_min, lat_max = bbox
+    cmap, vmin, vmax = create_colormap('current')
+    norm = colors.Normalize(vmin=vmin, vmax=vmax, clip=True)
+
+    dpi = 100
+    fig = plt.figure(figsize=(layout['width'] / dpi, layout['height'] / dpi), dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(lon_min, lon_max)
+    ax.set_ylim(mercator_y(lat_min), mercator_y(lat_max))
+    ax.axis('off')
+
+    arrow_count = 0
+    if style == 'arrows':
+        x, y = arrow_positions(bbox, layout['spacing_deg'])
+        lats = inverse_mercator_y(y)
+        in_water = water_at(x, lats, water_coverage, bbox)
+        x, y, lats = x[in_water], y[in_water], lats[in_water]
+
+        u, v = evaluate(np.column_stack([x, lats]))
+        magnitude = current_magnitude(u, v)
+        visible = magnitude >= MIN_ARROW_MAGNITUDE
+        arrow_count = int(np.count_nonzero(visible))
+        if arrow_count:
+            draw_arrows(ax, x[visible], y[visible], u[visible], v[visible], magnitude[visible],
+                        layout, cmap, norm)
+    else:
+        draw_streamlines(ax, evaluate, bbox, layout, water_coverage, cmap, norm)
+
+    fig.savefig(output_path, format='png', dpi=dpi, transparent=True, facecolor='none')
+    plt.close(fig)
+    return arrow_count
+
+def render_vector_frame(context, task):
+    """Rendera alla zoomnivåer för ett tidssteg (körs i arbetsprocess när --workers > 1)"""
+    time_index, timestamp, output_paths = task
+    print(f"\n🏹 Bearbetar {time_index+1}/{context['total']}: {timestamp}")
+
+    u = context['u'][:, time_index]
+    v = context['v'][:, time_index]
+    valid = np.isfinite(u) & np.isfinite(v)
+    if np.count_nonzero(valid) < 3:
+        print(f"⚠️ Ingen strömdata för {timestamp}")
+        return False
+
+    try:
+        evaluate = create_vector_interpolator(
+            context['lons'][valid], context['lats'][valid], u[valid], v[valid],
+            context['bbox'], context['method']
+        )
+        for layout in context['layouts']:
+            arrow_count = create_vector_image(
+                evaluate, context['water_coverage'], context['bbox'], layout,
+                context['style'], output_paths[layout['zoom']]
+            )
+            detail = f"{arrow_count} pilar" if context['style'] == 'arrows' else 'strömlinjer'
+            print(f"   ✅ z{layout['zoom']}: {layout['width']}x{layout['height']} px, {detail}")
+    except Exception as e:
+        print(f"❌ Rendering misslyckades för {timestamp}: {e}")
+        return False
+
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generera färdigrenderade strömpil-bilder per zoomnivå')
+    parser.add_argument('--input', default='public/data/area-parameters-extended.json.gz',
+                       help='Sökväg till komprimerad area-parameters fil')
+    parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Sökväg till vattenmask GeoJSON')
+    parser.add_argument('--output-dir', default='public/data/current-vector-images',
+                       help='Output directory för bilder (en undermapp per zoomnivå)')
+    parser.add_argument('--max-images', type=int, default=None,
+                       help='Maximal antal tidssteg att generera (för testning)')
+    parser.add_argument('--style', choices=['arrows', 'streamlines'], default='arrows',
+                       help='Pilar på ett glesat gitter eller strömlinjer (default: arrows)')
+    parser.add_argument('--zoom-levels', default=','.join(str(z) for z in DEFAULT_ZOOM_LEVELS),
+                       help=f'Kommaseparerade zoomnivåer (default: {",".join(str(z) for z in DEFAULT_ZOOM_LEVELS)})')
+    parser.add_argument('--arrow-spacing-px', type=float, default=DEFAULT_ARROW_SPACING_PX,
+                       help=f'Avstånd mellan pilar i skärmpixlar (default: {DEFAULT_ARROW_SPACING_PX})')
+    parser.add_argument('--max-width', type=int, default=2400,
+                       help='Max bildbredd i pixlar, högre zoomnivåer skalas ned (default: 2400)')
+    parser.add_argument('--resolution', type=int, default=1200,
+                       help='Upplösning för vattenmasken som pilarna maskas mot (default: 1200)')
+    parser.add_argument('--method', choices=list(INTERPOLATION_BACKENDS), default=DEFAULT_METHOD,
+                       help=f'Interpolationsmetod för u och v (default: {DEFAULT_METHOD})')
+    parser.add_argument('--mask-master-resolution', type=int, default=DEFAULT_MASTER_RESOLUTION,
+                       help=f'Upplösning för master-rastern (default: {DEFAULT_MASTER_RESOLUTION})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Antal processer för parallell rendering av tidssteg (default: 1)')
+    parser.add_argument('--force', action='store_true', help=FORCE_HELP)
+
+    args = parser.parse_args(argv)
+    zoom_levels = [int(z) for z in args.zoom_levels.split(',') if z.strip()]
+    bbox = DEFAULT_BBOX
+
+    print("🏹 STRÖMPIL BILDGENERATOR")
+    print("=" * 50)
+    print(f"🎨 Stil: {args.style}, zoomnivåer: {zoom_levels}, pilavstånd: {args.arrow_spacing_px:.0f} px")
+    print(f"🗺️ Bounding box: {bbox}")
+
+    # Samma vattenmask och punkturval som strömstyrkebilderna
+    geometry_resolution = max(args.resolution, args.mask_master_resolution)
+    water_polygons = load_clipped_water_polygons(args.water_mask, bbox, geometry_resolution, args.cache_dir)
+    water_coverage = load_water_coverage(
+        water_polygons, bbox, args.resolution, args.water_mask,
+        args.mask_master_resolution, args.cache_dir
+    )
+
+    area_data = load_area_parameters(args.input)
+    arrays = load_forecast_arrays(area_data)
+    del area_data
+
+    lons, lats = arrays['lons'], arrays['lats']
+    used = points_in_water(lons, lats, water_polygons)
+    del water_polygons
+    print(f"✅ {np.count_nonzero(used)} vattenpunkter av {lons.size} totalt")
+
+    layouts = [zoom_layout(bbox, zoom, args.arrow_spacing_px, args.max_width) for zoom in zoom_levels]
+    output_dir = Path(args.output_dir)
+    for zoom in zoom_levels:
+        (output_dir / f"z{zoom}").mkdir(parents=True, exist_ok=True)
+
+    all_timestamps = arrays['timestamps']
+    timestamps = all_timestamps
+    if args.max_images:
+        timestamps = timestamps[:args.max_images]
+        print(f"🔬 Begränsar till {args.max_images} tidssteg för testning")
+
+    # Bildmanifest per zoomnivå (tidsstämpel → fil med innehållshash i namnet, se image_manifest);
+    # förra körningens bilder återanvänds bara om de gjordes från samma indata och inställningar
+    run_key = build_run_key(
+        args.input, water_mask=file_fingerprint(args.water_mask), style=args.style, zoom_levels=zoom_levels,
+        arrow_spacing_px=args.arrow_spacing_px, max_width=args.max_width, resolution=args.resolution,
+        method=args.method, mask_master_resolution=args.mask_master_resolution
+    )
+    metadata_path = output_dir / "metadata.json"
+    previous_manifests = {}
+    if metadata_path.exists() and not args.force:
+        with open(metadata_path, 'r') as f:
+            previous_metadata = json.load(f)
+        if previous_metadata.get('run_key') == run_key:
+            previous_manifests = {
+                level['zoom']: level.get('images') or {} for level in previous_metadata.get('zoom_levels', [])
+            }
+        else:
+            print("🔄 Indata eller inställningar har ändrats sedan förra körningen, renderar om alla bilder")
+    manifests = {zoom: {} for zoom in zoom_levels}
+
+    successful_count = 0
+    tasks = []
+    for i, timestamp in enumerate(timestamps):
+        safe_timestamp = timestamp.replace(':', '-').replace('+', 'plus')
+        output_paths = {
+            zoom: output_dir / f"z{zoom}" / f"current_vectors_{safe_timestamp}.png"
+            for zoom in zoom_levels
+        }
+        existing = {
+            zoom: published_entry(previous_manifests.get(zoom, {}), timestamp, output_dir / f"z{zoom}")
+            for zoom in zoom_levels
+        }
+        if all(entry is not None for entry in existing.values()):
+            print(f"⏭️ Hoppar över befintliga bilder för {timestamp}")
+            successful_count += 1
+            for zoom, entry in existing.items():
+                manifests[zoom][timestamp] = entry
+            continue
+        tasks.append((i, timestamp, output_paths))
+
+    # Delad kontext för alla tidssteg (bara vattenpunkterna skickas till arbetsprocesserna)
+    context = {
+        'total': len(timestamps),
+        'lons': lons[used],
+        'lats': lats[used],
+        'u': arrays['u'][used].astype(np.float32),
+        'v': arrays['v'][used].astype(np.float32),
+        'water_coverage': water_coverage,
+        'bbox': bbox,
+        'method': args.method,
+        'style': args.style,
+        'layouts': layouts,
+    }
+    del arrays
+
+    def publish_frames(task, result):
+        if result:
+            _, timestamp, output_paths = task
+            for zoom, output_path in output_paths.items():
+                manifests[zoom][timestamp] = publish_frame(output_path)
+
+    results = run_frames(render_vector_frame, tasks, context, args.workers, on_result=publish_frames)
+    successful_count += sum(1 for success in results if success)
+    for zoom in zoom_levels:
+        remove_stale_images(output_dir / f"z{zoom}", {entry['file'] for entry in manifests[zoom].values()})
+
+    print(f"\n🎉 Klar! Genererade bilder för {successful_count}/{len(timestamps)} tidssteg")
+    print(f"📁 Bilder sparade i: {output_dir.absolute()}")
+
+    metadata = {
+        "parameter": "current_vectors",
+        "style": args.style,
+        "bbox": bbox,
+        "projection": "EPSG:3857",
+        "run_key": run_key,
+        "total_images": successful_count,
+        "timestamps": all_timestamps,
+        "zoom_levels": [
+            {
+                "zoom": layout['zoom'],
+                "directory": f"z{layout['zoom']}",
+                "width": layout['width'],
+                "height": layout['height'],
+                "arrow_spacing_px": args.arrow_spacing_px,
+                "images": ordered_manifest(manifests[layout['zoom']], all_timestamps),
+            }
+            for layout in layouts
+        ],
+        "colormap": CURRENT_COLORMAP,
+        "interpolation_method": args.method,
+        "generated_at": datetime.now().isoformat()
+    }
+
+    write_json_atomic(metadata, metadata_path, indent=2)
+
+    print(f"📋 Metadata sparad i: {metadata_path}")
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,48 @@ Liknar FCOO Marine Forecast-systemet med färgade zoner för varje parameter.
 import json
 import gzip
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.colors as colors
-from scipy.interpolate import griddata
 from datetime import datetime
-import os
 from pathlib import Path
-import geojson
-from shapely.geometry import shape, Point
 import argparse
-from matplotlib.colors import LinearSegmentedColormap
+
+from interpolation_backends import (
+    create_interpolator, evaluate_on_grid, INTERPOLATION_BACKENDS, DEFAULT_METHOD
+)
+from water_mask import (
+    load_water_polygons, load_clipped_water_polygons, points_in_water,
+    load_water_coverage, water_mask_from_coverage, file_fingerprint,
+    DEFAULT_MASTER_RESOLUTION, DEFAULT_CACHE_DIR
+)
+
+# matplotlib, scipy och shapely importeras först i funktionerna som behöver dem,
+# så att lätta kommandon (metadata, query, --help) startar snabbt
+
+from forecast_arrays import load_forecast_arrays, parameter_values, detect_regular_lattice, FORECAST_FIELDS
+from low_memory_grid import (
+    plan_chunk_rows, report_memory, compute_grid_low_memory,
+    colorize_grid_rgba, save_rgba_png,
+    WORKING_BYTES_PER_PIXEL, RESIDENT_BYTES_PER_PIXEL, IMAGE_ALPHA
+)
+from artifact_cache import (
+    open_artifact_cache, artifact_key, cached_artifact, restore_artifact_file, store_artifact_file,
+    save_arrays, load_arrays, save_json, load_json, prune_artifacts, report_artifact_cache
+)
+from adaptive_grid import compute_grid_adaptive, DEFAULT_TOLERANCE
+from lattice_interpolation import lattice_supports
+from grid_store import (
+    grid_store_path, prepare_grid_store, open_grid_store, write_store_grid, mark_store_written,
+    read_store_grid, load_store_coverage
+)
+from derived_parameters import mackerel_suitability, MACKEREL_SUITABILITY
+from frame_statistics import grid_statistics, statistics_metadata, load_frame_statistics, HISTOGRAM_BINS
+from mercator_remap import PROJECTIONS, projection_remap, remap_rows
+from parallel_frames import run_frames
+from frame_pipeline import run_pipeline, report_utilization
+from run_journal import (
+    open_run_journal, build_run_key, is_completed, record_completed, completed_statistics, completed_output_path,
+    temporary_output_path, commit_output, write_json_atomic, FORCE_HELP
+)
+from image_manifest import publish_frame, manifest_entry, load_manifest, published_entry, ordered_manifest
 
 # FÄRGSKALOR FÖR OLIKA PARAMETRAR
 
@@ -54,6 +86,19 @@ SALINITY_COLORMAP = [
     (36.0, '#000066'),   # Mörkblå
 ]
 
+# Makrillindex (härlett, 0-1): mörkt → blågrönt → gult → rött där förhållandena är bäst
+SUITABILITY_COLORMAP = [
+    (0.0,  '#1B2A49'),   # Mörk gråblå (ogynnsamt)
+    (0.25, '#3E6FB0'),   # Blå
+    (0.5,  '#4DB6AC'),   # Blågrön
+    (0.75, '#F4D03F'),   # Gul
+    (1.0,  '#E74C3C'),   # Röd (mest gynnsamt)
+]
+
+# Parametrar som interpoleras direkt ur prognosen, respektive härledda lager
+FORECAST_PARAMETERS = ['current', 'temperature', 'salinity']
+DERIVED_PARAMETERS = ['suitability']
+
 def get_parameter_config(parameter):
     """Hämta konfiguration för en specifik parameter"""
     if parameter == 'current':
@@ -80,11 +125,42 @@ def get_parameter_config(parameter):
             'name_en': 'salinity',
             'output_dir': 'salinity-images'
         }
+    elif parameter == 'suitability':
+        # Härlett lager: räknas ur källparametrarnas färdiga grids (se derived_parameters)
+        return {
+            'colormap': SUITABILITY_COLORMAP,
+            'unit': 'index (0-1)',
+            'name': 'makrillindex',
+            'name_en': 'mackerel_suitability',
+            'output_dir': 'mackerel-suitability-images',
+            'derived': {
+                'sources': list(MACKEREL_SUITABILITY),
+                'function': mackerel_suitability,
+                'settings': MACKEREL_SUITABILITY,
+            }
+        }
     else:
         raise ValueError(f"Okänd parameter: {parameter}")
 
+def source_parameters(parameters):
+    """Parametrar som måste interpoleras ur prognosen (härledda lager ersätts av sina källor)"""
+    sources = []
+    for parameter in parameters:
+        derived = get_parameter_config(parameter).get('derived')
+        for source in derived['sources'] if derived is not None else [parameter]:
+            if source not in sources:
+                sources.append(source)
+    return sources
+
+def colormap_range(parameter):
+    """(min, max) för parameterns färgskala (utan att importera matplotlib)"""
+    colormap_values = [value for value, _ in get_parameter_config(parameter)['colormap']]
+    return min(colormap_values), max(colormap_values)
+
 def create_colormap(parameter):
     """Skapa en colormap som matchar FCOO:s färgschema för specifik parameter"""
+    import matplotlib.colors as colors
+    
     config = get_parameter_config(parameter)
     colormap_data = config['colormap']
     
@@ -101,24 +177,25 @@ def create_colormap(parameter):
     )
     return cmap, min(values), max(values)
 
-def load_water_mask(geojson_path):
-    """Ladda vattenmask från GeoJSON för att begränsa interpolation"""
+def load_water_mask(geojson_path, bbox=None, resolution=DEFAULT_MASTER_RESOLUTION, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Ladda vattenmask från GeoJSON för att begränsa interpolation.
+    Med bbox används den klippta och förenklade cache-filen istället för hela GeoJSON-filen.
+    """
     print(f"🌊 Laddar vattenmask från {geojson_path}")
     
-    with open(geojson_path, 'r', encoding='utf-8') as f:
-        water_geojson = geojson.load(f)
-    
-    # Skapa Shapely-geometrier från alla polygoner
-    water_polygons = []
-    for feature in water_geojson['features']:
-        if feature['geometry']['type'] in ['Polygon', 'MultiPolygon']:
-            water_polygons.append(shape(feature['geometry']))
+    if bbox is not None:
+        water_polygons = load_clipped_water_polygons(geojson_path, bbox, resolution, cache_dir)
+    else:
+        water_polygons = load_water_polygons(geojson_path)
     
     print(f"✅ Laddade {len(water_polygons)} vattenpolygoner")
     return water_polygons
 
 def point_in_water(lon, lat, water_polygons):
     """Kontrollera om en punkt är i vatten"""
+    from shapely.geometry import Point
+    
     point = Point(lon, lat)
     return any(polygon.contains(point) for polygon in water_polygons)
 
@@ -173,16 +250,13 @@ def extract_parameter_data_for_timestamp(area_data, timestamp_prefix, water_poin
     
     return np.array(lons), np.array(lats), np.array(values)
 
-def create_interpolated_image(lons, lats, values, water_mask_grid, output_path, timestamp, bbox, parameter):
-    """Skapa interpolerad PNG-bild av specifik parameter"""
-    
-    config = get_parameter_config(parameter)
-    param_name = config['name']
-    unit = config['unit']
-    
-    if len(lons) == 0:
-        print(f"⚠️ Ingen {param_name}-data för {timestamp}")
-        return False
+def interpolate_reference_grid(lons, lats, values, water_mask_grid, bbox, parameter, method=DEFAULT_METHOD):
+    """
+    Referensinterpolationen (matplotlib-vägen) till en maskad float64-grid: edge points,
+    vald metod, nearest-fallback, kant-padding, klämning av negativa värden och vattenmask.
+    Returnerar (grid, antal vattenpixlar som fylldes av fallbacken).
+    """
+    from scipy.interpolate import griddata
     
     # Använd samma upplösning som förcachad mask
     lon_min, lon_max, lat_min, lat_max = bbox
@@ -242,92 +316,85 @@ def create_interpolated_image(lons, lats, values, water_mask_grid, output_path,
     enhanced_lats = np.concatenate([lats, edge_lats])
     enhanced_values = np.concatenate([values, edge_values])
     
-    print(f"🔄 Interpolerar {len(enhanced_values)} punkter (inkl. {len(edge_values)} edge-points) till {grid_resolution}x{grid_resolution} grid...")
+    print(f"🔄 Interpolerar {len(enhanced_values)} punkter (inkl. {len(edge_values)} edge-points) till {grid_resolution}x{grid_resolution} grid ({method})...")
     
-    # Interpolera med scipy.griddata (cubic för bästa kvalitet nu när vi inte har gigantisk grid)
-    try:
-        grid_values = griddata(
+    # Interpolera med vald backend (default cubic = samma som griddata method='cubic')
+    interpolator = create_interpolator(
+        method, np.column_stack([enhanced_lons, enhanced_lats]), enhanced_values
+    )
+    grid_values = evaluate_on_grid(interpolator, lon_grid, lat_grid)
+    
+    # För att nå längre ut till kanterna, fyll NaN-områden med nearest neighbor
+    nan_mask = np.isnan(grid_values)
+    filled_count = int(np.count_nonzero(nan_mask & water_mask_grid))
+    if np.any(nan_mask):
+        grid_values_nearest = griddata(
             (enhanced_lons, enhanced_lats), 
             enhanced_values, 
             (lon_mesh, lat_mesh), 
-            method='cubic',  # Bästa kvalitet
+            method='nearest',
             fill_value=np.nan
         )
+        # Fyll bara NaN-områden med nearest neighbor
+        grid_values[nan_mask] = grid_values_nearest[nan_mask]
+    
+    # PADDING STEP: Fyll eventuella NaN-områden vid kanterna med extrapolation
+    if np.any(np.isnan(grid_values)):
+        print("🔧 Applicerar kant-padding för att fylla gap till bbox-kanter...")
         
-        # För att nå längre ut till kanterna, fyll NaN-områden med nearest neighbor
+        # Hitta alla NaN-positioner
         nan_mask = np.isnan(grid_values)
-        if np.any(nan_mask):
-            grid_values_nearest = griddata(
-                (enhanced_lons, enhanced_lats), 
-                enhanced_values, 
-                (lon_mesh, lat_mesh), 
-                method='nearest',
-                fill_value=np.nan
-            )
-            # Fyll bara NaN-områden med nearest neighbor
-            grid_values[nan_mask] = grid_values_nearest[nan_mask]
         
-        # PADDING STEP: Fyll eventuella NaN-områden vid kanterna med extrapolation
-        if np.any(np.isnan(grid_values)):
-            print("🔧 Applicerar kant-padding för att fylla gap till bbox-kanter...")
-            
-            # Hitta alla NaN-positioner
-            nan_mask = np.isnan(grid_values)
-            
-            # Använd nearest neighbor för att extrapolera till kanter
-            from scipy.ndimage import binary_dilation
-            
-            # Iterativt fyll NaN-värden med grannvärden
-            iterations = 0
-            max_iterations = 20  # Säkerhetsgräns
-            
-            while np.any(nan_mask) and iterations < max_iterations:
-                # Skapa en dilated mask för att hitta gränsen
-                dilated = binary_dilation(~nan_mask)
-                
-                # Fyll NaN-värden vid gränsen med genomsnitt av grannar
-                for i in range(grid_values.shape[0]):
-                    for j in range(grid_values.shape[1]):
-                        if nan_mask[i, j] and dilated[i, j]:
-                            # Samla värden från grannar som inte är NaN
-                            neighbors = []
-                            for di in [-1, 0, 1]:
-                                for dj in [-1, 0, 1]:
-                                    ni, nj = i + di, j + dj
-                                    if (0 <= ni < grid_values.shape[0] and 
-                                        0 <= nj < grid_values.shape[1] and 
-                                        not np.isnan(grid_values[ni, nj])):
-                                        neighbors.append(grid_values[ni, nj])
-                            
-                            if neighbors:
-                                grid_values[i, j] = np.mean(neighbors)
-                                nan_mask[i, j] = False
-                
-                iterations += 1
+        # Använd nearest neighbor för att extrapolera till kanter
+        from scipy.ndimage import binary_dilation
+        
+        # Iterativt fyll NaN-värden med grannvärden
+        iterations = 0
+        max_iterations = 20  # Säkerhetsgräns
+        
+        while np.any(nan_mask) and iterations < max_iterations:
+            # Skapa en dilated mask för att hitta gränsen
+            dilated = binary_dilation(~nan_mask)
             
-            remaining_nan = np.sum(nan_mask)
-            print(f"   ✅ Padding klar efter {iterations} iterationer. {remaining_nan} NaN kvar.")
+            # Fyll NaN-värden vid gränsen med genomsnitt av grannar
+            for i in range(grid_values.shape[0]):
+                for j in range(grid_values.shape[1]):
+                    if nan_mask[i, j] and dilated[i, j]:
+                        # Samla värden från grannar som inte är NaN
+                        neighbors = []
+                        for di in [-1, 0, 1]:
+                            for dj in [-1, 0, 1]:
+                                ni, nj = i + di, j + dj
+                                if (0 <= ni < grid_values.shape[0] and 
+                                    0 <= nj < grid_values.shape[1] and 
+                                    not np.isnan(grid_values[ni, nj])):
+                                    neighbors.append(grid_values[ni, nj])
+                        
+                        if neighbors:
+                            grid_values[i, j] = np.mean(neighbors)
+                            nan_mask[i, j] = False
             
-            # Om det fortfarande finns NaN, använd global nearest neighbor som backup
-            if remaining_nan > 0:
-                print("   🔄 Final backup med nearest neighbor...")
-                grid_values_backup = griddata(
-                    (lons, lats), 
-                    values, 
-                    (lon_mesh, lat_mesh), 
-                    method='nearest'
-                )
-                grid_values[nan_mask] = grid_values_backup[nan_mask]
+            iterations += 1
         
-        # Kolla slutresultat
-        nan_count = np.sum(np.isnan(grid_values))
-        total_count = grid_values.size
-        nan_percentage = (nan_count / total_count) * 100
-        print(f"   📊 Interpolation slutresultat: {nan_percentage:.1f}% NaN-värden")
+        remaining_nan = np.sum(nan_mask)
+        print(f"   ✅ Padding klar efter {iterations} iterationer. {remaining_nan} NaN kvar.")
+        
+        # Om det fortfarande finns NaN, använd global nearest neighbor som backup
+        if remaining_nan > 0:
+            print("   🔄 Final backup med nearest neighbor...")
+            grid_values_backup = griddata(
+                (lons, lats), 
+                values, 
+                (lon_mesh, lat_mesh), 
+                method='nearest'
+            )
+            grid_values[nan_mask] = grid_values_backup[nan_mask]
     
-    except Exception as e:
-        print(f"❌ Interpolation misslyckades för {param_name} {timestamp}: {e}")
-        return False
+    # Kolla slutresultat
+    nan_count = np.sum(np.isnan(grid_values))
+    total_count = grid_values.size
+    nan_percentage = (nan_count / total_count) * 100
+    print(f"   📊 Interpolation slutresultat: {nan_percentage:.1f}% NaN-värden")
     
     # Fixa negativa värden från cubic interpolation för vissa parametrar
     if parameter in ['current', 'salinity'] and np.any(grid_values < 0):
@@ -341,35 +408,72 @@ def create_interpolated_image(lons, lats, values, water_mask_grid, output_path,
     # Applicera vattenmask (sätt land-områden till NaN för transparens)
     grid_values[~water_mask_grid] = np.nan
     
-    # DEBUG: Analysera värdena som plottas
-    valid_values = grid_values[~np.isnan(grid_values)]
-    if len(valid_values) > 0:
-        print(f"   📊 {param_name.title()}-statistik:")
-        print(f"      Min: {np.min(valid_values):.3f} {unit}")
-        print(f"      Max: {np.max(valid_values):.3f} {unit}") 
-        print(f"      Medel: {np.mean(valid_values):.3f} {unit}")
-        print(f"      Antal pixlar med data: {len(valid_values)}")
+    return grid_values, filled_count
+
+def create_interpolated_image(lons, lats, values, water_mask_grid, output_path, timestamp, bbox, parameter, water_coverage=None, method=DEFAULT_METHOD, row_remap=None,
+                              figure_inches=8, dpi=100, image_interpolation='nearest', grid_sink=None):
+    """
+    Skapa interpolerad PNG-bild av specifik parameter.
+    Med row_remap (se mercator_remap) flyttas griden om till Web Mercator-rader;
+    water_coverage ska då redan vara omflyttad.
+    grid_sink(grid) anropas med den färdiga griden som bilden ritas från.
+    figure_inches, dpi och image_interpolation styr matplotlib-figuren
+    (strömstyrkebilderna använder 12 tum, 150 dpi och bilinear).
+    """
+    param_name = get_parameter_config(parameter)['name']
+    
+    if len(lons) == 0:
+        print(f"⚠️ Ingen {param_name}-data för {timestamp}")
+        return False
+    
+    try:
+        grid_values, filled_count = interpolate_reference_grid(lons, lats, values, water_mask_grid, bbox, parameter, method)
+    except Exception as e:
+        print(f"❌ Interpolation misslyckades för {param_name} {timestamp}: {e}")
+        return False
+    
+    filled_share = filled_count / max(1, int(np.count_nonzero(water_mask_grid)))
+    if row_remap is not None:
+        grid_values = remap_rows(grid_values, row_remap)
+    if grid_sink is not None:
+        grid_sink(grid_values)
+    
+    # Statistik över de pixlar som plottas (till metadata.json)
+    statistics = frame_grid_statistics(grid_values, parameter, {'filled_share': filled_share})
+    print_grid_statistics(statistics, parameter)
+    
+    save_grid_figure(grid_values, output_path, bbox, parameter, water_coverage, figure_inches, dpi, image_interpolation)
+    return statistics
+
+def save_grid_figure(grid_values, output_path, bbox, parameter, water_coverage=None,
+                     figure_inches=8, dpi=100, image_interpolation='nearest'):
+    """Rita en färdig grid som PNG med matplotlib (bildformatet i create_interpolated_image)"""
+    import matplotlib.pyplot as plt
+    
+    config = get_parameter_config(parameter)
+    lon_min, lon_max, lat_min, lat_max = bbox
     
     # Skapa figur och plot
     cmap, vmin, vmax = create_colormap(parameter)
-    print(f"   🎨 {param_name.title()} colormap range: {vmin:.2f} - {vmax:.2f} {unit}")
+    print(f"   🎨 {config['name'].title()} colormap range: {vmin:.2f} - {vmax:.2f} {config['unit']}")
     
-    # Använd mindre figur och lägre DPI för att undvika memory-problem
-    fig, ax = plt.subplots(figsize=(8, 8), dpi=100)
+    # Default: mindre figur och lägre DPI för att undvika memory-problem
+    fig, ax = plt.subplots(figsize=(figure_inches, figure_inches), dpi=dpi)
     ax.set_xlim(lon_min, lon_max)
     ax.set_ylim(lat_min, lat_max)
     ax.axis('off')  # Ingen axlar för ren bildexport
     
-    # Plotta interpolerad data
-    im = ax.imshow(
+    # Plotta griden
+    ax.imshow(
         grid_values,
         extent=[lon_min, lon_max, lat_min, lat_max],
         origin='lower',
         cmap=cmap,
         vmin=vmin,
         vmax=vmax,
-        alpha=0.8,  # Lätt transparens för overlay
-        interpolation='nearest'  # Använd nearest för mindre memory usage
+        # Lätt transparens för overlay, kantutjämnad med täckningsrastern om den finns
+        alpha=0.8 if water_coverage is None else 0.8 * water_coverage,
+        interpolation=image_interpolation  # nearest ger minst memory usage
     )
     
     # Spara som PNG med transparent bakgrund
@@ -377,16 +481,306 @@ def create_interpolated_image(lons, lats, values, water_mask_grid, output_path,
     plt.savefig(
         output_path,
         format='png',
-        dpi=100,
+        dpi=dpi,
         bbox_inches='tight',  # Återställ tight cropping
         pad_inches=0,
         transparent=True,
         facecolor='none'
     )
     plt.close()
+
+def frame_grid_statistics(grid_values, parameter, fill_stats):
+    """Statistik för en färdig grid, histogram över färgskalans spann (se frame_statistics)"""
+    return grid_statistics(grid_values, colormap_range(parameter), fill_stats.get('filled_share'))
+
+def print_grid_statistics(statistics, parameter):
+    """Skriv ut statistiken för en interpolerad grid"""
+    config = get_parameter_config(parameter)
+    unit = config['unit']
+    if statistics['water_pixels'] > 0:
+        print(f"   📊 {config['name'].title()}-statistik:")
+        print(f"      Min: {statistics['min']:.3f} {unit}")
+        print(f"      Max: {statistics['max']:.3f} {unit}")
+        print(f"      Medel: {statistics['mean']:.3f} {unit}")
+        print(f"      P5-P95: {statistics['p5']:.3f} - {statistics['p95']:.3f} {unit}")
+        print(f"      Antal pixlar med data: {statistics['water_pixels']}")
+        if statistics['filled_share'] is not None:
+            print(f"      Fyllda av fallback: {100*statistics['filled_share']:.1f}%")
+
+def compute_parameter_grid(lons, lats, values, water_mask_grid, bbox, parameter, chunk_rows, method=DEFAULT_METHOD, adaptive_tolerance=None, row_remap=None, fill='nearest',
+                           fill_stats=None, lattice=None):
+    """
+    Lågminnesinterpolation till float32-grid. Med adaptive_tolerance (andel av
+    färgskalans spann) används adaptiv quadtree istället för varje pixel.
+    Med row_remap flyttas raderna om till Web Mercator efter maskningen.
+    fill='laplace' fyller luckor längs vattenvägar istället för med nearest (se water_fill).
+    Med lattice (forecast['lattice']) interpoleras direkt på prognosens regelbundna gitter.
+    fill_stats (dict) får 'filled_share' = andelen vattenpixlar som fylldes av fallbacken.
+    """
+    if fill_stats is None:
+        fill_stats = {}
+    if adaptive_tolerance is None:
+        grid_values = compute_grid_low_memory(
+            lons, lats, values, water_mask_grid, bbox, parameter, chunk_rows, method, fill, fill_stats, lattice
+        )
+    else:
+        vmin, vmax = colormap_range(parameter)
+        grid_values, _ = compute_grid_adaptive(
+            lons, lats, values, water_mask_grid, bbox, parameter,
+            adaptive_tolerance * (vmax - vmin), method=method, fill_stats=fill_stats, lattice=lattice
+        )
+    if 'filled' in fill_stats:
+        fill_stats['filled_share'] = fill_stats['filled'] / max(1, int(np.count_nonzero(water_mask_grid)))
+    
+    if row_remap is not None:
+        grid_values = remap_rows(grid_values, row_remap)
+    return grid_values
+
+def statistics_artifact_key(grid_key, parameter):
+    """Nyckel för en grids statistik (histogrammet beror på färgskalans spann)"""
+    return artifact_key('stats', grid_key, histogram_range=colormap_range(parameter), histogram_bins=HISTOGRAM_BINS)
+
+def compute_grid_with_statistics(compute_grid, parameter, artifacts=None, grid_key=None):
+    """
+    Grid och statistik för en bildruta. compute_grid(fill_stats) räknar ut griden;
+    med artifacts läses båda från artefaktcachen (statistiken nycklas på griden,
+    så fallbackandelen finns kvar även när griden inte räknas om).
+    Returnerar (grid, statistik).
+    """
+    fill_stats = {}
+    grid_values = cached_artifact(artifacts, 'grid', grid_key, lambda: compute_grid(fill_stats))
+    if grid_values is None:
+        return None, None
+    stats_key = statistics_artifact_key(grid_key, parameter) if artifacts is not None else None
+    statistics = cached_artifact(
+        artifacts, 'stats', stats_key, lambda: frame_grid_statistics(grid_values, parameter, fill_stats),
+        save=save_json, load=load_json
+    )
+    return grid_values, statistics
+
+def create_interpolated_image_low_memory(lons, lats, values, water_mask_grid, output_path, timestamp, bbox, parameter, memory_budget_mb, water_coverage=None, method=DEFAULT_METHOD, adaptive_tolerance=None, row_remap=None, fill='nearest',
+                                         artifacts=None, grid_key=None, grid_sink=None, lattice=None):
+    """
+    Lågminnesversion av create_interpolated_image (float32, radblock, Pillow istället för matplotlib).
+    Med artifacts läses griden från artefaktcachen (grid_key) om den redan är beräknad.
+    grid_sink(grid) anropas med den färdiga griden (t.ex. för att spara den i grid-lagret).
+    lattice är prognosens regelbundna gitter (se compute_parameter_grid).
+    Returnerar bildrutans statistik (se frame_statistics), eller False om den inte kunde skapas.
+    """
+    
+    if len(lons) == 0:
+        print(f"⚠️ Ingen {get_parameter_config(parameter)['name']}-data för {timestamp}")
+        return False
+    
+    return render_grid_image(
+        lambda chunk_rows, fill_stats: compute_parameter_grid(
+            lons, lats, values, water_mask_grid, bbox, parameter, chunk_rows, method, adaptive_tolerance, row_remap, fill,
+            fill_stats, lattice
+        ),
+        parameter, timestamp, output_path, water_mask_grid.shape[0], memory_budget_mb, water_coverage,
+        artifacts, grid_key, grid_sink
+    )
+
+def render_grid_image(compute_grid, parameter, timestamp, output_path, rows, memory_budget_mb, water_coverage=None,
+                      artifacts=None, grid_key=None, grid_sink=None):
+    """
+    Räkna ut (eller läs från artefaktcachen) en bildrutas grid och spara den som PNG via Pillow.
+    compute_grid(chunk_rows, fill_stats) returnerar griden, eller None om data saknas.
+    Returnerar bildrutans statistik, eller False om bilden inte kunde skapas.
+    """
+    param_name = get_parameter_config(parameter)['name']
+    chunk_rows = plan_chunk_rows(rows, memory_budget_mb)
     
-    print(f"✅ Sparade {output_path}")
-    return True
+    try:
+        grid_values, statistics = compute_grid_with_statistics(
+            lambda fill_stats: compute_grid(chunk_rows, fill_stats), parameter, artifacts, grid_key
+        )
+    except Exception as e:
+        print(f"❌ Interpolation misslyckades för {param_name} {timestamp}: {e}")
+        return False
+    if grid_values is None:
+        print(f"⚠️ Ingen {param_name}-data för {timestamp}")
+        return False
+    
+    if grid_sink is not None:
+        grid_sink(grid_values)
+    print_grid_statistics(statistics, parameter)
+    
+    cmap, vmin, vmax = create_colormap(parameter)
+    rgba = colorize_grid_rgba(grid_values, cmap, vmin, vmax, chunk_rows, coverage=water_coverage)
+    del grid_values
+    save_rgba_png(rgba, output_path)
+    del rgba
+    
+    report_memory(memory_budget_mb)
+    return statistics
+
+def extract_parameter_data_from_arrays(forecast, time_index, water_points, parameter):
+    """Extrahera parameterdata för ett tidssteg ur forecast-arrayer (lågminnesläge)"""
+    values = forecast['values'][parameter][:, time_index]
+    valid = water_points & np.isfinite(values)
+    return forecast['lons'][valid], forecast['lats'][valid], values[valid]
+
+def water_point_flags(lons, lats, water_point_cache):
+    """Bool-array: vilka punkter som finns i vattenpunkt-cachen"""
+    return np.array([
+        f"{lat:.4f},{lon:.4f}" in water_point_cache
+        for lat, lon in zip(lats, lons)
+    ], dtype=bool)
+
+def build_low_memory_forecast(arrays, water_points, parameters):
+    """
+    Lågminnes-forecast: float32-värden per parameter plus koordinater och vattenpunkter.
+    'lattice' beskriver punkternas regelbundna gitter (None om punkterna är spridda).
+    """
+    return {
+        'timestamps': [str(timestamp) for timestamp in arrays['timestamps']],
+        'lons': arrays['lons'],
+        'lats': arrays['lats'],
+        'water_points': water_points,
+        'lattice': detect_regular_lattice(arrays['lons'], arrays['lats']),
+        'values': {
+            parameter: parameter_values(arrays, parameter).astype(np.float32)
+            for parameter in parameters
+        },
+    }
+
+def load_low_memory_forecast(area_data, water_point_cache, parameters):
+    """Packa area_data till float32-arrayer så att JSON-strukturen kan släppas"""
+    arrays = load_forecast_arrays(area_data)
+    water_points = water_point_flags(arrays['lons'], arrays['lats'], water_point_cache)
+    return build_low_memory_forecast(arrays, water_points, parameters)
+
+def load_low_memory_inputs_cached(artifacts, input_path, water_mask_path, bbox, geometry_resolution, resolution,
+                                  master_resolution, cache_dir, parameters):
+    """
+    Lågminnesindata via artefaktcachen: forecast-arrayer, vattenpunkter och täckningsraster.
+    JSON-filen och vattengeometrin läses bara om ett steg som behöver dem saknas i cachen.
+    Returnerar (forecast, täckningsraster, nycklar som bildrutornas artefakter bygger på).
+    """
+    input_sha1 = file_fingerprint(input_path)
+    water_mask_sha1 = file_fingerprint(water_mask_path)
+    loaded_polygons = []
+    
+    def water_polygons():
+        if not loaded_polygons:
+            loaded_polygons.append(load_water_mask(water_mask_path, bbox, geometry_resolution, cache_dir))
+        return loaded_polygons[0]
+    
+    def parse_forecast():
+        arrays = load_forecast_arrays(load_area_parameters(input_path))
+        packed = {field: arrays[field] for field in ['lons', 'lats'] + FORECAST_FIELDS}
+        packed['timestamps'] = np.array(arrays['timestamps'])
+        return packed
+    
+    def find_water_points():
+        water_point_cache = water_point_cache_from_coordinates(arrays['lons'], arrays['lats'], water_polygons())
+        return water_point_flags(arrays['lons'], arrays['lats'], water_point_cache)
+    
+    forecast_key = artifact_key('forecast', input_sha1)
+    arrays = cached_artifact(artifacts, 'forecast', forecast_key, parse_forecast, save=save_arrays, load=load_arrays)
+    
+    points_key = artifact_key('water-points', forecast_key, water_mask_sha1, bbox=bbox, resolution=geometry_resolution)
+    water_points = cached_artifact(artifacts, 'water-points', points_key, find_water_points)
+    
+    master_resolution = max(master_resolution, resolution)
+    coverage_key = artifact_key(
+        'water-coverage', water_mask_sha1, bbox=bbox, resolution=resolution,
+        master_resolution=master_resolution, geometry_resolution=geometry_resolution
+    )
+    water_coverage = cached_artifact(artifacts, 'water-coverage', coverage_key, lambda: load_water_coverage(
+        water_polygons(), bbox, resolution, water_mask_path, master_resolution, cache_dir
+    ))
+    
+    forecast = build_low_memory_forecast(arrays, water_points, parameters)
+    print(f"✅ Forecast: {len(forecast['lons'])} punkter ({int(water_points.sum())} i vatten) x "
+          f"{len(forecast['timestamps'])} tidssteg")
+    return forecast, water_coverage, {'water_points': points_key, 'water_coverage': coverage_key}
+
+def grid_settings_for(parameter, method, fill, adaptive_tolerance, projection, lattice=None):
+    """Gridinställningar per parameter för kontexten: parametern själv plus ett härlett lagers källor"""
+    return {
+        name: grid_artifact_settings(name, method, fill, adaptive_tolerance, projection, lattice)
+        for name in [parameter] + source_parameters([parameter])
+    }
+
+def grid_artifact_settings(parameter, method, fill, adaptive_tolerance, projection, lattice=None):
+    """Inställningar som påverkar en interpolerad grid (ingår i grid-artefaktens nyckel)"""
+    settings = {'method': method, 'fill': fill, 'projection': projection, 'adaptive_tolerance': adaptive_tolerance}
+    if adaptive_tolerance is not None:
+        # Toleransen anges som andel av färgskalans spann
+        settings['colormap_range'] = colormap_range(parameter)
+    if lattice_supports(lattice, method, fill):
+        # Gittervägen ger (marginellt) andra värden än trianguleringen av samma punkter
+        settings['lattice'] = True
+    return settings
+
+def grid_artifact_key(context, parameter, timestamp):
+    """
+    Nyckel för en bildrutas grid. Ett härlett lagers grid nycklas på källgridarnas
+    nycklar och härledningens inställningar.
+    """
+    derived = get_parameter_config(parameter).get('derived')
+    if derived is not None:
+        source_keys = [grid_artifact_key(context, source, timestamp) for source in derived['sources']]
+        return artifact_key(
+            'grid', *source_keys, parameter=parameter, timestamp=timestamp, derivation=derived['settings']
+        )
+    inputs = context['artifact_inputs']
+    return artifact_key(
+        'grid', inputs['water_points'], inputs['water_coverage'],
+        parameter=parameter, timestamp=timestamp, **context['grid_settings'][parameter]
+    )
+
+def frame_artifact_keys(context, parameter, timestamp):
+    """(grid-nyckel, bildnyckel) för en bildruta, eller (None, None) utan artefaktcache"""
+    if context.get('artifacts') is None:
+        return None, None
+    inputs = context['artifact_inputs']
+    grid_key = grid_artifact_key(context, parameter, timestamp)
+    image_key = artifact_key(
+        'image', grid_key, inputs['water_coverage'],
+        colormap=get_parameter_config(parameter)['colormap'], alpha=IMAGE_ALPHA
+    )
+    return grid_key, image_key
+
+def restore_cached_images(parameter, tasks, context, on_restored=None):
+    """
+    Hämta bildrutor vars kodade bild redan finns i artefaktcachen.
+    on_restored(uppgift, statistik eller True) anropas för varje hämtad bildruta.
+    Returnerar (uppgifter som fortfarande måste renderas, antal hämtade).
+    """
+    artifacts = context.get('artifacts')
+    if artifacts is None:
+        return tasks, 0
+    
+    grid_store = context.get('grid_store')
+    remaining = []
+    for task in tasks:
+        time_index, timestamp, output_path = task
+        grid_key, image_key = frame_artifact_keys(context, parameter, timestamp)
+        # Bildrutor som saknas i grid-lagret renderas (griden kommer då från artefaktcachen)
+        in_store = grid_store is None or grid_store['meta']['written'][time_index]
+        if in_store and restore_artifact_file(artifacts, 'image', image_key, output_path):
+            print(f"⚡ Från artefaktcachen: {Path(output_path).name}")
+            if on_restored is not None:
+                statistics = cached_artifact(
+                    artifacts, 'stats', statistics_artifact_key(grid_key, parameter), lambda: None,
+                    save=save_json, load=load_json
+                )
+                on_restored(task, statistics or True)
+        else:
+            remaining.append(task)
+    return remaining, len(tasks) - len(remaining)
+
+def store_frame_image(context, parameter, task):
+    """Spara en nyss kodad bildruta som bildartefakt och markera dess grid som sparad i grid-lagret"""
+    time_index, timestamp, output_path = task
+    if context.get('grid_store') is not None:
+        mark_store_written(context['grid_store'], time_index)
+    if context.get('artifacts') is not None:
+        _, image_key = frame_artifact_keys(context, parameter, timestamp)
+        store_artifact_file(context['artifacts'], 'image', image_key, output_path)
 
 def get_bbox_from_water_mask(water_polygons):
     """Beräkna bounding box från vattenmasken"""
@@ -405,19 +799,22 @@ def get_bbox_from_water_mask(water_polygons):
 
 def create_water_point_cache(area_data, water_polygons):
     """Skapa cache för vilka punkter som är i vatten - gör bara en gång"""
+    lons = [point['lon'] for point in area_data['points']]
+    lats = [point['lat'] for point in area_data['points']]
+    return water_point_cache_from_coordinates(lons, lats, water_polygons)
+
+def water_point_cache_from_coordinates(lons, lats, water_polygons):
+    """Vattenpunkt-cache ("lat,lon" med 4 decimaler) för givna koordinater"""
     print("🔄 Skapar cache för vattenpunkter...")
     cache = {}
-    total_points = len(area_data['points'])
+    total_points = len(lons)
     
-    for i, point in enumerate(area_data['points']):
-        if i % 1000 == 0:
-            print(f"   Processar punkt {i}/{total_points}")
-        
-        lat, lon = point['lat'], point['lon']
-        point_key = f"{lat:.4f},{lon:.4f}"
-        
-        if point_in_water(lon, lat, water_polygons):
-            cache[point_key] = True
+    # Vektoriserat test mot (klippta) polygoner istället för en Point per punkt
+    in_water = points_in_water(lons, lats, water_polygons)
+    
+    for lat, lon, is_water in zip(lats, lons, in_water):
+        if is_water:
+            cache[f"{lat:.4f},{lon:.4f}"] = True
     
     print(f"✅ Cache skapad: {len(cache)} vattenpunkter av {total_points} totalt")
     return cache
@@ -427,9 +824,9 @@ def create_water_mask_grid(water_polygons, bbox, grid_resolution):
     print(f"🌊 Skapar högruppläst vattenmask-grid ({grid_resolution}x{grid_resolution})...")
     
     lon_min, lon_max, lat_min, lat_max = bbox
+    # 1-D axlar räcker, meshgrid behövs inte för punkt-för-punkt-test
     lon_grid = np.linspace(lon_min, lon_max, grid_resolution)
     lat_grid = np.linspace(lat_min, lat_max, grid_resolution)
-    lon_mesh, lat_mesh = np.meshgrid(lon_grid, lat_grid)
     
     water_mask = np.zeros((grid_resolution, grid_resolution), dtype=bool)
     total_pixels = grid_resolution * grid_resolution
@@ -438,9 +835,9 @@ def create_water_mask_grid(water_polygons, bbox, grid_resolution):
         if i % 100 == 0:
             print(f"   Rad {i}/{grid_resolution} ({100*i/grid_resolution:.1f}%)")
         
+        lat_point = lat_grid[i]
         for j in range(grid_resolution):
-            lon_point = lon_mesh[i, j]
-            lat_point = lat_mesh[i, j]
+            lon_point = lon_grid[j]
             
             if point_in_water(lon_point, lat_point, water_polygons):
                 water_mask[i, j] = True
@@ -449,79 +846,531 @@ def create_water_mask_grid(water_polygons, bbox, grid_resolution):
     print(f"✅ Vattenmask-grid skapad: {water_pixels}/{total_pixels} pixlar är vatten ({100*water_pixels/total_pixels:.1f}%)")
     return water_mask
 
-def clear_directory(directory_path):
-    """Töm en mapp på alla PNG-filer"""
-    if not os.path.exists(directory_path):
-        os.makedirs(directory_path, exist_ok=True)
-        return
-        
-    # Ta bort alla PNG-filer i mappen
-    png_files = list(Path(directory_path).glob("*.png"))
-    if png_files:
-        print(f"   🗑️ Tömmer mapp: {len(png_files)} gamla bilder...")
-        for file in png_files:
+def remove_stale_images(directory_path, keep_names):
+    """Ta bort PNG-filer som inte hör till den här körningen (och kvarlämnade temp-filer)"""
+    stale_files = [
+        file for file in Path(directory_path).glob("*.png") if file.name not in keep_names
+    ] + list(Path(directory_path).glob(".*.tmp"))
+    if stale_files:
+        print(f"   🗑️ Tar bort {len(stale_files)} gamla filer...")
+        for file in stale_files:
             try:
                 file.unlink()
             except Exception as e:
                 print(f"   ⚠️ Kunde inte radera {file.name}: {e}")
+
+def render_parameter_frame(context, task):
+    """Rendera bilden för ett tidssteg (körs i arbetsprocess när --workers > 1)"""
+    time_index, timestamp, output_path = task
+    parameter = context['parameter']
+    forecast = context['forecast']
+    config = get_parameter_config(parameter)
+    param_name = config['name']
+    
+    print(f"\n📸 {param_name.title()} {time_index+1}/{context['total']}: {timestamp}")
+    
+    if config.get('derived') is not None and forecast is None:
+        # Härlett lager i matplotlib-läget: samma figur som källornas bilder
+        tmp_path = temporary_output_path(output_path)
+        success = create_derived_image(context, parameter, time_index, timestamp, tmp_path)
+        if success:
+            commit_output(tmp_path, output_path)
+            print(f"✅ Sparade {output_path}")
+        return success
+    if config.get('derived') is not None:
+        # Härlett lager i lågminnesläget: räknas ur källparametrarnas grids och kodas via Pillow
+        tmp_path = temporary_output_path(output_path)
+        grid_key, _ = frame_artifact_keys(context, parameter, timestamp)
+        success = render_grid_image(
+            lambda chunk_rows, fill_stats: compute_derived_grid(context, parameter, time_index, timestamp, chunk_rows),
+            parameter, timestamp, tmp_path, context['water_mask_grid'].shape[0], context['memory_budget_mb'],
+            context['water_coverage'], context.get('artifacts'), grid_key, store_grid_sink(context, time_index)
+        )
+        if success:
+            commit_output(tmp_path, output_path)
+            print(f"✅ Sparade {output_path}")
+        return success
+    
+    # Extrahera parameterdata för denna tidsstämpel
+    if forecast is not None:
+        lons, lats, values = extract_parameter_data_from_arrays(
+            forecast, time_index, forecast['water_points'], parameter
+        )
     else:
-        print(f"   ✨ Mapp redan tom")
+        # Tidsstämpel-prefix (första 13 tecken: YYYY-MM-DDTHH)
+        lons, lats, values = extract_parameter_data_for_timestamp(
+            context['area_data'], timestamp[:13], context['water_point_cache'], parameter
+        )
+    
+    if len(lons) == 0:
+        print(f"⚠️ Ingen {param_name}-data för {timestamp}")
+        return False
+    
+    # Skapa interpolerad bild i en temp-fil som byter namn först när den är komplett
+    tmp_path = temporary_output_path(output_path)
+    kept = []
+    grid_sink = frame_grid_sink(context, time_index, kept)
+    if forecast is not None:
+        grid_key, _ = frame_artifact_keys(context, parameter, timestamp)
+        success = create_interpolated_image_low_memory(
+            lons, lats, values, context['water_mask_grid'], tmp_path, timestamp,
+            context['bbox'], parameter, context['memory_budget_mb'], context['water_coverage'], context['method'],
+            context['adaptive_tolerance'], context['row_remap'], context['fill'],
+            artifacts=context.get('artifacts'), grid_key=grid_key, grid_sink=grid_sink,
+            lattice=context.get('lattice')
+        )
+    else:
+        success = create_interpolated_image(
+            lons, lats, values, context['water_mask_grid'], tmp_path, timestamp,
+            context['bbox'], parameter, context['water_coverage'], context['method'], context['row_remap'],
+            grid_sink=grid_sink, **context['figure']
+        )
+    if success:
+        commit_output(tmp_path, output_path)
+        print(f"✅ Sparade {output_path}")
+    return kept_grid_result(success, kept)
+
+def create_derived_image(context, parameter, time_index, timestamp, output_path):
+    """
+    Matplotlib-bild av ett härlett lager (samma figur som create_interpolated_image).
+    Returnerar bildrutans statistik, eller False om bilden inte kunde skapas.
+    """
+    param_name = get_parameter_config(parameter)['name']
+    try:
+        grid_values = compute_derived_grid(context, parameter, time_index, timestamp, None)
+    except Exception as e:
+        print(f"❌ Härledning misslyckades för {param_name} {timestamp}: {e}")
+        return False
+    if grid_values is None:
+        print(f"⚠️ Ingen {param_name}-data för {timestamp}")
+        return False
+    
+    statistics = frame_grid_statistics(grid_values, parameter, {})
+    print_grid_statistics(statistics, parameter)
+    save_grid_figure(grid_values, output_path, context['bbox'], parameter, context['water_coverage'], **context['figure'])
+    return statistics
+
+def frame_grid_sink(context, time_index, kept):
+    """
+    grid_sink för en bildruta: sparar griden i grid-lagret och, för källor till ett
+    härlett lager (context['keep_grids']), packad i listan kept
+    """
+    store_sink = store_grid_sink(context, time_index)
+    if not context.get('keep_grids'):
+        return store_sink
+    
+    def sink(grid_values):
+        if store_sink is not None:
+            store_sink(grid_values)
+        kept.append(pack_water_grid(grid_values, context['grid_water']))
+    return sink
 
-def generate_images_for_parameter(parameter, area_data, water_point_cache, water_mask_grid, bbox, output_base_dir, resolution, max_images, force):
-    """Generera bilder för en specifik parameter"""
+def kept_grid_result(result, kept):
+    """Bildrutans resultat; med en behållen grid (resultat, grid) så att den når huvudprocessen"""
+    return (result, kept[0]) if result and kept else result
+
+def pack_water_grid(grid_values, grid_water):
+    """En grids vattenpixlar som 1-D-array (land är alltid NaN och behöver inte sparas)"""
+    return grid_values[grid_water]
+
+def unpack_water_grid(water_values, grid_water):
+    """Hel grid ur pack_water_grid (land NaN)"""
+    grid_values = np.full(grid_water.shape, np.nan, dtype=water_values.dtype)
+    grid_values[grid_water] = water_values
+    return grid_values
+
+def source_grid(context, source, time_index, timestamp, chunk_rows):
+    """
+    En källparameters färdiga grid för ett tidssteg (för härledda lager): den grid som
+    källans bild ritades från tidigare i körningen. Bildrutor som inte renderades i
+    körningen (journal, artefaktcache) läses ur källans grid-lager eller artefaktcachen,
+    och räknas annars om med samma väg som källans bilder. None om data saknas.
+    """
+    kept = context['source_grids'].get(source, {}).pop(timestamp, None)
+    if kept is not None:
+        return unpack_water_grid(kept, context['grid_water'])
+    store = context['source_stores'].get(source)
+    if store is not None and store['meta']['written'][time_index]:
+        return read_store_grid(store, time_index)
+    
+    print(f"🔄 {get_parameter_config(source)['name'].title()}-griden för {timestamp} finns inte från körningen, räknar om den")
+    forecast = context['forecast']
+    if forecast is None:
+        # Referensvägen (matplotlib-läget), som källans bilder
+        lons, lats, values = extract_parameter_data_for_timestamp(
+            context['area_data'], timestamp[:13], context['water_point_cache'], source
+        )
+        if len(lons) == 0:
+            return None
+        grid_values, _ = interpolate_reference_grid(
+            lons, lats, values, context['water_mask_grid'], context['bbox'], source, context['method']
+        )
+        return grid_values if context['row_remap'] is None else remap_rows(grid_values, context['row_remap'])
+    lons, lats, values = extract_parameter_data_from_arrays(
+        forecast, time_index, forecast['water_points'], source
+    )
+    if len(lons) == 0:
+        return None
+    grid_key = grid_artifact_key(context, source, timestamp) if context.get('artifacts') is not None else None
+    return cached_artifact(context.get('artifacts'), 'grid', grid_key, lambda: compute_parameter_grid(
+        lons, lats, values, context['water_mask_grid'], context['bbox'], source, chunk_rows,
+        context['method'], context['adaptive_tolerance'], context['row_remap'], context['fill'],
+        lattice=context.get('lattice')
+    ))
+
+def compute_derived_grid(context, parameter, time_index, timestamp, chunk_rows):
+    """Ett härlett lagers grid ur källparametrarnas grids (None om någon källa saknar data)"""
+    derived = get_parameter_config(parameter)['derived']
+    grids = {}
+    for source in derived['sources']:
+        grid_values = source_grid(context, source, time_index, timestamp, chunk_rows)
+        if grid_values is None:
+            return None
+        grids[source] = grid_values
+    print(f"🧪 Härleder {get_parameter_config(parameter)['name']} ur {', '.join(derived['sources'])}")
+    return derived['function'](grids, derived['settings']).astype(np.float32, copy=False)
+
+def store_grid_sink(context, time_index):
+    """Funktion som sparar en bildrutas grid i grid-lagret, eller None utan lager"""
+    grid_store = context.get('grid_store')
+    if grid_store is None:
+        return None
+    return lambda grid_values: write_store_grid(grid_store, time_index, grid_values)
+
+def render_recolor_frame(context, task):
+    """Färgsätt om en bildruta direkt från grid-lagret (körs i arbetsprocess när --workers > 1)"""
+    time_index, timestamp, output_path = task
+    grid_store = context['grid_store']
+    
+    grid_values = read_store_grid(grid_store, time_index)
+    cmap, vmin, vmax = create_colormap(context['parameter'])
+    rgba = colorize_grid_rgba(
+        grid_values, cmap, vmin, vmax, context['chunk_rows'], coverage=load_store_coverage(grid_store)
+    )
+    # Histogrammet följer färgskalans spann; fallbackandelen finns bara i tidigare metadata
+    statistics = frame_grid_statistics(grid_values, context['parameter'], {
+        'filled_share': context['filled_shares'].get(timestamp)
+    })
+    del grid_values
+    
+    tmp_path = temporary_output_path(output_path)
+    save_rgba_png(rgba, tmp_path)
+    commit_output(tmp_path, output_path)
+    print(f"🎨 {time_index+1}/{context['total']}: {Path(output_path).name}")
+    return statistics
+
+def recolor_images_for_parameter(parameter, store_dir, output_dir, memory_budget_mb, workers=1):
+    """
+    Rendera om en parameters bilder från grid-lagret med nuvarande färgskala,
+    utan att läsa prognosdata eller interpolera. Returnerar (antal omrenderade, antal i lagret).
+    """
+    config = get_parameter_config(parameter)
+    grid_store = open_grid_store(store_dir)
+    if grid_store is None or grid_store['meta']['parameter'] != parameter:
+        print(f"❌ Inget grid-lager för {config['name']} i {store_dir} (kör först med --grid-store)")
+        return 0, 0
+    
+    meta = grid_store['meta']
+    tasks = []
+    missing = 0
+    for i, (timestamp, output_name, written) in enumerate(zip(meta['timestamps'], meta['outputs'], meta['written'])):
+        if output_name is None:
+            continue
+        if not written:
+            missing += 1
+            continue
+        tasks.append((i, timestamp, Path(output_dir) / output_name))
+    
+    print(f"\n🎨 Färgsätter om {len(tasks)} {config['name']}-bilder från {grid_store['path']}")
+    if missing:
+        print(f"⚠️ {missing} bildrutor saknas i grid-lagret och lämnas orörda")
+    
+    metadata_path = Path(output_dir) / "metadata.json"
+    metadata = None
+    if metadata_path.exists():
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+    previous_frames = ((metadata or {}).get('statistics') or {}).get('frames', {})
+    
+    context = {
+        'parameter': parameter,
+        'grid_store': grid_store,
+        'total': len(tasks),
+        'chunk_rows': plan_chunk_rows(meta['shape'][0], memory_budget_mb),
+        'filled_shares': {timestamp: frame.get('filled_share') for timestamp, frame in previous_frames.items()},
+    }
+    # Omfärgade bilder får nytt innehåll och därmed nya publiceringsnamn
+    manifest = load_manifest(metadata_path)
+    
+    def publish_recolored(task, result):
+        if result:
+            _, timestamp, output_path = task
+            manifest[timestamp] = publish_frame(output_path)
+    
+    results = run_frames(render_recolor_frame, tasks, context, workers, on_result=publish_recolored)
+    
+    # Färgskalan, statistiken (histogrammet) och manifestet i metadata ska matcha bilderna
+    if metadata is not None:
+        frame_stats = dict(previous_frames)
+        for (_, timestamp, _), statistics in zip(tasks, results):
+            if statistics:
+                frame_stats[timestamp] = statistics
+        metadata['colormap'] = config['colormap']
+        metadata['statistics'] = statistics_metadata(
+            {timestamp: frame_stats[timestamp] for timestamp in meta['timestamps'] if timestamp in frame_stats},
+            colormap_range(parameter)
+        )
+        metadata['images'] = ordered_manifest(manifest, meta['timestamps'])
+        metadata['generated_at'] = datetime.now().isoformat()
+        write_json_atomic(metadata, metadata_path, indent=2)
+        remove_stale_images(output_dir, {entry['file'] for entry in metadata['images'].values()})
+    
+    done_count = sum(1 for success in results if success)
+    print(f"🎉 {config['name'].title()}: {done_count}/{len(tasks)} bilder färgsatta om")
+    return done_count, len(tasks)
+
+def run_parameter_pipeline(parameter, tasks, context, queue_size=2, on_result=None):
+    """
+    Lågminnesrendering som pipeline: interpolation av bildruta N+1 körs medan
+    bildruta N färgsätts och PNG-kodas/skrivs i egna trådar. Köerna rymmer
+    queue_size bildrutor, och minnesplanen räknar med alla bildrutor som kan
+    vara i omlopp samtidigt. Returnerar resultaten (statistik eller False, se kept_grid_result)
+    i samma ordning som tasks.
+    """
+    forecast = context['forecast']
+    param_name = get_parameter_config(parameter)['name']
+    cmap, vmin, vmax = create_colormap(parameter)
+    
+    # Upp till 2 + queue_size grids (float32) respektive RGBA-buffertar i omlopp,
+    # och interpolation och färgsättning arbetar på varsitt block samtidigt
+    chunk_rows = plan_chunk_rows(
+        context['water_mask_grid'].shape[0], context['memory_budget_mb'],
+        working_bytes_per_pixel=2 * WORKING_BYTES_PER_PIXEL,
+        resident_bytes_per_pixel=(2 + queue_size) * RESIDENT_BYTES_PER_PIXEL
+    )
+    
+    def interpolate(task):
+        time_index, timestamp, output_path = task
+        print(f"\n📸 {param_name.title()} {time_index+1}/{context['total']}: {timestamp}")
+        if get_parameter_config(parameter).get('derived') is not None:
+            compute_grid = lambda fill_stats: compute_derived_grid(context, parameter, time_index, timestamp, chunk_rows)
+        else:
+            lons, lats, values = extract_parameter_data_from_arrays(
+                forecast, time_index, forecast['water_points'], parameter
+            )
+            if len(lons) == 0:
+                print(f"⚠️ Ingen {param_name}-data för {timestamp}")
+                return None
+            compute_grid = lambda fill_stats: compute_parameter_grid(
+                lons, lats, values, context['water_mask_grid'], context['bbox'],
+                parameter, chunk_rows, context['method'], context['adaptive_tolerance'], context['row_remap'],
+                context['fill'], fill_stats, context.get('lattice')
+            )
+        grid_key, _ = frame_artifact_keys(context, parameter, timestamp)
+        grid_values, statistics = compute_grid_with_statistics(compute_grid, parameter, context.get('artifacts'), grid_key)
+        if grid_values is None:
+            print(f"⚠️ Ingen {param_name}-data för {timestamp}")
+            return None
+        kept = []
+        grid_sink = frame_grid_sink(context, time_index, kept)
+        if grid_sink is not None:
+            grid_sink(grid_values)
+        print_grid_statistics(statistics, parameter)
+        return task, grid_values, statistics, kept
+    
+    def colorize(payload):
+        task, grid_values, statistics, kept = payload
+        rgba = colorize_grid_rgba(grid_values, cmap, vmin, vmax, chunk_rows, coverage=context['water_coverage'])
+        return task, rgba, statistics, kept
+    
+    def write(payload):
+        (_, _, output_path), rgba, statistics, kept = payload
+        tmp_path = temporary_output_path(output_path)
+        save_rgba_png(rgba, tmp_path)
+        commit_output(tmp_path, output_path)
+        print(f"✅ Sparade {output_path}")
+        return kept_grid_result(statistics, kept)
+    
+    stages = [('interpolation', interpolate, 1), ('färgsättning', colorize, 1), ('png+skrivning', write, 1)]
+    results, stats, wall_seconds = run_pipeline(tasks, stages, queue_size, on_result)
+    if tasks:
+        report_utilization(stats, wall_seconds)
+        report_memory(context['memory_budget_mb'])
+    return [result or False for result in results]
+
+def generate_images_for_parameter(parameter, area_data, water_point_cache, water_mask_grid, bbox, output_base_dir, resolution, max_images, force, forecast=None, memory_budget_mb=None, water_coverage=None, method=DEFAULT_METHOD, workers=1, journal=None, pipeline_queue_size=0, adaptive_tolerance=None, projection='latlon', fill='nearest', artifacts=None, artifact_inputs=None, grid_store_dir=None, source_store_dirs=None, use_lattice=True, input_sha1=None, run_key=None, source_grids=None,
+                                  output_dir=None, frame_name=None, figure=None):
+    """
+    Generera bilder för en specifik parameter.
+    Med artifacts (lågminnesläge) hämtas grids och kodade bilder från artefaktcachen när
+    deras indata är oförändrade; artifact_inputs är nycklarna från load_low_memory_inputs_cached.
+    Med grid_store_dir (lågminnesläge) sparas varje färdig grid i grid-lagret för --recolor;
+    lagret hör till indatafilen (input_sha1) och körningens inställningar (run_key).
+    Varje bildrutas statistik (min/max/medel, percentiler, histogram) skrivs till metadata.json.
+    Färdiga bilder publiceras med innehållshash i filnamnet och listas i metadata.json:s bildmanifest;
+    bilder som förra körningen publicerade med samma run_key återanvänds (utom med force).
+    output_dir ersätter <output_base_dir>/<config['output_dir']>, frame_name(tidsstämpel) bildrutornas
+    arbetsnamn och figure matplotlib-figurens storlek, dpi och interpolation (se create_interpolated_image).
+    source_grids (källa → {tidsstämpel: grid}) delas mellan körningens parametrar: en källa till
+    ett härlett lager lägger där den grid som varje bild ritades från, och det härledda lagret
+    (config['derived'], renderas efter sina källor) räknas ur dem. Med source_store_dirs
+    (källa → grid-lager) läses källgrids för bildrutor som inte renderades i körningen därifrån.
+    Med use_lattice interpoleras lågminnesvägen direkt på prognosens regelbundna gitter om
+    ett sådant hittades (annars, och med use_lattice=False, som spridda punkter).
+    """
     config = get_parameter_config(parameter)
     param_name = config['name']
-    output_dir_name = config['output_dir']
+    derived = config.get('derived')
+    source_grids = source_grids if source_grids is not None else {}
+    kept_grids = source_grids.get(parameter)
     
     # Skapa parameter-specifik output-directory
-    output_dir = Path(output_base_dir) / output_dir_name
+    output_dir = Path(output_dir) if output_dir is not None else Path(output_base_dir) / config['output_dir']
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Töm mappen på gamla bilder (alltid när force är aktiverat eller första gången)
+    # Gamla bilder tas bort först när körningen är klar, så att en avbruten
+    # körning inte lämnar en tom mapp efter sig
     print(f"\n🚀 Genererar {param_name}-bilder i {output_dir}")
-    clear_directory(output_dir)
     
-    # Hämta tidsstämplar
-    timestamps = area_data['metadata']['timestamps']
+    # Hämta tidsstämplar (lågminnesläget har släppt area_data)
+    all_timestamps = forecast['timestamps'] if forecast is not None else area_data['metadata']['timestamps']
+    timestamps = all_timestamps
     if max_images:
         timestamps = timestamps[:max_images]
         print(f"🔬 Begränsar till {max_images} bilder för testning")
     
     successful_count = 0
+    tasks = []
+    store_outputs = [None] * len(all_timestamps)
+    frame_stats = {}
+    manifest = {}
+    
+    # Förra körningens bilder återanvänds bara om de gjordes från samma indata och inställningar
+    metadata_path = output_dir / "metadata.json"
+    previous_manifest = load_manifest(metadata_path, run_key) if run_key is not None and not force else {}
+    previous_statistics = load_frame_statistics(metadata_path, colormap_range(parameter)) if previous_manifest else {}
+    if metadata_path.exists() and run_key is not None and not force and not previous_manifest:
+        print("🔄 Indata eller inställningar har ändrats sedan förra körningen, renderar om alla bilder")
     
     for i, timestamp in enumerate(timestamps):
-        print(f"\n📸 {param_name.title()} {i+1}/{len(timestamps)}: {timestamp}")
-        
-        # Extrahera tidsstämpel-prefix (första 13 tecken: YYYY-MM-DDTHH)
-        timestamp_prefix = timestamp[:13]
-        
-        # Skapa säkert filnamn med parameter-prefix
-        safe_timestamp = timestamp.replace(':', '-').replace('+', 'plus')
-        output_path = output_dir / f"{config['name_en']}_{safe_timestamp}.png"
+        # Arbetsnamn med parameter-prefix; färdiga bilder publiceras med innehållshash i namnet
+        if frame_name is not None:
+            output_path = output_dir / frame_name(timestamp)
+        else:
+            safe_timestamp = timestamp.replace(':', '-').replace('+', 'plus')
+            output_path = output_dir / f"{config['name_en']}_{safe_timestamp}.png"
+        store_outputs[i] = output_path.name
         
-        # Hoppa över om filen redan existerar (såvida inte --force används)
-        if output_path.exists() and not force:
-            print(f"⏭️ Hoppar över befintlig fil")
+        # Hoppa över bildrutor som journalen (--resume) redan har markerat som klara
+        if not force and is_completed(journal, parameter, timestamp, output_path):
+            published_path = completed_output_path(journal, parameter, timestamp, output_dir)
+            print(f"⏭️ Redan klar enligt journalen: {published_path.name}")
             successful_count += 1
+            manifest[timestamp] = manifest_entry(published_path)
+            statistics = completed_statistics(journal, parameter, timestamp)
+            if statistics is not None:
+                frame_stats[timestamp] = statistics
             continue
-        elif output_path.exists() and force:
-            print(f"🔄 Skriver över befintlig fil")
         
-        # Extrahera parameterdata för denna tidsstämpel
-        lons, lats, values = extract_parameter_data_for_timestamp(
-            area_data, timestamp_prefix, water_point_cache, parameter
+        tasks.append((i, timestamp, output_path))
+    
+    # Web Mercator: radtabellen byggs en gång, täckningsrastern (alfa) flyttas om en gång
+    # och varje grid flyttas om efter maskningen
+    row_remap = projection_remap(projection, bbox, water_mask_grid.shape[0])
+    if row_remap is not None and water_coverage is not None:
+        water_coverage = remap_rows(water_coverage, row_remap)
+    grid_water = water_mask_grid if row_remap is None else remap_rows(water_mask_grid, row_remap)
+    
+    grid_store = None
+    if grid_store_dir is not None and forecast is not None:
+        grid_store = prepare_grid_store(
+            grid_store_dir, parameter, all_timestamps, store_outputs,
+            grid_water, water_coverage, bbox, projection, input_sha1, run_key
         )
-        
-        if len(lons) > 0:
-            # Skapa interpolerad bild
-            success = create_interpolated_image(
-                lons, lats, values, water_mask_grid, 
-                output_path, timestamp, bbox, parameter
-            )
-            if success:
-                successful_count += 1
-        else:
-            print(f"⚠️ Ingen {param_name}-data för {timestamp}")
+    
+    # Oförändrade bildrutor från förra körningen (som också finns i grid-lagret) renderas inte om
+    remaining = []
+    for task in tasks:
+        time_index, timestamp, _ = task
+        existing = published_entry(previous_manifest, timestamp, output_dir)
+        if existing is None or (grid_store is not None and not grid_store['meta']['written'][time_index]):
+            remaining.append(task)
+            continue
+        print(f"⏭️ Oförändrad sedan förra körningen: {existing['file']}")
+        successful_count += 1
+        manifest[timestamp] = existing
+        statistics = previous_statistics.get(timestamp)
+        if statistics is not None:
+            frame_stats[timestamp] = statistics
+        record_completed(journal, parameter, timestamp, output_dir / existing['file'], statistics)
+    tasks = remaining
+    
+    # Källornas grid-lager används bara om de gäller samma tidssteg, indata och inställningar
+    source_stores = {}
+    for source, store_dir in (source_store_dirs or {}).items():
+        store = open_grid_store(store_dir)
+        if (store is not None and store['meta']['timestamps'] == list(all_timestamps)
+                and store['meta'].get('input_sha1') == input_sha1 and store['meta'].get('run_key') == run_key):
+            source_stores[source] = store
+    
+    # Delad kontext för alla bildrutor (skickas en gång per arbetsprocess)
+    lattice = forecast['lattice'] if use_lattice and forecast is not None else None
+    context = {
+        'parameter': parameter,
+        'total': len(timestamps),
+        'area_data': area_data,
+        'water_point_cache': water_point_cache,
+        'water_mask_grid': water_mask_grid,
+        'bbox': bbox,
+        'forecast': forecast,
+        'memory_budget_mb': memory_budget_mb,
+        'water_coverage': water_coverage,
+        'method': method,
+        'adaptive_tolerance': adaptive_tolerance,
+        'fill': fill,
+        'lattice': lattice,
+        'row_remap': row_remap,
+        'artifacts': artifacts,
+        'artifact_inputs': artifact_inputs,
+        'grid_settings': grid_settings_for(parameter, method, fill, adaptive_tolerance, projection, lattice),
+        'grid_store': grid_store,
+        'source_stores': source_stores,
+        'grid_water': grid_water,
+        'keep_grids': kept_grids is not None,
+        'source_grids': source_grids if derived is not None else {},
+        'figure': figure or {},
+    }
+    
+    def journal_frame(task, result):
+        if result:
+            _, timestamp, output_path = task
+            statistics = result if isinstance(result, dict) else None
+            if statistics is not None:
+                frame_stats[timestamp] = statistics
+            manifest[timestamp] = publish_frame(output_path)
+            record_completed(journal, parameter, timestamp, output_dir / manifest[timestamp]['file'], statistics)
+    
+    def encoded_frame(task, result):
+        if isinstance(result, tuple):
+            # Källa till ett härlett lager: griden som bilden ritades från behålls i minnet
+            result, kept_grids[task[1]] = result
+        if result:
+            store_frame_image(context, parameter, task)
+        journal_frame(task, result)
+    
+    # Bildrutor vars kodade bild redan finns i artefaktcachen behöver inte renderas alls
+    tasks, restored_count = restore_cached_images(parameter, tasks, context, on_restored=journal_frame)
+    successful_count += restored_count
+    
+    if pipeline_queue_size > 0:
+        results = run_parameter_pipeline(parameter, tasks, context, pipeline_queue_size, on_result=encoded_frame)
+    else:
+        # Ett härlett lager interpoleras inte och läser källgrids ur huvudprocessens minne
+        results = run_frames(
+            render_parameter_frame, tasks, context, workers if derived is None else 1, on_result=encoded_frame
+        )
+    successful_count += sum(1 for success in results if success)
+    remove_stale_images(output_dir, {entry['file'] for entry in manifest.values()})
     
     print(f"\n🎉 {param_name.title()}: Genererade {successful_count}/{len(timestamps)} bilder")
     
@@ -532,94 +1381,300 @@ def generate_images_for_parameter(parameter, area_data, water_point_cache, water
         "unit": config['unit'],
         "bbox": bbox,
         "total_images": successful_count,
-        "timestamps": area_data['metadata']['timestamps'],
+        "timestamps": all_timestamps,
         "colormap": config['colormap'],
         "resolution": resolution,
+        "interpolation_method": method,
+        "projection": PROJECTIONS[projection],
+        "run_key": run_key,
+        "derived_from": derived['sources'] if derived is not None else None,
+        "statistics": statistics_metadata(
+            {timestamp: frame_stats[timestamp] for timestamp in all_timestamps if timestamp in frame_stats},
+            colormap_range(parameter)
+        ),
+        "images": ordered_manifest(manifest, all_timestamps),
         "generated_at": datetime.now().isoformat()
     }
     
-    metadata_path = output_dir / "metadata.json"
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    write_json_atomic(metadata, metadata_path, indent=2)
     
     print(f"📋 {param_name.title()} metadata sparad i: {metadata_path}")
     return successful_count, len(timestamps)
 
-def main():
-    parser = argparse.ArgumentParser(description='Generera bilder för marina parametrar')
-    parser.add_argument('--parameter', choices=['current', 'temperature', 'salinity', 'all'], 
-                       default='all', help='Parameter att generera bilder för (default: all)')
+def add_render_arguments(parser, output_help='<parameter>'):
+    """
+    Flaggor som alla rasterbildgeneratorer delar (indata, interpolation, mask, lägen, cacher).
+    output_help är mappen som --roi-bilderna hamnar under, i hjälptexten.
+    """
     parser.add_argument('--input', default='public/data/area-parameters-extended.json.gz', 
                        help='Sökväg till komprimerad area-parameters fil')
     parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
                        help='Sökväg till vattenmask GeoJSON')
-    parser.add_argument('--output-base-dir', default='public/data',
-                       help='Bas-directory för output (parameter-specifika mappar skapas automatiskt)')
     parser.add_argument('--max-images', type=int, default=None,
                        help='Maximal antal bilder att generera per parameter (för testning)')
     parser.add_argument('--resolution', type=int, default=1200,
                        help='Grid-upplösning för interpolation (default: 1200x1200)')
-    parser.add_argument('--force', action='store_true',
-                       help='Skriv över befintliga bilder (standard: hoppa över befintliga)')
-    
-    args = parser.parse_args()
-    
-    print("🌊 MARINA PARAMETER BILDGENERATOR")
-    print("=" * 50)
-    
-    # Bestäm vilka parametrar som ska bearbetas
-    if args.parameter == 'all':
-        parameters = ['current', 'temperature', 'salinity']
-        print("🎯 Genererar bilder för ALLA parametrar")
-    else:
-        parameters = [args.parameter]
-        config = get_parameter_config(args.parameter)
-        print(f"🎯 Genererar bilder för {config['name']}")
-    
-    print(f"📦 Input: {args.input}")
-    print(f"📁 Output bas-directory: {args.output_base_dir}")
-    print(f"🔧 Upplösning: {args.resolution}x{args.resolution}")
-    if args.max_images:
-        print(f"🔬 Testläge: Max {args.max_images} bilder per parameter")
+    parser.add_argument('--force', action='store_true', help=FORCE_HELP)
+    parser.add_argument('--resume', action='store_true',
+                       help='Fortsätt en avbruten körning med samma indata och inställningar (hoppar över färdiga bildrutor)')
+    parser.add_argument('--method', choices=list(INTERPOLATION_BACKENDS), default=DEFAULT_METHOD,
+                       help=f'Interpolationsmetod (default: {DEFAULT_METHOD})')
+    parser.add_argument('--mask-mode', choices=['coverage', 'point'], default='coverage',
+                       help='coverage: cachad master-raster med kantutjämning, point: test per pixelcentrum')
+    parser.add_argument('--mask-master-resolution', type=int, default=DEFAULT_MASTER_RESOLUTION,
+                       help=f'Upplösning för master-rastern i coverage-läge (default: {DEFAULT_MASTER_RESOLUTION})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--low-memory', action='store_true',
+                       help='Lågminnesläge: float32, radblock utan meshgrids, PNG via Pillow')
+    parser.add_argument('--memory-budget-mb', type=float, default=1024,
+                       help='Minnesbudget för hela processen i lågminnesläge; körningen avbryts om topp-RSS överskrider den (default: 1024 MB)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Antal processer för parallell rendering av tidssteg (default: 1). '
+                            'Minnesbudgeten i lågminnesläge gäller per process.')
+    parser.add_argument('--adaptive', action='store_true',
+                       help='Lågminnesläge: adaptiv quadtree som bara förfinar vid kust och stora gradienter')
+    parser.add_argument('--adaptive-tolerance', type=float, default=DEFAULT_TOLERANCE,
+                       help=f'Största avvikelse inom ett quadtree-blad som andel av färgskalan (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--projection', choices=list(PROJECTIONS), default='mercator',
+                       help='mercator: rader likformiga i Web Mercator (exakt kartpassning), latlon: likformiga i latitud (default: mercator)')
+    parser.add_argument('--roi', action='append', metavar='ROI',
+                       help='Rendera bara ett delområde (oresund, goteborg, hano eller namn=lon_min,lon_max,lat_min,lat_max) '
+                            f'med --resolution pixlar; kan anges flera gånger. Bilderna hamnar i {output_help}/roi-<namn>/')
+    parser.add_argument('--fill', choices=['nearest', 'laplace'], default='nearest',
+                       help='Lågminnesläge: fyll luckor utanför datapunkterna med nearest (rakt avstånd) '
+                            'eller laplace (diffusion bara längs vattenvägar, läcker aldrig över land)')
+    parser.add_argument('--artifact-cache', action='store_true',
+                       help='Lågminnesläge: cacha stegens mellanresultat (forecast, vattenpunkter, täckningsraster, '
+                            'grids, bilder) i --cache-dir och räkna bara om steg vars indata eller inställningar ändrats')
+    parser.add_argument('--grid-store', action='store_true',
+                       help='Lågminnesläge: spara varje färdig float-grid i ett minnesmappat lager i --cache-dir (för --recolor)')
+    parser.add_argument('--recolor', action='store_true',
+                       help='Rendera om bilderna direkt från grid-lagret med nuvarande färgskala (ingen interpolation)')
+    parser.add_argument('--pipeline', action='store_true',
+                       help='Lågminnesläge: överlappa interpolation, färgsättning och PNG-skrivning i trådar')
+    parser.add_argument('--pipeline-queue-size', type=int, default=2,
+                       help='Antal bildrutor som får vänta mellan pipeline-stegen (default: 2)')
+    parser.add_argument('--no-lattice', action='store_true',
+                       help='Lågminnesläge: triangulera alltid punkterna som spridda, även när prognosen ligger på ett regelbundet gitter')
+
+def check_render_arguments(parser, args):
+    """Kontrollera kombinationer av flaggorna från add_render_arguments. Returnerar tolkade ROI:er."""
+    if args.adaptive and not args.low_memory:
+        parser.error('--adaptive kräver --low-memory')
+    if args.fill == 'laplace' and (not args.low_memory or args.adaptive or args.roi):
+        parser.error('--fill laplace kräver --low-memory och kan inte kombineras med --adaptive eller --roi')
+    if args.pipeline and not args.low_memory:
+        parser.error('--pipeline kräver --low-memory')
+    if args.pipeline and args.workers > 1:
+        parser.error('--pipeline kan inte kombineras med --workers')
+    if args.pipeline_queue_size < 1:
+        parser.error('--pipeline-queue-size måste vara minst 1')
+    if args.artifact_cache and (not args.low_memory or args.mask_mode != 'coverage' or args.roi):
+        parser.error('--artifact-cache kräver --low-memory och --mask-mode coverage och kan inte kombineras med --roi')
+    if args.grid_store and (not args.low_memory or args.roi):
+        parser.error('--grid-store kräver --low-memory och kan inte kombineras med --roi')
+    if args.recolor and args.roi:
+        parser.error('--recolor kan inte kombineras med --roi')
+    rois = []
+    if args.roi:
+        from roi_rendering import parse_roi
+        try:
+            rois = [parse_roi(spec) for spec in args.roi]
+        except ValueError as e:
+            parser.error(str(e))
+        if args.mask_mode != 'coverage' or args.pipeline or args.adaptive:
+            parser.error('--roi kan inte kombineras med --mask-mode point, --pipeline eller --adaptive')
+    return rois
+
+def render_parameters(args, parameters, rois, output_dirs, journal_dir, frame_name=None, figure=None):
+    """
+    Gemensam körning för rasterbildgeneratorerna: läs indata en gång och rendera varje
+    parameter i parameters till output_dirs[parameter] (flaggor från add_render_arguments).
+    Körjournalen ligger i journal_dir. frame_name(tidsstämpel) och figure (matplotlib-figurens
+    storlek, dpi och interpolation) ersätter standardvärdena i generate_images_for_parameter.
+    """
+    if args.low_memory:
+        print(f"🪶 Lågminnesläge: budget {args.memory_budget_mb:.0f} MB")
+    if args.adaptive:
+        print(f"🌳 Adaptiv quadtree: tolerans {args.adaptive_tolerance} av färgskalan")
+    if args.pipeline:
+        print(f"🏭 Pipeline: interpolation, färgsättning och PNG-skrivning i egna trådar (kö {args.pipeline_queue_size})")
+    if args.workers > 1:
+        print(f"⚙️ Parallell rendering: {args.workers} processer")
+    
+    if args.recolor:
+        # Bara färgsättning från grid-lagret: ingen prognosdata, vattenmask eller interpolation
+        for parameter in parameters:
+            recolor_images_for_parameter(
+                parameter, grid_store_path(args.cache_dir, output_dirs[parameter]), output_dirs[parameter],
+                args.memory_budget_mb, args.workers
+            )
+        return
     
     # Ladda data EN GÅNG (delas mellan alla parametrar)
     print("\n📦 Laddar och förbearbetar data...")
-    water_polygons = load_water_mask(args.water_mask)
-    area_data = load_area_parameters(args.input)
-    
     # Använd EXAKT samma bbox som frontend Map.tsx maxBounds för perfect alignment
     bbox = (10.3, 16.6, 54.9, 59.6)  # (lon_min, lon_max, lat_min, lat_max)
     print(f"🗺️ Bounding box (hårdkodad för frontend alignment): {bbox}")
     
-    # OPTIMERING: Skapa cachade strukturer EN GÅNG
-    print("⚡ Förbearbetar för maximal prestanda...")
-    water_point_cache = create_water_point_cache(area_data, water_polygons)
-    water_mask_grid = create_water_mask_grid(water_polygons, bbox, args.resolution)
-    
-    # Frigör minne från vattenpolygoner (behövs inte längre)
-    del water_polygons
+    # Vattenmasken klipps till bbox och förenklas till den finaste upplösning som används
+    geometry_resolution = max(args.resolution, args.mask_master_resolution) if args.mask_mode == 'coverage' else args.resolution
+    if rois:
+        from roi_rendering import geometry_resolution_for_rois, prepare_rois, generate_roi_images
+        # Samma geometri för hela området, men förenklad för ROI:ernas finare pixlar
+        geometry_resolution = max(geometry_resolution, geometry_resolution_for_rois(bbox, rois, args.resolution))
+    artifacts = open_artifact_cache(args.cache_dir) if args.artifact_cache else None
+    artifact_inputs = None
+    if artifacts is not None:
+        # Artefaktcache: JSON och vattengeometri läses bara om deras steg saknas i cachen
+        forecast, water_coverage, artifact_inputs = load_low_memory_inputs_cached(
+            artifacts, args.input, args.water_mask, bbox, geometry_resolution, args.resolution,
+            args.mask_master_resolution, args.cache_dir, source_parameters(parameters)
+        )
+        water_mask_grid = water_mask_from_coverage(water_coverage)
+        area_data = water_point_cache = None
+    else:
+        water_polygons = load_water_mask(args.water_mask, bbox, geometry_resolution, args.cache_dir)
+        area_data = load_area_parameters(args.input)
+        
+        # OPTIMERING: Skapa cachade strukturer EN GÅNG
+        print("⚡ Förbearbetar för maximal prestanda...")
+        water_point_cache = create_water_point_cache(area_data, water_polygons)
+        if rois:
+            # ROI-läge: täckningsraster per delområde istället för hela området
+            prepared_rois = prepare_rois(
+                rois, water_polygons, args.resolution, args.water_mask, args.mask_master_resolution, args.cache_dir,
+                args.projection
+            )
+            water_coverage = water_mask_grid = None
+        elif args.mask_mode == 'coverage':
+            water_coverage = load_water_coverage(
+                water_polygons, bbox, args.resolution, args.water_mask,
+                args.mask_master_resolution, args.cache_dir
+            )
+            water_mask_grid = water_mask_from_coverage(water_coverage)
+        else:
+            water_coverage = None
+            water_mask_grid = create_water_mask_grid(water_polygons, bbox, args.resolution)
+        
+        # Frigör minne från vattenpolygoner (behövs inte längre)
+        del water_polygons
+        
+        # Lågminnesläge: packa data till float32-arrayer och släpp JSON-strukturen
+        # (ROI-läget renderar alltid via lågminnesvägen)
+        forecast = None
+        if args.low_memory or rois:
+            forecast = load_low_memory_forecast(area_data, water_point_cache, source_parameters(parameters))
+            area_data = None
+    
+    # Körjournal: varje färdig bildruta journalförs direkt så att --resume kan fortsätta
+    # (samma nyckel identifierar grid-lagrens och bildmanifestens innehåll)
+    input_sha1 = file_fingerprint(args.input)
+    run_key = build_run_key(
+        args.input, water_mask=file_fingerprint(args.water_mask), resolution=args.resolution,
+        method=args.method, mask_mode=args.mask_mode, mask_master_resolution=args.mask_master_resolution,
+        low_memory=args.low_memory, adaptive_tolerance=args.adaptive_tolerance if args.adaptive else None,
+        rois=rois or None, projection=args.projection, fill=args.fill, lattice=not args.no_lattice
+    )
+    journal = open_run_journal(journal_dir, run_key, args.resume)
     
     # Generera bilder för varje parameter
     total_successful = 0
     total_images = 0
     
+    # Källgrids till härledda lager, per källa och tidsstämpel (fylls under körningen)
+    source_grids = {
+        source: {} for source in source_parameters([parameter for parameter in parameters if parameter in DERIVED_PARAMETERS])
+    } if not rois else {}
+    
+    def parameter_store_dir(parameter):
+        return grid_store_path(args.cache_dir, output_dirs[parameter])
+    
     for parameter in parameters:
+        if rois and parameter in DERIVED_PARAMETERS:
+            print(f"⚠️ Härledda lager renderas inte i ROI-läge, hoppar över {get_parameter_config(parameter)['name']}")
+            continue
+        if rois:
+            successful, total = generate_roi_images(
+                parameter, forecast, prepared_rois, bbox, output_dirs[parameter],
+                args.resolution, args.max_images, args.force, args.method,
+                args.memory_budget_mb, workers=args.workers, journal=journal, projection=args.projection,
+                use_lattice=not args.no_lattice
+            )
+            total_successful += successful
+            total_images += total
+            continue
+        
         successful, total = generate_images_for_parameter(
             parameter, area_data, water_point_cache, water_mask_grid, bbox,
-            args.output_base_dir, args.resolution, args.max_images, args.force
+            None, args.resolution, args.max_images, args.force,
+            forecast=forecast, memory_budget_mb=args.memory_budget_mb,
+            water_coverage=water_coverage, method=args.method, workers=args.workers,
+            journal=journal, pipeline_queue_size=args.pipeline_queue_size if args.pipeline else 0,
+            adaptive_tolerance=args.adaptive_tolerance if args.adaptive else None,
+            projection=args.projection, fill=args.fill,
+            artifacts=artifacts, artifact_inputs=artifact_inputs,
+            grid_store_dir=parameter_store_dir(parameter) if args.grid_store else None,
+            use_lattice=not args.no_lattice, input_sha1=input_sha1, run_key=run_key, source_grids=source_grids,
+            source_store_dirs={
+                source: parameter_store_dir(source) for source in source_parameters([parameter]) if source != parameter
+            } if args.grid_store else None,
+            output_dir=output_dirs[parameter], frame_name=frame_name, figure=figure
         )
         total_successful += successful
         total_images += total
     
+    report_artifact_cache(artifacts)
+    prune_artifacts(artifacts)
+    
     print("\n" + "=" * 50)
     print("🎉 ALLA PARAMETRAR KLARA!")
     print(f"📊 Totalt: {total_successful}/{total_images} bilder genererade")
-    print(f"📁 Bilder sparade i: {Path(args.output_base_dir).absolute()}")
     
     for parameter in parameters:
-        config = get_parameter_config(parameter)
-        param_dir = Path(args.output_base_dir) / config['output_dir']
-        print(f"   • {config['name'].title()}: {param_dir}")
+        print(f"   • {get_parameter_config(parameter)['name'].title()}: {Path(output_dirs[parameter]).absolute()}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generera bilder för marina parametrar')
+    parser.add_argument('--parameter', choices=FORECAST_PARAMETERS + DERIVED_PARAMETERS + ['all'],
+                       default='all', help='Parameter att generera bilder för (default: all, inklusive härledda lager)')
+    parser.add_argument('--output-base-dir', default='public/data',
+                       help='Bas-directory för output (parameter-specifika mappar skapas automatiskt)')
+    add_render_arguments(parser)
+    
+    args = parser.parse_args(argv)
+    rois = check_render_arguments(parser, args)
+    
+    print("🌊 MARINA PARAMETER BILDGENERATOR")
+    print("=" * 50)
+    
+    # Bestäm vilka parametrar som ska bearbetas
+    if args.parameter == 'all':
+        # Härledda lager sist, så att källornas grids redan finns i minnet
+        parameters = FORECAST_PARAMETERS + DERIVED_PARAMETERS
+        print("🎯 Genererar bilder för ALLA parametrar")
+    else:
+        # Ett härlett lager renderas efter sina källor (vars grids det räknas ur)
+        parameters = [source for source in source_parameters([args.parameter]) if source != args.parameter]
+        parameters.append(args.parameter)
+        config = get_parameter_config(args.parameter)
+        print(f"🎯 Genererar bilder för {config['name']}")
+        if len(parameters) > 1:
+            print(f"   ↳ inklusive källorna {', '.join(parameters[:-1])}")
+    
+    print(f"📦 Input: {args.input}")
+    print(f"📁 Output bas-directory: {args.output_base_dir}")
+    print(f"🔧 Upplösning: {args.resolution}x{args.resolution}")
+    print(f"🧮 Interpolationsmetod: {args.method}")
+    if args.max_images:
+        print(f"🔬 Testläge: Max {args.max_images} bilder per parameter")
+    
+    output_dirs = {
+        parameter: Path(args.output_base_dir) / get_parameter_config(parameter)['output_dir']
+        for parameter in parameters
+    }
+    render_parameters(args, parameters, rois, output_dirs, args.output_base_dir)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -4,43 +4,50 @@ Generera bara en specifik bild för snabb testning
 """
 
 import sys
-import os
 sys.path.append('scripts')
 
-# Importera från huvudscriptet
-from generate_current_magnitude_images import (
+# Samma kodväg som huvudscriptet
+from generate_current_magnitude_images import MAGNITUDE_FIGURE
+from generate_marine_parameter_images import (
     load_water_mask, load_area_parameters, create_water_point_cache,
-    create_water_mask_grid, extract_current_data_for_timestamp,
-    create_interpolated_image, get_bbox_from_water_mask
+    extract_parameter_data_for_timestamp, create_interpolated_image
 )
+from mercator_remap import projection_remap, remap_rows
+from water_mask import load_water_coverage, water_mask_from_coverage, DEFAULT_BBOX
 from pathlib import Path
 
+WATER_MASK_PATH = 'public/data/scandinavian-waters.geojson'
+
 def generate_single_image(timestamp):
     """Generera en enda bild för testning"""
     
     print(f"🎯 Genererar bara bild för: {timestamp}")
     
+    # Samma bbox som frontend
+    bbox = DEFAULT_BBOX
+    print(f"🗺️ Bounding box: {bbox}")
+    
     # Ladda data
-    water_polygons = load_water_mask('public/data/scandinavian-waters.geojson')
+    resolution = 1200  # Lägre upplösning för snabb testning
+    water_polygons = load_water_mask(WATER_MASK_PATH, bbox, resolution)
     area_data = load_area_parameters('public/data/area-parameters-extended.json.gz')
     
-    # Beräkna bounding box
-    bbox = get_bbox_from_water_mask(water_polygons)
-    print(f"🗺️ Bounding box: {bbox}")
-    
     # Skapa caches (snabbare för en bild)
-    resolution = 1200  # Lägre upplösning för snabb testning
     water_point_cache = create_water_point_cache(area_data, water_polygons)
-    water_mask_grid = create_water_mask_grid(water_polygons, bbox, resolution)
+    water_coverage = load_water_coverage(water_polygons, bbox, resolution, WATER_MASK_PATH)
+    water_mask_grid = water_mask_from_coverage(water_coverage)
+    row_remap = projection_remap('mercator', bbox, resolution)
+    water_coverage = remap_rows(water_coverage, row_remap)
     
     # Generera bilden
     timestamp_prefix = timestamp[:13]  # "2025-06-29T14"
     safe_timestamp = timestamp.replace(':', '-').replace('+', 'plus')
     output_path = Path(f"public/data/current-magnitude-images/current_magnitude_{safe_timestamp}.png")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     
     print(f"📸 Extraherar data för {timestamp_prefix}...")
-    lons, lats, magnitudes = extract_current_data_for_timestamp(
-        area_data, timestamp_prefix, water_point_cache
+    lons, lats, magnitudes = extract_parameter_data_for_timestamp(
+        area_data, timestamp_prefix, water_point_cache, 'current'
     )
     
     print(f"🔢 Hittade {len(lons)} datapunkter")
@@ -50,8 +57,9 @@ def generate_single_image(timestamp):
     
     if len(lons) > 0:
         success = create_interpolated_image(
-            lons, lats, magnitudes, water_mask_grid, 
-            output_path, timestamp, bbox
+            lons, lats, magnitudes, water_mask_grid,
+            output_path, timestamp, bbox, 'current', water_coverage,
+            row_remap=row_remap, **MAGNITUDE_FIGURE
         )
         if success:
             print(f"✅ Bild genererad: {output_path}")
@@ -70,4 +78,4 @@ if __name__ == "__main__":
         print(f"\n🎉 Klar! Nu kan du testa bilden i appen.")
         print(f"💡 Om den nu visar rätt färg (orange/röd), kan du köra:")
         print(f"   python scripts/generate_current_magnitude_images.py")
-        print(f"   för att regenerera alla bilder med fixen.") 
\ No newline at end of file
+        print(f"   för att regenerera alla bilder med fixen.") 
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Ekvivalenstest för snabba vägar mot referensimplementationen (golden output).
+
+Varje snabbare läge (rasteriserad mask, täckningsmask, lågminnesinterpolation,
+adaptiv quadtree, ...) körs på samma indata som referensen:
+
+    mask   create_water_mask_grid (punkt-i-polygon per pixel)
+    grid   interpolate_reference_grid (matplotlib-vägens interpolation, float64)
+    bild   matplotlibs färgskala per pixel (samma som imshow utan omsampling)
+
+Masker jämförs exakt, utom pixlar vars samplingspunkt ligger precis på en
+polygonkant (t.ex. bbox-klippningen) där kantregeln skiljer; lägen som medvetet
+avviker vid kusten får dessutom bara avvika i kantpixlar med delvis vattentäckning. Grids jämförs mot en dokumenterad tolerans
+i parameterns enhet (GRID_TOLERANCES, andel av färgskalans spann) och bilder mot
+en tolerans i färgnivåer som följer av gridtoleransen och färgskalans brantaste
+segment. För varje jämförelse sparas en skillnadskarta (PNG, ljusare = större
+skillnad, mättad = över toleransen) och en JSON-rapport, så att ett prestandaläge
+kan godkännas eller underkännas på mätningar.
+
+Gitterläget (lattice) interpolerar med en annan interpolant än referensen och jämförs
+med en tolerans per pixel: tätare inne i vattnet, vidare vid kusten, och inte alls där
+båda vägarna bara fyller med sin fallback eller nära extrapunkterna.
+
+Indata: ett syntetiskt fall (släta analytiska fält, ö, halvö och smalt sund), samma fall
+på ett regelbundet gitter när gitterläget körs och, med --input, ett tidssteg ur en
+riktig prognosfil med vattenmasken.
+"""
+
+import json
+import math
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+
+from interpolation_backends import INTERPOLATION_BACKENDS, DEFAULT_METHOD
+from water_mask import (
+    rasterize_polygons, load_water_coverage, water_mask_from_coverage, load_clipped_water_polygons, points_in_water,
+    DEFAULT_BBOX, DEFAULT_CACHE_DIR
+)
+from generate_marine_parameter_images import (
+    create_colormap, colormap_range, create_water_mask_grid, interpolate_reference_grid,
+    FORECAST_PARAMETERS
+)
+from forecast_arrays import (
+    load_area_parameters, load_forecast_arrays, parameter_values, detect_regular_lattice, lattice_cells
+)
+from low_memory_grid import compute_grid_low_memory, colorize_grid_rgba, save_rgba_png, IMAGE_ALPHA
+from adaptive_grid import compute_grid_adaptive, DEFAULT_TOLERANCE
+from lattice_interpolation import lattice_supports, EXTRA_NEIGHBORHOOD_CELLS
+
+# Tillåten avvikelse per grid-läge som andel av färgskalans spann
+# (low-memory: float32 istället för float64; adaptive: quadtree-toleransen plus float32;
+# lattice: kubisk B-spline på gittret istället för Clough-Tocher över trianguleringen)
+FLOAT32_TOLERANCE = 1e-4
+GRID_TOLERANCES = {
+    'low-memory': FLOAT32_TOLERANCE,
+    'adaptive': DEFAULT_TOLERANCE + FLOAT32_TOLERANCE,
+    'lattice': 0.015,
+}
+
+# Gitterläget vid kusten (pixlar inom LATTICE_COAST_CELLS celler från en gittercell utan data):
+# landcellerna fylls med närmaste cell med data, trianguleringen har sitt hölje och nearest.
+# Pixlar vars närmaste gittercell saknar data fylls av båda vägarnas fallback och jämförs inte,
+# inte heller extrapunkternas omgivning (trianguleringen och den lokala korrektionen har olika stöd)
+LATTICE_COAST_TOLERANCE = 0.04
+LATTICE_COAST_CELLS = 2
+
+# Extrapunkternas omgivning i celler: korrektionens stöd plus en ring där trianguleringens
+# gradientskattningar (Clough-Tocher) fortfarande påverkas av extrapunkten
+LATTICE_EXTRA_CELLS = EXTRA_NEIGHBORHOOD_CELLS + 1
+
+# Bildtoleransen är minst så här många färgnivåer
+MIN_IMAGE_TOLERANCE = 1
+
+# Upplösning för jämförelserna (referensmasken testar varje pixel med shapely)
+DEFAULT_RESOLUTION = 200
+
+# Master-upplösning för täckningsmasken i testet
+COVERAGE_MASTER_RESOLUTION = 1600
+
+# Samplingspunkter närmare en polygonkant än så här (grader) räknas som tvetydiga:
+# referensen (shapely contains) utesluter kanten, rasteriseringen tar med halva
+BOUNDARY_EPSILON = 1e-9
+
+def synthetic_case(work_dir, bbox=DEFAULT_BBOX, spacing=0.1, seed=0, jitter=0.3):
+    """
+    Syntetiskt fall: hav med en ö, en halvö och ett smalt sund, datapunkter på
+    ett skakat gitter (jitter i andelar av gitteravståndet) och släta analytiska
+    fält inom färgskalornas spann. Med jitter=0 ligger punkterna på ett regelbundet
+    gitter (som DKSS-prognosen) och landcellerna saknas.
+    """
+    from shapely.geometry import box, Point, Polygon
+
+    lon_min, lon_max, lat_min, lat_max = bbox
+    sea = box(lon_min, lat_min, lon_max, lat_max)
+    sea = sea.difference(Point(13.4, 57.2).buffer(0.7))
+    sea = sea.difference(Polygon([(14.6, 54.9), (16.6, 54.9), (16.6, 58.5), (15.2, 57.0), (14.9, 55.8)]))
+    # Smalt sund mellan två landmassor (några pixlar brett i standardupplösningen)
+    sea = sea.difference(box(11.0, 55.6, 12.2, 56.3)).difference(box(12.26, 55.6, 13.0, 56.3))
+    water_polygons = list(getattr(sea, 'geoms', [sea]))
+
+    water_path = Path(work_dir) / 'synthetic-water.geojson'
+    features = [
+        {'type': 'Feature', 'properties': {}, 'geometry': polygon.__geo_interface__}
+        for polygon in water_polygons
+    ]
+    with open(water_path, 'w', encoding='utf-8') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f)
+
+    rng = np.random.default_rng(seed)
+    lon_axis = np.arange(lon_min, lon_max + spacing / 2, spacing)
+    lat_axis = np.arange(lat_min, lat_max + spacing / 2, spacing)
+    lons, lats = (axis.ravel() for axis in np.meshgrid(lon_axis, lat_axis))
+    lons = lons + rng.uniform(-jitter, jitter, lons.size) * spacing
+    lats = lats + rng.uniform(-jitter, jitter, lats.size) * spacing
+    in_water = points_in_water(lons, lats, water_polygons)
+    lons, lats = lons[in_water], lats[in_water]
+
+    values = {
+        'temperature': 12.0 + 5.0 * np.sin(0.9 * lons) * np.cos(1.3 * lats),
+        'salinity': 20.0 + 10.0 * np.cos(0.7 * lons + 0.4 * lats),
+        'current': 0.4 + 0.3 * np.sin(2.0 * lons) * np.sin(2.0 * lats),
+    }
+    return {
+        'name': 'synthetic' if jitter else 'synthetic-lattice', 'bbox': bbox, 'water_polygons': water_polygons,
+        'water_path': water_path, 'lons': lons, 'lats': lats, 'values': values,
+        'lattice': detect_regular_lattice(lons, lats),
+    }
+
+def sample_case(input_path, water_mask_path, resolution, time_index, cache_dir, bbox=DEFAULT_BBOX):
+    """Ett tidssteg ur en riktig prognosfil med den klippta vattenmasken"""
+    water_polygons = load_clipped_water_polygons(water_mask_path, bbox, max(resolution, COVERAGE_MASTER_RESOLUTION), cache_dir)
+    arrays = load_forecast_arrays(load_area_parameters(input_path))
+    in_water = points_in_water(arrays['lons'], arrays['lats'], water_polygons)
+
+    lons, lats, values = {}, {}, {}
+    for parameter in FORECAST_PARAMETERS:
+        column = parameter_values(arrays, parameter)[:, time_index]
+        valid = in_water & np.isfinite(column)
+        lons[parameter], lats[parameter], values[parameter] = arrays['lons'][valid], arrays['lats'][valid], column[valid]
+    return {
+        'name': f"sample-t{time_index}", 'bbox': bbox, 'water_polygons': water_polygons,
+        'water_path': Path(water_mask_path), 'lons': lons, 'lats': lats, 'values': values,
+        'timestamp': arrays['timestamps'][time_index],
+        'lattice': detect_regular_lattice(arrays['lons'], arrays['lats']),
+    }
+
+def case_points(case, parameter):
+    """(lons, lats, values) för en parameter (syntetiska fall delar koordinater)"""
+    lons, lats = case['lons'], case['lats']
+    if isinstance(lons, dict):
+        lons, lats = lons[parameter], lats[parameter]
+    return lons, lats, case['values'][parameter]
+
+def grid_axes(bbox, resolution):
+    lon_min, lon_max, lat_min, lat_max = bbox
+    return np.linspace(lon_min, lon_max, resolution), np.linspace(lat_min, lat_max, resolution)
+
+# Maskläge → funktion (fall, upplösning, arbetskatalog) → (mask, pixlar där avvikelse är tillåten eller None)
+def raster_mask(case, resolution, work_dir):
+    xs, ys = grid_axes(case['bbox'], resolution)
+    return rasterize_polygons(case['water_polygons'], xs, ys), None
+
+def coverage_mask(case, resolution, work_dir):
+    coverage = load_water_coverage(
+        case['water_polygons'], case['bbox'], resolution, case['water_path'],
+        COVERAGE_MASTER_RESOLUTION, Path(work_dir) / 'cache'
+    )
+    # Täckningsmasken tar med alla pixlar med någon vattentäckning: bara kantpixlar får avvika
+    return water_mask_from_coverage(coverage), (coverage > 0) & (coverage < 1)
+
+MASK_MODES = {
+    'raster': raster_mask,
+    'coverage': coverage_mask,
+}
+
+# Grid-läge → funktion (lons, lats, values, mask, bbox, parameter, metod, gitter) → float-grid,
+# eller None om läget inte är tillämpligt på fallet
+def low_memory_grid(lons, lats, values, water_mask_grid, bbox, parameter, method, lattice):
+    chunk_rows = max(1, water_mask_grid.shape[0] // 8)
+    return compute_grid_low_memory(lons, lats, values, water_mask_grid, bbox, parameter, chunk_rows, method)
+
+def adaptive_grid(lons, lats, values, water_mask_grid, bbox, parameter, method, lattice):
+    vmin, vmax = colormap_range(parameter)
+    grid_values, _ = compute_grid_adaptive(
+        lons, lats, values, water_mask_grid, bbox, parameter, DEFAULT_TOLERANCE * (vmax - vmin), method=method
+    )
+    return grid_values
+
+def lattice_grid(lons, lats, values, water_mask_grid, bbox, parameter, method, lattice):
+    if not lattice_supports(lattice, method):
+        return None
+    chunk_rows = max(1, water_mask_grid.shape[0] // 8)
+    return compute_grid_low_memory(
+        lons, lats, values, water_mask_grid, bbox, parameter, chunk_rows, method, lattice=lattice
+    )
+
+GRID_MODES = {
+    'low-memory': low_memory_grid,
+    'adaptive': adaptive_grid,
+    'lattice': lattice_grid,
+}
+
+def lattice_tolerance_share(lattice, lons, lats, xs, ys):
+    """
+    Tillåten avvikelse (andel av spannet) per pixel för gitterläget, efter pixelns närmaste
+    gittercell: inne i vattnet, vid kusten, eller oändlig där jämförelsen inte är meningsfull
+    (cellen saknar data, eller cellen ligger vid en extrapunkt bland lons/lats)
+    """
+    from scipy.ndimage import binary_dilation
+
+    rows, cols, on_lattice = lattice_cells(lattice, lons, lats)
+    missing = np.ones((lattice['nlat'], lattice['nlon']), dtype=bool)
+    missing[rows[on_lattice], cols[on_lattice]] = False
+    share = np.where(binary_dilation(missing, iterations=LATTICE_COAST_CELLS), LATTICE_COAST_TOLERANCE, GRID_TOLERANCES['lattice'])
+    share[missing] = np.inf
+    for row, col in zip(rows[~on_lattice], cols[~on_lattice]):
+        share[max(0, row - LATTICE_EXTRA_CELLS):row + LATTICE_EXTRA_CELLS + 1,
+              max(0, col - LATTICE_EXTRA_CELLS):col + LATTICE_EXTRA_CELLS + 1] = np.inf
+
+    pixel_rows = np.clip(np.rint((ys - lattice['lat0']) / lattice['dlat']), 0, lattice['nlat'] - 1).astype(np.int64)
+    pixel_cols = np.clip(np.rint((xs - lattice['lon0']) / lattice['dlon']), 0, lattice['nlon'] - 1).astype(np.int64)
+    return share[pixel_rows[:, None], pixel_cols[None, :]]
+
+def tolerance_share(mode, case, lons, lats, xs, ys):
+    """Tillåten gridavvikelse (andel av spannet) för ett läge: ett tal, eller ett raster per pixel"""
+    if mode != 'lattice':
+        return GRID_TOLERANCES[mode]
+    return lattice_tolerance_share(case['lattice'], lons, lats, xs, ys)
+
+def image_tolerance(parameter, grid_tolerance):
+    """
+    Färgnivåer som en gridavvikelse på grid_tolerance (andel av spannet) högst kan ge:
+    färgskalans brantaste steg mellan två uppslagsfack gånger antalet fack avvikelsen
+    spänner över, plus ett fack för avrundning vid en facksgräns.
+    """
+    cmap, _, _ = create_colormap(parameter)
+    lut = cmap(np.linspace(0.0, 1.0, cmap.N), bytes=True)[:, :3].astype(np.int16)
+    step = int(np.abs(np.diff(lut, axis=0)).max())
+    return max(MIN_IMAGE_TOLERANCE, math.ceil(step * (cmap.N * grid_tolerance + 1)))
+
+def image_tolerance_levels(parameter, share):
+    """
+    image_tolerance för en tolerans per pixel (tal eller raster i gridens orientering);
+    pixlar med oändlig tolerans jämförs inte
+    """
+    share = np.asarray(share)
+    levels = np.full(share.shape, np.inf)
+    for value in np.unique(share[np.isfinite(share)]):
+        levels[share == value] = image_tolerance(parameter, float(value))
+    return levels if levels.ndim == 2 else int(levels)
+
+def reference_rgba(grid_values, parameter):
+    """Referensbild: matplotlibs normalisering (float64) och färgskala per pixel, norr uppåt"""
+    cmap, vmin, vmax = create_colormap(parameter)
+    rgba = cmap((np.asarray(grid_values, dtype=np.float64) - vmin) / (vmax - vmin), bytes=True)
+    rgba[..., 3] = np.where(np.isnan(grid_values), 0, np.uint8(round(IMAGE_ALPHA * 255)))
+    return rgba[::-1]
+
+def candidate_rgba(grid_values, parameter):
+    cmap, vmin, vmax = create_colormap(parameter)
+    return colorize_grid_rgba(grid_values, cmap, vmin, vmax, max(1, grid_values.shape[0] // 8))
+
+def save_difference_map(difference, limit, output_path):
+    """Skillnadskarta: 0 → mörkt, limit och över → mättat, NaN (ingen jämförelse) transparent"""
+    import matplotlib
+
+    rgba = colorize_grid_rgba(
+        np.asarray(difference, dtype=np.float32), matplotlib.colormaps['inferno'], 0.0, limit,
+        difference.shape[0], alpha=1.0
+    )
+    save_rgba_png(rgba, output_path)
+
+def boundary_samples(water_polygons, xs, ys, mismatched):
+    """Bool-raster: avvikande pixlar vars samplingspunkt ligger på en polygonkant"""
+    from shapely import distance, points
+
+    rows, columns = np.nonzero(mismatched)
+    on_boundary = np.zeros(mismatched.shape, dtype=bool)
+    if rows.size:
+        samples = points(xs[columns], ys[rows])
+        gap = np.min([distance(polygon.boundary, samples) for polygon in water_polygons], axis=0)
+        on_boundary[rows, columns] = gap < BOUNDARY_EPSILON
+    return on_boundary
+
+def compare_masks(reference, candidate, allowed=None):
+    """Exakt maskjämförelse; med allowed får avvikelser bara finnas i de pixlarna"""
+    mismatched = reference != candidate
+    outside_allowed = mismatched if allowed is None else mismatched & ~allowed
+    return {
+        'mismatched_pixels': int(np.count_nonzero(mismatched)),
+        'mismatched_share': round(float(mismatched.mean()), 6),
+        'mismatched_outside_tolerance': int(np.count_nonzero(outside_allowed)),
+        'passed': not outside_allowed.any(),
+    }, mismatched.astype(np.float32)
+
+def compare_grids(reference, candidate, tolerance):
+    """
+    Gridjämförelse mot en absolut tolerans (ett tal eller ett raster per pixel, där
+    oändlig tolerans betyder att pixeln inte jämförs); NaN måste ligga på samma pixlar
+    """
+    reference_nan = np.isnan(reference)
+    nan_mismatch = reference_nan != np.isnan(candidate)
+    difference = np.abs(np.asarray(candidate, dtype=np.float64) - reference)
+    both = ~reference_nan & ~nan_mismatch
+    compared = both & np.isfinite(tolerance)
+    values = difference[compared]
+    summary = {
+        'tolerance': float(np.max(tolerance, initial=0.0, where=np.isfinite(tolerance))),
+        'max_abs': float(values.max()) if values.size else 0.0,
+        'mean_abs': float(values.mean()) if values.size else 0.0,
+        'p99_abs': float(np.percentile(values, 99)) if values.size else 0.0,
+        'over_tolerance_pixels': int(np.count_nonzero((difference > tolerance) & compared)),
+        'nan_mismatch_pixels': int(np.count_nonzero(nan_mismatch)),
+        'uncompared_pixels': int(np.count_nonzero(both & ~np.isfinite(tolerance))),
+    }
+    summary['passed'] = summary['over_tolerance_pixels'] == 0 and summary['nan_mismatch_pixels'] == 0
+    # Skillnadskartan: NaN-avvikelser räknas som mättade, pixlar som inte jämförs är genomskinliga
+    difference_map = np.where(nan_mismatch, np.inf, np.where(compared, difference, np.nan))
+    return summary, difference_map
+
+def compare_images(reference, candidate, tolerance):
+    """
+    Bildjämförelse per kanal (färgnivåer 0-255, toleransen ett tal eller ett raster per
+    pixel i gridens orientering där oändlig tolerans betyder att pixeln inte jämförs)
+    """
+    # Bilderna har norr uppåt, skillnaden räknas i gridens orientering
+    difference = np.abs(reference.astype(np.int16) - candidate.astype(np.int16)).max(axis=2)[::-1]
+    compared = np.broadcast_to(np.isfinite(tolerance), difference.shape)
+    summary = {
+        'tolerance_levels': int(np.max(tolerance, initial=0, where=np.isfinite(tolerance))),
+        'max_channel_diff': int(difference.max(initial=0, where=compared)),
+        'differing_pixels': int(np.count_nonzero(difference[compared])),
+        'over_tolerance_pixels': int(np.count_nonzero(difference > tolerance)),
+        'uncompared_pixels': int(np.count_nonzero(~compared)),
+    }
+    summary['passed'] = summary['over_tolerance_pixels'] == 0
+    # Skillnadskartan i gridens orientering (origin='lower')
+    return summary, np.where(compared, difference, np.nan).astype(np.float32)
+
+def _status(passed):
+    return '✅' if passed else '❌'
+
+def run_case(case, resolution, parameters, method, mask_modes, grid_modes, report_dir, work_dir):
+    """Kör referensen och alla valda lägen för ett fall; returnerar fallets rapport"""
+    report = {'masks': {}, 'grids': {}, 'images': {}}
+    case_dir = Path(report_dir) / case['name']
+    case_dir.mkdir(parents=True, exist_ok=True)
+    print(f"\n🧪 Fall {case['name']}: {resolution}x{resolution}, metod {method}")
+
+    reference_mask = create_water_mask_grid(case['water_polygons'], case['bbox'], resolution)
+    xs, ys = grid_axes(case['bbox'], resolution)
+    for mode in mask_modes:
+        mask, allowed = MASK_MODES[mode](case, resolution, work_dir)
+        ambiguous = boundary_samples(case['water_polygons'], xs, ys, reference_mask != mask)
+        summary, difference = compare_masks(reference_mask, mask, ambiguous if allowed is None else allowed | ambiguous)
+        save_difference_map(difference, 1.0, case_dir / f"mask-{mode}.png")
+        report['masks'][mode] = summary
+        print(f"   {_status(summary['passed'])} mask {mode}: {summary['mismatched_pixels']} avvikande pixlar "
+              f"({summary['mismatched_outside_tolerance']} utanför toleransen)")
+
+    for parameter in parameters:
+        lons, lats, values = case_points(case, parameter)
+        vmin, vmax = colormap_range(parameter)
+        reference, _ = interpolate_reference_grid(lons, lats, values, reference_mask, case['bbox'], parameter, method)
+        reference_image = reference_rgba(reference, parameter)
+
+        for mode in grid_modes:
+            candidate = GRID_MODES[mode](
+                lons, lats, values, reference_mask, case['bbox'], parameter, method, case.get('lattice')
+            )
+            if candidate is None:
+                print(f"   ⏭️ grid {parameter}/{mode}: inte tillämpligt (inget regelbundet gitter för metoden)")
+                continue
+            share = tolerance_share(mode, case, lons, lats, xs, ys)
+            tolerance = share * (vmax - vmin)
+            summary, difference = compare_grids(reference, candidate, tolerance)
+            # Skillnadskartorna normeras med toleransen (mättad = över toleransen i pixeln)
+            save_difference_map(difference / tolerance, 1.0, case_dir / f"grid-{parameter}-{mode}.png")
+            report['grids'][f"{parameter}/{mode}"] = summary
+            print(f"   {_status(summary['passed'])} grid {parameter}/{mode}: max {summary['max_abs']:.2e} "
+                  f"(tolerans {summary['tolerance']:.2e}), {summary['nan_mismatch_pixels']} NaN-avvikelser")
+
+            levels = image_tolerance_levels(parameter, share)
+            summary, difference = compare_images(reference_image, candidate_rgba(candidate, parameter), levels)
+            save_difference_map(difference / levels, 1.0, case_dir / f"image-{parameter}-{mode}.png")
+            report['images'][f"{parameter}/{mode}"] = summary
+            print(f"   {_status(summary['passed'])} bild {parameter}/{mode}: max {summary['max_channel_diff']} "
+                  f"nivåer (tolerans {summary['tolerance_levels']}), {summary['differing_pixels']} pixlar skiljer")
+
+    return report
+
+def report_passed(report):
+    return all(
+        entry['passed'] for case in report['cases'].values()
+        for section in case.values() for entry in section.values()
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Jämför snabba vägar mot referensimplementationen (masker, grids, bilder)')
+    parser.add_argument('--input', default=None,
+                       help='Prognosfil för ett riktigt fall utöver det syntetiska (t.ex. public/data/area-parameters-extended.json.gz)')
+    parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Vattenmask GeoJSON för det riktiga fallet')
+    parser.add_argument('--time-index', type=int, default=0,
+                       help='Tidssteg i prognosfilen (default: 0)')
+    parser.add_argument('--no-synthetic', action='store_true',
+                       help='Hoppa över det syntetiska fallet')
+    parser.add_argument('--resolution', type=int, default=DEFAULT_RESOLUTION,
+                       help=f'Grid-upplösning (default: {DEFAULT_RESOLUTION}; referensmasken testar varje pixel)')
+    parser.add_argument('--parameter', choices=FORECAST_PARAMETERS + ['all'], default='all',
+                       help='Parameter att jämföra (default: all)')
+    parser.add_argument('--method', choices=list(INTERPOLATION_BACKENDS), default=DEFAULT_METHOD,
+                       help=f'Interpolationsmetod för referens och lägen (default: {DEFAULT_METHOD})')
+    parser.add_argument('--mask-modes', default=','.join(MASK_MODES),
+                       help=f"Kommaseparerade masklägen (default: {','.join(MASK_MODES)})")
+    parser.add_argument('--grid-modes', default=','.join(GRID_MODES),
+                       help=f"Kommaseparerade grid-lägen (default: {','.join(GRID_MODES)})")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för den klippta vattenmasken i det riktiga fallet (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--output-dir', default='golden-report',
+                       help='Katalog för rapport (report.json) och skillnadskartor')
+
+    args = parser.parse_args(argv)
+    mask_modes = [mode for mode in args.mask_modes.split(',') if mode]
+    grid_modes = [mode for mode in args.grid_modes.split(',') if mode]
+    for mode in mask_modes:
+        if mode not in MASK_MODES:
+            parser.error(f"okänt maskläge '{mode}' (välj bland {', '.join(MASK_MODES)})")
+    for mode in grid_modes:
+        if mode not in GRID_MODES:
+            parser.error(f"okänt grid-läge '{mode}' (välj bland {', '.join(GRID_MODES)})")
+    if args.no_synthetic and not args.input:
+        parser.error('--no-synthetic kräver --input')
+    parameters = FORECAST_PARAMETERS if args.parameter == 'all' else [args.parameter]
+
+    report = {
+        'generated_at': datetime.now().isoformat(),
+        'resolution': args.resolution,
+        'method': args.method,
+        'grid_tolerances': GRID_TOLERANCES,
+        'lattice_coast_tolerance': LATTICE_COAST_TOLERANCE,
+        'cases': {},
+    }
+    output_dir = Path(args.output_dir)
+    with tempfile.TemporaryDirectory() as work_dir:
+        cases = []
+        if not args.no_synthetic:
+            cases.append(synthetic_case(work_dir))
+            if 'lattice' in grid_modes:
+                cases.append(synthetic_case(work_dir, jitter=0.0))
+        if args.input:
+            cases.append(sample_case(args.input, args.water_mask, args.resolution, args.time_index, args.cache_dir))
+        for case in cases:
+            report['cases'][case['name']] = run_case(
+                case, args.resolution, parameters, args.method, mask_modes, grid_modes, output_dir, work_dir
+            )
+
+    report['passed'] = report_passed(report)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / 'report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{_status(report['passed'])} {'Alla lägen inom toleranserna' if report['passed'] else 'Något läge avviker'} "
+          f"- rapport och skillnadskartor i {output_dir}")
+    return 0 if report['passed'] else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Minnesmappat lager för färdiga float-grids per (parameter, tidssteg).
+
+Generatorerna sparar den slutliga maskade griden (efter interpolation, fyllning
+och projektion) för varje bildruta, så att en ändrad färgskala eller ett nytt
+bildformat kan renderas om direkt från lagret (--recolor) utan att interpolera
+om något. Bara vattenpixlar lagras: alla bildrutor delar samma mask, så
+lagret är en (tidssteg x vattenpixlar) float32-matris i en .npy-fil som
+minnesmappas. Land tar ingen plats, varje bildruta kan läsas och skrivas för
+sig (även från parallella arbetsprocesser) och värdena är exakt desamma som vid
+renderingen.
+
+Lagret ligger i --cache-dir och hör till en utkatalog:
+
+    store.json    parameter, tidssteg, utfilnamn, vilka bildrutor som är skrivna,
+                  indatafilens SHA1 och körningens nyckel (se run_journal.build_run_key)
+    index.npy     platta index för de lagrade pixlarna (int32)
+    coverage.npy  täckningsraster för alfakanalen (om sådan används)
+    values.npy    (tidssteg x vattenpixlar) float32
+"""
+
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from run_journal import write_json_atomic
+
+# Underkatalog i --cache-dir
+GRID_STORE_DIRNAME = 'grid-store'
+
+# Minnesmappade värdematriser per process (path, läge) → memmap
+_open_values = {}
+
+def grid_store_path(cache_dir, output_dir):
+    """Lagrets katalog för en utkatalog (samma utkatalog → samma lager, oavsett generator)"""
+    output_dir = Path(output_dir)
+    digest = hashlib.sha1(str(output_dir.resolve()).encode('utf-8')).hexdigest()[:12]
+    return Path(cache_dir) / GRID_STORE_DIRNAME / f"{output_dir.name}-{digest}"
+
+def _mask_digest(index, shape):
+    digest = hashlib.sha1()
+    digest.update(np.asarray(shape, dtype=np.int64).tobytes())
+    digest.update(index.tobytes())
+    return digest.hexdigest()
+
+def _values(store, mode):
+    """Värdematrisen som memmap (öppnas en gång per process och läge)"""
+    key = (str(store['path']), mode)
+    values = _open_values.get(key)
+    if values is None:
+        values = np.load(store['path'] / 'values.npy', mmap_mode=mode)
+        _open_values[key] = values
+    return values
+
+def _close(path):
+    for key in [key for key in _open_values if key[0] == str(path)]:
+        del _open_values[key]
+
+def open_grid_store(path):
+    """Öppna ett befintligt lager för läsning, eller None om det saknas"""
+    path = Path(path)
+    try:
+        with open(path / 'store.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return {'path': path, 'meta': meta}
+
+def prepare_grid_store(path, parameter, timestamps, output_names, water_mask, coverage, bbox, projection,
+                       input_sha1=None, run_key=None):
+    """
+    Öppna lagret för skrivning. Ett befintligt lager återanvänds om tidssteg, mask,
+    bbox, projektion, indatafil (input_sha1) och körningens inställningar (run_key)
+    är desamma (t.ex. vid --resume), annars skapas det om så att inga grids från en
+    annan prognos eller interpolation räknas som skrivna.
+    output_names är utfilnamnet per tidssteg (None för tidssteg som inte renderas).
+    """
+    path = Path(path)
+    index = np.flatnonzero(water_mask).astype(np.int32)
+    mask_digest = _mask_digest(index, water_mask.shape)
+
+    store = open_grid_store(path)
+    if store is not None:
+        meta = store['meta']
+        if (meta['parameter'] == parameter and meta['timestamps'] == list(timestamps)
+                and meta['mask_sha1'] == mask_digest and meta['bbox'] == list(bbox)
+                and meta['projection'] == projection and meta.get('input_sha1') == input_sha1
+                and meta.get('run_key') == run_key):
+            meta['outputs'] = [
+                new if new is not None else old for old, new in zip(meta['outputs'], output_names)
+            ]
+            write_json_atomic(meta, path / 'store.json')
+            print(f"🗄️ Grid-lager: {path} ({sum(meta['written'])}/{len(timestamps)} bildrutor sparade sedan tidigare)")
+            return store
+
+    _close(path)
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / 'index.npy', index)
+    if coverage is not None:
+        np.save(path / 'coverage.npy', coverage.astype(np.float32, copy=False))
+    elif (path / 'coverage.npy').exists():
+        (path / 'coverage.npy').unlink()
+
+    # Filen skapas gles; bara rader som markerats som skrivna läses
+    values = np.lib.format.open_memmap(
+        path / 'values.npy', mode='w+', dtype=np.float32, shape=(len(timestamps), index.size)
+    )
+    del values
+
+    meta = {
+        'parameter': parameter,
+        'shape': list(water_mask.shape),
+        'bbox': list(bbox),
+        'projection': projection,
+        'mask_sha1': mask_digest,
+        'input_sha1': input_sha1,
+        'run_key': run_key,
+        'timestamps': list(timestamps),
+        'outputs': list(output_names),
+        'written': [False] * len(timestamps),
+    }
+    write_json_atomic(meta, path / 'store.json')
+    size_mb = len(timestamps) * index.size * 4 / 1024 / 1024
+    print(f"🗄️ Nytt grid-lager: {path} ({len(timestamps)} tidssteg x {index.size} vattenpixlar, {size_mb:.0f} MB)")
+    return {'path': path, 'meta': meta}
+
+def write_store_grid(store, time_index, grid_values):
+    """Skriv en bildrutas grid till lagret (kan köras i en arbetsprocess)"""
+    index = np.load(store['path'] / 'index.npy', mmap_mode='r')
+    values = _values(store, 'r+')
+    values[time_index] = grid_values.reshape(-1)[index]
+    values.flush()
+
+def mark_store_written(store, time_index):
+    """Markera en bildruta som skriven (körs i huvudprocessen när bildrutan är klar)"""
+    store['meta']['written'][time_index] = True
+    write_json_atomic(store['meta'], store['path'] / 'store.json')
+
+def read_store_grid(store, time_index):
+    """Läs en bildrutas grid (NaN utanför de lagrade pixlarna)"""
+    height, width = store['meta']['shape']
+    index = np.load(store['path'] / 'index.npy', mmap_mode='r')
+    grid_values = np.full(height * width, np.nan, dtype=np.float32)
+    grid_values[index] = _values(store, 'r')[time_index]
+    return grid_values.reshape(height, width)
+
+def load_store_coverage(store):
+    """Täckningsrastern som sparades med lagret, eller None"""
+    coverage_path = store['path'] / 'coverage.npy'
+    return np.load(coverage_path, mmap_mode='r') if coverage_path.exists() else None
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Fingeravtryck i bildfilnamn och bildmanifest i metadata.json.
+
+Bildrutor skrivs först under sitt arbetsnamn (<namn>_<tidsstämpel>.png) och
+publiceras sedan under ett namn med innehållets hash (<namn>_<tidsstämpel>.<hash>.png).
+Samma innehåll ger samma namn, så en bildruta som inte ändrats sedan förra körningen
+behåller sin URL och kan cachas som immutable i webbläsare och CDN. Manifestet
+(tidsstämpel → fil, storlek, hash) i metadata.json pekar ut aktuell fil per tidssteg;
+metadata.json själv valideras vid varje hämtning.
+"""
+
+import json
+from pathlib import Path
+
+from water_mask import file_fingerprint
+from run_journal import commit_output
+
+# Antal hex-tecken av SHA1 i filnamnet
+FINGERPRINT_LENGTH = 12
+
+def fingerprinted_path(output_path, sha1):
+    """Publiceringsnamnet för en bildruta: arbetsnamnet med hashen före filändelsen"""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}.{sha1[:FINGERPRINT_LENGTH]}{output_path.suffix}")
+
+def manifest_entry(path, sha1=None):
+    """Manifestpost för en publicerad fil"""
+    path = Path(path)
+    return {
+        'file': path.name,
+        'bytes': path.stat().st_size,
+        'sha1': sha1 or file_fingerprint(path),
+    }
+
+def publish_frame(output_path):
+    """Flytta en färdig bildruta till sitt fingeravtrycksnamn (atomiskt); returnerar manifestposten"""
+    sha1 = file_fingerprint(output_path)
+    published_path = fingerprinted_path(output_path, sha1)
+    commit_output(output_path, published_path)
+    return manifest_entry(published_path, sha1)
+
+def load_manifest(metadata_path, run_key=None):
+    """
+    Bildmanifestet i en tidigare skriven metadata.json (tomt om filen eller manifestet saknas).
+    Med run_key (se run_journal.build_run_key) är manifestet också tomt om bilderna
+    skapades från annan indata eller med andra inställningar.
+    """
+    metadata_path = Path(metadata_path)
+    if not metadata_path.exists():
+        return {}
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if run_key is not None and metadata.get('run_key') != run_key:
+        return {}
+    return metadata.get('images') or {}
+
+def published_entry(manifest, timestamp, directory):
+    """Manifestposten för timestamp om dess fil finns kvar i directory, annars None"""
+    entry = manifest.get(timestamp)
+    if entry is None:
+        return None
+    path = Path(directory) / entry['file']
+    if not path.exists() or path.stat().st_size != entry['bytes']:
+        return None
+    return entry
+
+def ordered_manifest(manifest, timestamps):
+    """Manifestet i tidsstegens ordning (bara tidssteg med publicerad bild)"""
+    return {timestamp: manifest[timestamp] for timestamp in timestamps if timestamp in manifest}
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Utbytbara interpolationsmetoder för bildgeneratorerna.
+
+Varje backend byggs en gång per tidssteg från (punkter, värden) och returnerar
+en funktion som utvärderar godtyckliga koordinater. Samma interpolator kan då
+användas för hela griden (block för block) och för korsvalidering mot
+undanhållna punkter i benchmark_interpolation.py.
+"""
+
+import numpy as np
+
+# Antal grannar för k-NN-baserade metoder (IDW och lokal RBF)
+DEFAULT_NEIGHBORS = 8
+
+# Exponent för inverse distance weighting
+IDW_POWER = 2.0
+
+DEFAULT_METHOD = 'cubic'
+
+def _lon_scale(points):
+    """Skalfaktor för longitud så att avstånd blir ungefär isotropa (cos av medellatitud)"""
+    return np.cos(np.radians(np.mean(points[:, 1])))
+
+def _scaled(xy, lon_scale):
+    """Skala longitud-kolumnen"""
+    scaled = np.array(xy, dtype=np.float64)
+    scaled[:, 0] *= lon_scale
+    return scaled
+
+def _create_linear(points, values, **options):
+    """Linjär interpolation över Delaunay-triangulering (NaN utanför konvexa höljet)"""
+    from scipy.interpolate import LinearNDInterpolator
+    return LinearNDInterpolator(points, values, fill_value=np.nan)
+
+def _create_cubic(points, values, **options):
+    """Clough-Tocher (samma som griddata method='cubic')"""
+    from scipy.interpolate import CloughTocher2DInterpolator
+    return CloughTocher2DInterpolator(points, values, fill_value=np.nan)
+
+def _create_nearest(points, values, **options):
+    """Närmaste punkt (avstånd med cos(lat)-skalad longitud)"""
+    from scipy.spatial import cKDTree
+
+    lon_scale = _lon_scale(points)
+    tree = cKDTree(_scaled(points, lon_scale))
+
+    def evaluate(xi):
+        _, indices = tree.query(_scaled(xi, lon_scale))
+        return values[indices]
+    return evaluate
+
+def _create_idw(points, values, neighbors=DEFAULT_NEIGHBORS, power=IDW_POWER, **options):
+    """k-NN inverse distance weighting"""
+    from scipy.spatial import cKDTree
+
+    lon_scale = _lon_scale(points)
+    tree = cKDTree(_scaled(points, lon_scale))
+    k = min(neighbors, len(values))
+
+    def evaluate(xi):
+        distances, indices = tree.query(_scaled(xi, lon_scale), k=k)
+        if k == 1:
+            return values[indices]
+        weights = 1.0 / np.maximum(distances, 1e-12) ** power
+        result = np.einsum('nk,nk->n', weights, values[indices]) / weights.sum(axis=1)
+        # Exakt träff på en datapunkt ger punktens värde
+        exact = distances[:, 0] < 1e-12
+        result[exact] = values[indices[exact, 0]]
+        return result
+    return evaluate
+
+def _unique_points(points, values):
+    """Slå ihop dubblettkoordinater (t.ex. edge points i bbox-hörn) med medelvärde"""
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    if len(unique) == len(points):
+        return points, values
+    inverse = np.ravel(inverse)
+    sums = np.bincount(inverse, weights=values, minlength=len(unique))
+    counts = np.bincount(inverse, minlength=len(unique))
+    return unique, sums / counts
+
+def _create_rbf(points, values, neighbors=DEFAULT_NEIGHBORS * 4, **options):
+    """Lokal RBF (thin plate spline över de k närmaste punkterna)"""
+    from scipy.interpolate import RBFInterpolator
+
+    # Dubblettpunkter ger singulära ekvationssystem
+    points, values = _unique_points(points, values)
+    lon_scale = _lon_scale(points)
+    rbf = RBFInterpolator(
+        _scaled(points, lon_scale), values,
+        neighbors=min(neighbors, len(values)), kernel='thin_plate_spline'
+    )
+
+    def evaluate(xi):
+        return rbf(_scaled(xi, lon_scale))
+    return evaluate
+
+INTERPOLATION_BACKENDS = {
+    'linear': _create_linear,
+    'cubic': _create_cubic,
+    'nearest': _create_nearest,
+    'idw': _create_idw,
+    'rbf': _create_rbf,
+}
+
+def create_interpolator(method, points, values, **options):
+    """
+    Bygg interpolator för given metod. points är (N, 2) med (lon, lat).
+    Returnerar en funktion xi (M, 2) → värden (M,), NaN där metoden saknar täckning.
+    """
+    if method not in INTERPOLATION_BACKENDS:
+        raise ValueError(f"Okänd interpolationsmetod: {method} (välj bland {', '.join(INTERPOLATION_BACKENDS)})")
+
+    points = np.asarray(points, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    return INTERPOLATION_BACKENDS[method](points, values, **options)
+
+def evaluate_on_grid(interpolator, lon_grid, lat_grid, chunk_rows=256, dtype=np.float64):
+    """Utvärdera interpolatorn på en (lat, lon)-grid block för block utan full meshgrid"""
+    height, width = lat_grid.size, lon_grid.size
+    grid_values = np.empty((height, width), dtype=dtype)
+
+    for row_start in range(0, height, chunk_rows):
+        row_end = min(row_start + chunk_rows, height)
+        block_lons = np.broadcast_to(lon_grid[None, :], (row_end - row_start, width))
+        block_lats = np.broadcast_to(lat_grid[row_start:row_end, None], (row_end - row_start, width))
+        xi = np.column_stack([block_lons.ravel(), block_lats.ravel()])
+        grid_values[row_start:row_end] = np.reshape(interpolator(xi), (row_end - row_start, width))
+
+    return grid_values
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Snabb interpolation för prognosdata på ett regelbundet lat/lon-gitter (DKSS-kuben).
+
+Gitterpunkterna läggs direkt i en 2D-array (cellindex räknas ut, ingen
+triangulering), celler utan data (land, punkter utanför vattenmasken) fylls med
+närmaste cell med data och griden utvärderas med separabla splines
+(scipy.ndimage.map_coordinates: nearest, bilinjär eller kubisk). Varje pixel slår
+upp sina celler i O(1), och spline-koefficienterna beräknas en gång per tidssteg.
+
+Punktspecifika extrapunkter utanför gittret trianguleras för sig: skillnaden mellan
+extrapunktens värde och gittrets värde på samma plats interpoleras linjärt över
+extrapunkterna och de omgivande gitternoderna (där skillnaden är 0), så att
+extrapunkterna bara påverkar sin närmaste omgivning.
+"""
+
+import numpy as np
+
+from forecast_arrays import lattice_cells
+
+# Splineordning per interpolationsmetod (övriga metoder kräver spridda punkter)
+LATTICE_ORDERS = {'nearest': 0, 'linear': 1, 'cubic': 3}
+
+# Gitterceller runt en extrapunkt som ingår i dess lokala korrektion
+EXTRA_NEIGHBORHOOD_CELLS = 2
+
+def lattice_supports(lattice, method, fill='nearest'):
+    """Sant om gittervägen kan användas (gitter hittat, metoden har en splineordning, nearest-fyllnad)"""
+    return lattice is not None and method in LATTICE_ORDERS and fill == 'nearest'
+
+def fill_missing_cells(cells):
+    """Fyll NaN-celler med närmaste cell med data; returnerar (fylld array, mask över saknade celler)"""
+    from scipy.ndimage import distance_transform_edt
+
+    missing = np.isnan(cells)
+    if missing.all():
+        raise ValueError("Inga gitterceller med data")
+    if missing.any():
+        indices = distance_transform_edt(missing, return_distances=False, return_indices=True)
+        cells = cells[tuple(indices)]
+    return cells, missing
+
+def _fractional_indices(lattice, xi):
+    """(rad, kolumn) i gittret som flyttal för koordinater xi (M, 2) med (lon, lat)"""
+    return (xi[:, 1] - lattice['lat0']) / lattice['dlat'], (xi[:, 0] - lattice['lon0']) / lattice['dlon']
+
+def _create_extra_correction(lattice, evaluate_lattice, lons, lats, values):
+    """
+    Lokal korrektion för extrapunkter: skillnaden mot gittret interpoleras linjärt
+    över extrapunkterna och gitternoderna runt dem. Returnerar en funktion xi → korrektion.
+    """
+    from interpolation_backends import create_interpolator
+
+    extra_xi = np.column_stack([lons, lats])
+    residuals = values - evaluate_lattice(extra_xi)
+
+    rows, cols = (np.rint(index).astype(np.int64) for index in _fractional_indices(lattice, extra_xi))
+    offsets = np.arange(-EXTRA_NEIGHBORHOOD_CELLS, EXTRA_NEIGHBORHOOD_CELLS + 1)
+    anchor_rows = np.clip(rows[:, None, None] + offsets[None, :, None], 0, lattice['nlat'] - 1)
+    anchor_cols = np.clip(cols[:, None, None] + offsets[None, None, :], 0, lattice['nlon'] - 1)
+    anchor_rows, anchor_cols = np.broadcast_arrays(anchor_rows, anchor_cols)
+    anchors = np.unique(np.column_stack([anchor_rows.ravel(), anchor_cols.ravel()]), axis=0)
+    anchor_xi = np.column_stack([
+        lattice['lon0'] + anchors[:, 1] * lattice['dlon'], lattice['lat0'] + anchors[:, 0] * lattice['dlat']
+    ])
+
+    points = np.concatenate([anchor_xi, extra_xi])
+    interpolator = create_interpolator('linear', points, np.concatenate([np.zeros(len(anchor_xi)), residuals]))
+    lon_lo, lat_lo = points.min(axis=0)
+    lon_hi, lat_hi = points.max(axis=0)
+
+    def correction(xi):
+        result = np.zeros(len(xi))
+        inside = np.flatnonzero(
+            (xi[:, 0] >= lon_lo) & (xi[:, 0] <= lon_hi) & (xi[:, 1] >= lat_lo) & (xi[:, 1] <= lat_hi)
+        )
+        if inside.size:
+            result[inside] = np.nan_to_num(interpolator(xi[inside]))
+        return result
+    return correction
+
+def create_lattice_interpolator(lattice, lons, lats, values, method='cubic'):
+    """
+    Bygg gitterinterpolator för ett tidssteg (samma gränssnitt som create_grid_interpolator).
+    Returnerar (evaluate, antal punkter) där evaluate(xi, out, mask=None) skriver värden
+    in-place och returnerar antal positioner (inom mask) vars närmaste cell saknade data
+    och därmed fick värdet från närmaste cell med data.
+    """
+    from scipy.ndimage import map_coordinates, spline_filter
+
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    rows, cols, on_lattice = lattice_cells(lattice, lons, lats)
+
+    cells = np.full((lattice['nlat'], lattice['nlon']), np.nan)
+    cells[rows[on_lattice], cols[on_lattice]] = values[on_lattice]
+    cells, missing = fill_missing_cells(cells)
+
+    # Spline-koefficienterna beräknas en gång; utanför gittret används kantvärdet
+    order = LATTICE_ORDERS[method]
+    coefficients = spline_filter(cells, order=order, mode='nearest') if order > 1 else cells
+
+    def evaluate_lattice(xi):
+        return map_coordinates(
+            coefficients, _fractional_indices(lattice, xi), order=order, mode='nearest', prefilter=False
+        )
+
+    extras = ~on_lattice
+    correction = None
+    if extras.any():
+        correction = _create_extra_correction(lattice, evaluate_lattice, lons[extras], lats[extras], values[extras])
+
+    def evaluate(xi, out, mask=None):
+        out[:] = evaluate_lattice(xi)
+        if correction is not None:
+            out += correction(xi)
+        row_index, col_index = _fractional_indices(lattice, xi)
+        nearest_missing = missing[
+            np.clip(np.rint(row_index), 0, lattice['nlat'] - 1).astype(np.int64),
+            np.clip(np.rint(col_index), 0, lattice['nlon'] - 1).astype(np.int64)
+        ]
+        if mask is not None:
+            nearest_missing &= mask
+        return int(np.count_nonzero(nearest_missing))
+    return evaluate, len(values)
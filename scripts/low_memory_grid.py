@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Lågminnesläge för grid-interpolation och bildrendering.
+
+Istället för att hålla lon_mesh, lat_mesh, cubic-resultat, nearest-resultat,
+padding-kopior och matplotlibs RGBA-buffertar i float64 samtidigt:
+- float32 genom hela kedjan
+- 1-D axlar som broadcastas radblock för radblock (inga meshgrids)
+- NaN-fyllning, klämning och maskning görs in-place
+- färgsättning direkt till uint8 RGBA och PNG via Pillow (ingen matplotlib-figur)
+- radblockens storlek styrs av en minnesbudget; en överskriden budget avbryter körningen
+"""
+
+import os
+import sys
+import numpy as np
+
+# Uppskattat arbetsminne per pixel i ett radblock (bytes):
+# koordinater (2 x float64) + interpolationsresultat (float64) + NaN-mask
+# + nearest-temporärer + färgsättningens temporärer
+WORKING_BYTES_PER_PIXEL = 64
+
+# Minne per pixel som lever hela bilden (bytes): float32-grid + uint8 RGBA
+RESIDENT_BYTES_PER_PIXEL = 4 + 4
+
+# Genomskinlighet för vattenpixlar (samma som alpha=0.8 i matplotlib-vägen)
+IMAGE_ALPHA = 0.8
+
+def current_rss_mb():
+    """Nuvarande RSS för processen i MB (Linux: /proc, annars toppvärdet; None om okänt)"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    """Högsta RSS för processen hittills i MB (None där resource saknas, t.ex. Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux rapporterar KB, macOS bytes
+    return peak / 1024 if sys.platform.startswith('linux') else peak / (1024 * 1024)
+
+def plan_chunk_rows(grid_resolution, memory_budget_mb, baseline_mb=None,
+                    working_bytes_per_pixel=WORKING_BYTES_PER_PIXEL,
+                    resident_bytes_per_pixel=RESIDENT_BYTES_PER_PIXEL):
+    """
+    Beräkna hur många rader som får bearbetas per block inom minnesbudgeten.
+    Kastar MemoryError om inte ens ett block med en rad ryms.
+    """
+    if baseline_mb is None:
+        # Utan mätbar RSS planeras blocken som om processen inte använde något minne än
+        baseline_mb = current_rss_mb() or 0.0
+
+    pixels = grid_resolution * grid_resolution
+    resident_mb = pixels * resident_bytes_per_pixel / (1024 * 1024)
+    row_mb = grid_resolution * working_bytes_per_pixel / (1024 * 1024)
+    available_mb = memory_budget_mb - baseline_mb - resident_mb
+
+    if available_mb < row_mb:
+        raise MemoryError(
+            f"Minnesbudget {memory_budget_mb:.0f} MB räcker inte för {grid_resolution}x{grid_resolution}: "
+            f"baslinje {baseline_mb:.0f} MB + bildbuffertar {resident_mb:.0f} MB"
+        )
+
+    chunk_rows = int(min(grid_resolution, available_mb // row_mb))
+    print(f"   🧮 Minnesplan: budget {memory_budget_mb:.0f} MB, baslinje {baseline_mb:.0f} MB, "
+          f"bildbuffertar {resident_mb:.0f} MB → {chunk_rows} rader per block")
+    return chunk_rows
+
+def report_memory(memory_budget_mb):
+    """
+    Rapportera topp-RSS mot budget. Kastar MemoryError om budgeten överskreds, så att
+    körningen avbryts istället för att lyckas över budget (ingen kontroll om RSS inte kan mätas).
+    """
+    peak = peak_rss_mb()
+    if peak is None:
+        print(f"   ℹ️ Topp-RSS kan inte mätas på den här plattformen (budget {memory_budget_mb:.0f} MB)")
+        return
+    if peak > memory_budget_mb:
+        raise MemoryError(
+            f"Topp-RSS {peak:.0f} MB överskred minnesbudgeten {memory_budget_mb:.0f} MB (--memory-budget-mb)"
+        )
+    print(f"   ✅ Topp-RSS: {peak:.0f} MB (budget {memory_budget_mb:.0f} MB)")
+
+def create_edge_points(lons, lats, values, bbox, n_edge_points=25):
+    """Vektoriserad edge enhancement: närmaste datavärde längs bbox-kanterna"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    edge_lat = np.linspace(lat_min, lat_max, n_edge_points)
+    edge_lon = np.linspace(lon_min, lon_max, n_edge_points)
+
+    edge_lons = np.concatenate([
+        np.full(n_edge_points, lon_min), np.full(n_edge_points, lon_max), edge_lon, edge_lon
+    ])
+    edge_lats = np.concatenate([
+        edge_lat, edge_lat, np.full(n_edge_points, lat_min), np.full(n_edge_points, lat_max)
+    ])
+
+    distances = (edge_lons[:, None] - lons[None, :])**2 + (edge_lats[:, None] - lats[None, :])**2
+    edge_values = values[np.argmin(distances, axis=1)]
+    return edge_lons, edge_lats, edge_values
+
+def _row_block_coordinates(lon_grid, lat_grid, row_start, row_end):
+    """Koordinater för ett radblock (broadcast av 1-D axlar, ingen full meshgrid)"""
+    block_lons = np.broadcast_to(lon_grid[None, :], (row_end - row_start, lon_grid.size))
+    block_lats = np.broadcast_to(lat_grid[row_start:row_end, None], (row_end - row_start, lon_grid.size))
+    return np.column_stack([block_lons.ravel(), block_lats.ravel()])
+
+def create_grid_interpolator(lons, lats, values, bbox, method='cubic', fill='nearest', lattice=None):
+    """
+    Bygg interpolator med edge points och nearest-fallback (trianguleringen görs en gång).
+    Returnerar (evaluate, antal punkter) där evaluate(xi, out, mask=None) skriver värden
+    in-place och returnerar antal positioner som fylldes med nearest (bara inom mask om den anges).
+    Med fill='laplace' används varken edge points eller nearest: positioner utanför
+    datapunkternas hölje blir NaN och fylls i efterhand längs vattenvägar (water_fill).
+    Med lattice (se forecast_arrays.detect_regular_lattice) interpoleras gitterpunkterna
+    direkt på gittret utan triangulering (se lattice_interpolation).
+    """
+    from scipy.interpolate import NearestNDInterpolator
+    from interpolation_backends import create_interpolator
+    from lattice_interpolation import lattice_supports, create_lattice_interpolator
+
+    if lattice_supports(lattice, method, fill):
+        return create_lattice_interpolator(lattice, lons, lats, values, method)
+
+    if fill == 'laplace':
+        interpolator = create_interpolator(method, np.column_stack([lons, lats]), values)
+
+        def evaluate_without_fill(xi, out, mask=None):
+            out[:] = interpolator(xi)
+            return 0
+        return evaluate_without_fill, len(values)
+
+    edge_lons, edge_lats, edge_values = create_edge_points(lons, lats, values, bbox)
+    points = np.column_stack([np.concatenate([lons, edge_lons]), np.concatenate([lats, edge_lats])])
+    point_values = np.concatenate([values, edge_values])
+
+    interpolator = create_interpolator(method, points, point_values)
+    nearest = NearestNDInterpolator(points, point_values)
+
+    def evaluate(xi, out, mask=None):
+        out[:] = interpolator(xi)
+        # Fyll NaN in-place med nearest (bara på NaN-positionerna)
+        nan_positions = np.flatnonzero(np.isnan(out))
+        if nan_positions.size:
+            out[nan_positions] = nearest(xi[nan_positions])
+        return nan_positions.size if mask is None else int(np.count_nonzero(mask[nan_positions]))
+    return evaluate, len(point_values)
+
+def compute_grid_low_memory(lons, lats, values, water_mask_grid, bbox, parameter, chunk_rows, method='cubic', fill='nearest',
+                            fill_stats=None, lattice=None):
+    """
+    Interpolera till en maskad float32-grid block för block.
+    Samma steg som create_interpolated_image (edge points, vald metod, nearest-fallback,
+    klämning av negativa värden, vattenmask) men utan stora temporära arrayer.
+    Med fill='laplace' fylls luckorna istället via vattenbegränsad diffusion.
+    Med lattice interpoleras direkt på prognosens regelbundna gitter (se lattice_interpolation).
+    fill_stats (dict) får 'filled' = antal vattenpixlar som fylldes av fallbacken.
+    """
+    from lattice_interpolation import lattice_supports
+
+    grid_resolution = water_mask_grid.shape[0]
+    evaluate, point_count = create_grid_interpolator(lons, lats, values, bbox, method, fill, lattice)
+    source = 'gitter' if lattice_supports(lattice, method, fill) else 'spridda punkter'
+
+    print(f"🔄 Interpolerar {point_count} punkter till {grid_resolution}x{grid_resolution} grid "
+          f"(lågminnesläge, {method}, {source}, {chunk_rows} rader per block)...")
+
+    grid_values = evaluate_grid_low_memory(evaluate, water_mask_grid, bbox, parameter, chunk_rows, fill_stats)
+    if fill == 'laplace':
+        from water_fill import laplace_fill
+        filled_count = laplace_fill(grid_values, water_mask_grid)
+        if fill_stats is not None:
+            fill_stats['filled'] = filled_count
+    return grid_values
+
+def evaluate_grid_low_memory(evaluate, water_mask_grid, grid_bbox, parameter, chunk_rows, fill_stats=None):
+    """
+    Utvärdera en färdig interpolator (från create_grid_interpolator) på en maskad
+    float32-grid över grid_bbox. grid_bbox kan vara en delregion av den bbox som
+    interpolatorn byggdes för; då utvärderas bara delregionens pixlar.
+    fill_stats (dict) får 'filled' = antal vattenpixlar som fylldes med nearest.
+    """
+    lon_min, lon_max, lat_min, lat_max = grid_bbox
+    grid_resolution = water_mask_grid.shape[0]
+    lon_grid = np.linspace(lon_min, lon_max, grid_resolution)
+    lat_grid = np.linspace(lat_min, lat_max, grid_resolution)
+
+    grid_values = np.empty((grid_resolution, grid_resolution), dtype=np.float32)
+    clamp_negative = parameter in ['current', 'salinity']
+    filled_count = 0
+
+    for row_start in range(0, grid_resolution, chunk_rows):
+        row_end = min(row_start + chunk_rows, grid_resolution)
+        block = grid_values[row_start:row_end]
+        block_mask = water_mask_grid[row_start:row_end]
+
+        xi = _row_block_coordinates(lon_grid, lat_grid, row_start, row_end)
+        filled_count += evaluate(xi, block.reshape(-1), block_mask.reshape(-1))
+        del xi
+
+        if clamp_negative:
+            np.maximum(block, 0, out=block)
+
+        block[~block_mask] = np.nan
+
+    water_pixels = int(np.count_nonzero(water_mask_grid))
+    print(f"   📊 {filled_count} vattenpixlar fylldes med nearest neighbor "
+          f"({100*filled_count/max(1, water_pixels):.1f}%)")
+    if fill_stats is not None:
+        fill_stats['filled'] = filled_count
+    return grid_values
+
+def colorize_grid_rgba(grid_values, cmap, vmin, vmax, chunk_rows, alpha=IMAGE_ALPHA, coverage=None):
+    """
+    Färgsätt en grid till uint8 RGBA (origin='lower', dvs norr uppåt i bilden).
+    NaN blir helt transparent. Med täckningsraster (andel vatten per pixel)
+    skalas alfakanalen för kantutjämnade kustlinjer.
+    """
+    height, width = grid_values.shape
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    alpha_byte = np.uint8(round(alpha * 255))
+    scale = 1.0 / (vmax - vmin)
+
+    for row_start in range(0, height, chunk_rows):
+        row_end = min(row_start + chunk_rows, height)
+        block = grid_values[row_start:row_end]
+
+        normalized = (block - np.float32(vmin)) * np.float32(scale)
+        out = rgba[height - row_end:height - row_start][::-1]
+        out[...] = cmap(normalized, bytes=True)
+        if coverage is None:
+            out[..., 3] = np.where(np.isnan(block), 0, alpha_byte)
+        else:
+            block_alpha = coverage[row_start:row_end] * np.float32(alpha * 255)
+            block_alpha[np.isnan(block)] = 0
+            out[..., 3] = np.rint(block_alpha)
+
+    return rgba
+
+def save_rgba_png(rgba, output_path, compress_level=6):
+    """Spara uint8 RGBA-array som PNG via Pillow"""
+    from PIL import Image
+
+    Image.fromarray(rgba, 'RGBA').save(output_path, format='PNG', compress_level=compress_level)
@@ -0,0 +1,7 @@
+"""
+Makrill: gemensamt kommandoradsgränssnitt för bildgenerering och dataverktyg.
+
+Kör med `python scripts/makrill <kommando> ...`. Varje underkommando importerar
+sin modul (och därmed matplotlib, scipy, shapely) först när det körs, så att
+`--help` och snabba frågor startar utan de tunga biblioteken.
+"""
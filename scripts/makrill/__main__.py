@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""Startpunkt för `python scripts/makrill`"""
+
+import sys
+from pathlib import Path
+
+# Skriptmodulerna ligger platt i scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from makrill.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
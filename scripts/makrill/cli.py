@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Underkommandon för makrill-verktygen.
+
+Kommandona pekar på modulnamn och importeras först vid körning; argumenten
+efter kommandot skickas vidare oförändrade till modulens main(argv).
+"""
+
+import sys
+import argparse
+import importlib
+
+# Bildlager för `render <lager>` → modul
+RENDER_LAYERS = {
+    'parameters': 'generate_marine_parameter_images',
+    'magnitude': 'generate_current_magnitude_images',
+    'vectors': 'generate_current_vector_images',
+    'isobands': 'export_isobands',
+    'aggregates': 'aggregate_windows',
+    'pack': 'frame_pack',
+}
+
+# Övriga kommandon → (modul, beskrivning)
+COMMANDS = {
+    'mask': ('water_mask', 'Förbearbeta vattenmask och master-raster'),
+    'query': ('extract_location_timeseries', 'Prognoskurvor för fasta platser'),
+    'zones': ('zonal_statistics', 'Zonstatistik (medel/min/max per timme) för havsområden'),
+    'coverage': ('debug_data_coverage', 'Täckningsanalys för alla tidssteg'),
+    'bench': ('benchmark_interpolation', 'Korsvalidering och tidsmätning av interpolationsmetoder'),
+    'verify': ('golden_equivalence', 'Jämför snabba vägar mot referensimplementationen'),
+}
+
+def build_parser():
+    commands = {'render': 'Rendera ett bildlager: ' + ', '.join(RENDER_LAYERS)}
+    commands.update((name, description) for name, (_, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog='makrill',
+        description='Bildgenerering och dataverktyg för makrill-kartan',
+        epilog='Kommandon:\n' + '\n'.join(f"  {name:10} {text}" for name, text in commands.items())
+               + '\n\nKör `makrill <kommando> --help` för kommandots egna flaggor.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('command', choices=list(commands), metavar='<kommando>')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+def resolve_command(parser, command, args):
+    """(modulnamn, programnamn, argument till modulen) för ett kommando"""
+    if command != 'render':
+        return COMMANDS[command][0], f"makrill {command}", args
+
+    if not args or args[0] in ('-h', '--help'):
+        parser.exit(0, f"användning: makrill render <lager> [flaggor]\n\nLager: {', '.join(RENDER_LAYERS)}\n")
+    layer = args[0]
+    if layer not in RENDER_LAYERS:
+        parser.error(f"okänt lager '{layer}' (välj bland {', '.join(RENDER_LAYERS)})")
+    return RENDER_LAYERS[layer], f"makrill render {layer}", args[1:]
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    module_name, prog, module_args = resolve_command(parser, args.command, args.args)
+
+    module = importlib.import_module(module_name)
+    # Modulernas parsers visar programnamnet i hjälptexter och felmeddelanden
+    sys.argv[0] = prog
+    result = module.main(module_args)
+    return result if isinstance(result, int) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
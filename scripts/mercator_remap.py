@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Web Mercator-korrekta raster via en förberäknad radomflyttningstabell.
+
+Gridarna är likformiga i latitud, men kartan (MapLibre/Leaflet) sträcker
+bilden linjärt i Web Mercator mellan bboxens hörn. Över 54.9-59.6°N ger det
+en vertikal förskjutning på upp till ~0.05° mitt i bilden. Här byggs en gång
+per (bbox, upplösning) en tabell som för varje utrad (likformig i Mercator-y)
+anger närmaste källrad i latitud-griden; varje bildruta flyttas sedan om med
+en billig gather längs radaxeln.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# Projektionsnamn i metadata.json
+PROJECTIONS = {
+    'mercator': 'EPSG:3857',
+    'latlon': 'EPSG:4326',
+}
+
+def mercator_y(lat):
+    """Web Mercator y i grader (samma enhet som longitud)"""
+    return np.degrees(np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)))
+
+def inverse_mercator_y(y):
+    """Latitud för Web Mercator y i grader"""
+    return np.degrees(2 * np.arctan(np.exp(np.radians(y))) - np.pi / 2)
+
+@lru_cache(maxsize=8)
+def mercator_row_remap(bbox, rows):
+    """
+    Källrad (i en grid med rows rader, likformig i latitud, origin='lower')
+    för varje utrad i en grid som är likformig i Web Mercator-y.
+    """
+    _, _, lat_min, lat_max = bbox
+    target_lats = inverse_mercator_y(np.linspace(mercator_y(lat_min), mercator_y(lat_max), rows))
+    source_rows = np.rint((target_lats - lat_min) / (lat_max - lat_min) * (rows - 1))
+    remap = np.clip(source_rows, 0, rows - 1).astype(np.intp)
+    remap.setflags(write=False)
+    return remap
+
+def remap_rows(grid, remap):
+    """Flytta om rader enligt remap-tabellen (returnerar en ny array)"""
+    return np.take(grid, remap, axis=0)
+
+def projection_remap(projection, bbox, rows):
+    """Remap-tabell för vald projektion, eller None om griden redan är rätt (latlon)"""
+    if projection == 'mercator':
+        return mercator_row_remap(tuple(bbox), rows)
+    return None
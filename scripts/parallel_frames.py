@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Parallell rendering av bildrutor (en uppgift per tidssteg).
+
+Tidsstegen är helt oberoende av varandra, så de kan renderas i separata
+processer. Den tunga delade datan (forecast, vattenmask, täckningsraster)
+skickas en gång per arbetsprocess via initializer istället för med varje
+uppgift. Med workers=1 körs allt i den egna processen som tidigare.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Delad kontext i arbetsprocessen (sätts av _init_worker)
+_worker_context = None
+
+def _init_worker(context):
+    """Spara den delade kontexten en gång per arbetsprocess"""
+    global _worker_context
+    _worker_context = context
+
+def _run_in_worker(render_frame, task):
+    """Kör en uppgift mot arbetsprocessens delade kontext"""
+    return render_frame(_worker_context, task)
+
+def run_frames(render_frame, tasks, context, workers=1, on_result=None):
+    """
+    Kör render_frame(context, task) för alla uppgifter.
+    render_frame måste ligga på modulnivå så att den kan skickas till arbetsprocesserna.
+    on_result(task, result) anropas i huvudprocessen så fort en uppgift är klar
+    (t.ex. för att journalföra den). Returnerar resultaten i samma ordning som tasks.
+    """
+    tasks = list(tasks)
+    if workers <= 1 or len(tasks) <= 1:
+        results = []
+        for task in tasks:
+            results.append(render_frame(context, task))
+            if on_result is not None:
+                on_result(task, results[-1])
+        return results
+
+    workers = min(workers, len(tasks))
+    print(f"⚙️ Renderar {len(tasks)} bildrutor med {workers} processer...")
+    results = [None] * len(tasks)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as executor:
+        futures = {
+            executor.submit(_run_in_worker, render_frame, task): index
+            for index, task in enumerate(tasks)
+        }
+        for completed, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            results[index] = future.result()
+            if on_result is not None:
+                on_result(tasks[index], results[index])
+            print(f"   ⚙️ {completed}/{len(tasks)} bildrutor klara")
+
+    return results
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Rendering av delområden (ROI) i högre pixeltäthet.
+
+Ett ROI (t.ex. Öresund) renderas som en egen bild över sin del-bbox, men med
+samma interpolationstillstånd som hela området: alla punkter och edge points
+för hela bboxen trianguleras en gång per tidssteg och utvärderas sedan bara i
+ROI:ets pixlar. Vattengeometrin är densamma som för hela området (klippt till
+hela bboxen), bara förenklad för ROI:ets finare pixlar. Kostnaden per bild
+blir därför proportionell mot ROI:ets pixelantal, inte hela områdets.
+"""
+
+import math
+from pathlib import Path
+from datetime import datetime
+
+from generate_marine_parameter_images import (
+    get_parameter_config, create_colormap, extract_parameter_data_from_arrays, remove_stale_images
+)
+from image_manifest import publish_frame, manifest_entry, ordered_manifest
+from low_memory_grid import (
+    plan_chunk_rows, report_memory, create_grid_interpolator,
+    evaluate_grid_low_memory, colorize_grid_rgba, save_rgba_png
+)
+from mercator_remap import PROJECTIONS, projection_remap, remap_rows
+from parallel_frames import run_frames
+from run_journal import (
+    is_completed, record_completed, completed_output_path, temporary_output_path, commit_output, write_json_atomic
+)
+from water_mask import load_water_coverage, water_mask_from_coverage, DEFAULT_BBOX
+
+# Namngivna delområden (lon_min, lon_max, lat_min, lat_max)
+ROI_PRESETS = {
+    'oresund': (12.35, 13.10, 55.30, 56.20),
+    'goteborg': (11.40, 12.05, 57.45, 57.95),
+    'hano': (14.10, 15.00, 55.55, 56.10),
+}
+
+def parse_roi(spec, bbox=DEFAULT_BBOX):
+    """'oresund' eller 'namn=lon_min,lon_max,lat_min,lat_max' → (namn, roi-bbox)"""
+    if spec in ROI_PRESETS:
+        name, roi_bbox = spec, ROI_PRESETS[spec]
+    else:
+        name, separator, coordinates = spec.partition('=')
+        if not separator or not name:
+            raise ValueError(
+                f"Okänt ROI '{spec}': använd {', '.join(ROI_PRESETS)} eller namn=lon_min,lon_max,lat_min,lat_max"
+            )
+        try:
+            roi_bbox = tuple(float(value) for value in coordinates.split(','))
+        except ValueError:
+            raise ValueError(f"Ogiltiga koordinater i ROI '{spec}'")
+        if len(roi_bbox) != 4:
+            raise ValueError(f"ROI '{spec}' behöver fyra koordinater")
+
+    lon_min, lon_max, lat_min, lat_max = roi_bbox
+    if not (lon_min < lon_max and lat_min < lat_max):
+        raise ValueError(f"ROI '{name}' har tom utsträckning: {roi_bbox}")
+    if lon_min < bbox[0] or lon_max > bbox[1] or lat_min < bbox[2] or lat_max > bbox[3]:
+        raise ValueError(f"ROI '{name}' {roi_bbox} ligger utanför bboxen {bbox}")
+    return name, roi_bbox
+
+def geometry_resolution_for_rois(bbox, rois, resolution):
+    """
+    Upplösning över hela bboxen som motsvarar ROI:ernas pixelstorlek, så att den
+    gemensamma vattengeometrin förenklas tillräckligt lite för det finaste ROI:et.
+    """
+    lon_span, lat_span = bbox[1] - bbox[0], bbox[3] - bbox[2]
+    scale = max(
+        max(lon_span / (roi[1] - roi[0]), lat_span / (roi[3] - roi[2]))
+        for _, roi in rois
+    )
+    return int(math.ceil(resolution * scale))
+
+def prepare_rois(rois, water_polygons, resolution, water_mask_path, master_resolution, cache_dir, projection='latlon'):
+    """
+    Täckningsraster och vattenmask per ROI (samma geometri som hela området).
+    Med Mercator-projektion får varje ROI en egen radtabell och en omflyttad täckningsraster för alfa.
+    """
+    prepared = []
+    for name, roi_bbox in rois:
+        print(f"🔍 ROI {name}: {roi_bbox}")
+        coverage = load_water_coverage(
+            water_polygons, roi_bbox, resolution, water_mask_path, master_resolution, cache_dir
+        )
+        row_remap = projection_remap(projection, roi_bbox, resolution)
+        prepared.append({
+            'name': name,
+            'bbox': roi_bbox,
+            'water_mask': water_mask_from_coverage(coverage),
+            'coverage': coverage if row_remap is None else remap_rows(coverage, row_remap),
+            'row_remap': row_remap,
+        })
+    return prepared
+
+def render_roi_frame(context, task):
+    """
+    Rendera alla ROI för ett tidssteg. Interpolatorn byggs en gång från hela
+    områdets punkter och utvärderas sedan i varje ROI:s pixlar.
+    Returnerar listan med utfiler som skrevs.
+    """
+    time_index, timestamp, output_paths = task
+    parameter = context['parameter']
+    forecast = context['forecast']
+    param_name = get_parameter_config(parameter)['name']
+
+    print(f"\n📸 {param_name.title()} {time_index+1}/{context['total']}: {timestamp}")
+
+    lons, lats, values = extract_parameter_data_from_arrays(
+        forecast, time_index, forecast['water_points'], parameter
+    )
+    if len(lons) == 0:
+        print(f"⚠️ Ingen {param_name}-data för {timestamp}")
+        return []
+
+    try:
+        evaluate, point_count = create_grid_interpolator(
+            lons, lats, values, context['bbox'], context['method'], lattice=context.get('lattice')
+        )
+    except Exception as e:
+        print(f"❌ Interpolation misslyckades för {param_name} {timestamp}: {e}")
+        return []
+
+    cmap, vmin, vmax = create_colormap(parameter)
+    written = []
+    for roi, output_path in zip(context['rois'], output_paths):
+        if output_path is None:
+            continue
+        resolution = roi['water_mask'].shape[0]
+        print(f"🔄 ROI {roi['name']}: {point_count} punkter → {resolution}x{resolution} pixlar")
+        chunk_rows = plan_chunk_rows(resolution, context['memory_budget_mb'])
+        grid_values = evaluate_grid_low_memory(evaluate, roi['water_mask'], roi['bbox'], parameter, chunk_rows)
+        if roi['row_remap'] is not None:
+            grid_values = remap_rows(grid_values, roi['row_remap'])
+        rgba = colorize_grid_rgba(grid_values, cmap, vmin, vmax, chunk_rows, coverage=roi['coverage'])
+        del grid_values
+
+        tmp_path = temporary_output_path(output_path)
+        save_rgba_png(rgba, tmp_path)
+        commit_output(tmp_path, output_path)
+        del rgba
+        written.append(output_path)
+        print(f"✅ Sparade {output_path}")
+
+    report_memory(context['memory_budget_mb'])
+    return written
+
+def _roi_unit(parameter, roi):
+    """Journalnyckel för en parameter i ett ROI"""
+    return f"{parameter}@{roi['name']}"
+
+def generate_roi_images(parameter, forecast, rois, bbox, output_dir, resolution, max_images, force,
+                        method, memory_budget_mb, workers=1, journal=None, projection='latlon', use_lattice=True):
+    """
+    Generera ROI-bilder för en parameter i output_dir/roi-<namn>/ med en
+    metadata.json (inklusive bildmanifest) per ROI. Returnerar (antal skrivna eller redan klara bilder, antal bilder).
+    Med use_lattice interpoleras direkt på prognosens regelbundna gitter om ett sådant hittades.
+    """
+    config = get_parameter_config(parameter)
+    all_timestamps = forecast['timestamps']
+    timestamps = all_timestamps[:max_images] if max_images else all_timestamps
+
+    roi_dirs = []
+    for roi in rois:
+        roi_dir = Path(output_dir) / f"roi-{roi['name']}"
+        roi_dir.mkdir(parents=True, exist_ok=True)
+        roi_dirs.append(roi_dir)
+
+    print(f"\n🚀 Genererar {config['name']}-bilder för {len(rois)} ROI i {output_dir}")
+
+    tasks = []
+    roi_counts = [0] * len(rois)
+    roi_manifests = [{} for _ in rois]
+    for i, timestamp in enumerate(timestamps):
+        safe_timestamp = timestamp.replace(':', '-').replace('+', 'plus')
+        output_paths = []
+        for j, (roi, roi_dir) in enumerate(zip(rois, roi_dirs)):
+            output_path = roi_dir / f"{config['name_en']}_{safe_timestamp}.png"
+            if not force and is_completed(journal, _roi_unit(parameter, roi), timestamp, output_path):
+                published_path = completed_output_path(journal, _roi_unit(parameter, roi), timestamp, roi_dir)
+                print(f"⏭️ Redan klar enligt journalen: {roi_dir.name}/{published_path.name}")
+                roi_counts[j] += 1
+                roi_manifests[j][timestamp] = manifest_entry(published_path)
+                output_paths.append(None)
+            else:
+                output_paths.append(output_path)
+        if any(path is not None for path in output_paths):
+            tasks.append((i, timestamp, output_paths))
+
+    context = {
+        'parameter': parameter,
+        'total': len(timestamps),
+        'forecast': forecast,
+        'rois': rois,
+        'bbox': bbox,
+        'method': method,
+        'lattice': forecast['lattice'] if use_lattice else None,
+        'memory_budget_mb': memory_budget_mb,
+    }
+
+    def journal_frame(task, written):
+        _, timestamp, output_paths = task
+        for j, (roi, output_path) in enumerate(zip(rois, output_paths)):
+            if output_path is not None and output_path in written:
+                roi_counts[j] += 1
+                entry = publish_frame(output_path)
+                roi_manifests[j][timestamp] = entry
+                record_completed(journal, _roi_unit(parameter, roi), timestamp, roi_dirs[j] / entry['file'])
+
+    run_frames(render_roi_frame, tasks, context, workers, on_result=journal_frame)
+
+    for roi, roi_dir, roi_count, manifest in zip(rois, roi_dirs, roi_counts, roi_manifests):
+        remove_stale_images(roi_dir, {entry['file'] for entry in manifest.values()})
+        metadata = {
+            "parameter": parameter,
+            "parameter_name": config['name'],
+            "unit": config['unit'],
+            "roi": roi['name'],
+            "bbox": roi['bbox'],
+            "parent_bbox": bbox,
+            "total_images": roi_count,
+            "timestamps": all_timestamps,
+            "colormap": config['colormap'],
+            "resolution": resolution,
+            "interpolation_method": method,
+            "projection": PROJECTIONS[projection],
+            "images": ordered_manifest(manifest, all_timestamps),
+            "generated_at": datetime.now().isoformat()
+        }
+        write_json_atomic(metadata, roi_dir / "metadata.json", indent=2)
+
+    done_count = sum(roi_counts)
+    total = len(timestamps) * len(rois)
+    print(f"\n🎉 {config['name'].title()}: {done_count}/{total} ROI-bilder klara")
+    return done_count, total
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Körjournal för återupptagbara bildgenereringar.
+
+Varje färdig enhet (parameter, tidsstämpel) skrivs direkt som en JSON-rad med
+utfilens SHA1, så att en krashad körning (OOM, timeout) kan fortsätta med
+--resume utan att räkna om färdiga bildrutor. Första raden beskriver körningen
+(indata-fingeravtryck och inställningar) - journalen används bara om den matchar.
+Utfiler skrivs via temp-fil och rename, så en halvskriven PNG hamnar aldrig
+under sitt slutliga namn. Journalen pekar på den publicerade filen (med
+innehållshash i namnet, se image_manifest).
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+from water_mask import file_fingerprint
+
+JOURNAL_FILENAME = '.generation-journal.jsonl'
+
+# --force betyder samma sak i alla generatorer
+FORCE_HELP = ('Räkna om allt, även utfiler som annars återanvänds eftersom förra körningen '
+              'skapade dem från samma indata och inställningar (run_key)')
+
+def temporary_output_path(output_path):
+    """Temp-fil bredvid utfilen (samma filsystem, så att rename blir atomisk)"""
+    output_path = Path(output_path)
+    return output_path.with_name(f".{output_path.name}.tmp")
+
+def commit_output(tmp_path, output_path):
+    """Flytta färdig temp-fil till slutligt namn (atomiskt)"""
+    os.replace(tmp_path, output_path)
+
+def write_json_atomic(data, output_path, **dump_options):
+    """Skriv JSON via temp-fil och rename"""
+    tmp_path = temporary_output_path(output_path)
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **dump_options)
+    commit_output(tmp_path, output_path)
+
+def _unit_key(parameter, timestamp):
+    return f"{parameter}|{timestamp}"
+
+def open_run_journal(directory, run_key, resume):
+    """
+    Öppna körjournalen i directory. Med resume läses färdiga enheter från en journal
+    med samma run_key; annars (eller vid annan run_key) påbörjas en ny journal.
+    """
+    path = Path(directory) / JOURNAL_FILENAME
+    completed = {}
+
+    if resume and path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get('run_key') == run_key:
+            for line in lines[1:]:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Sista raden kan vara halvskriven om processen dog mitt i
+                    continue
+                completed[_unit_key(entry['parameter'], entry['timestamp'])] = entry
+            print(f"📒 Återupptar körning: {len(completed)} färdiga enheter i {path}")
+        else:
+            print(f"⚠️ Journalen {path} gäller en annan körning (indata eller inställningar), börjar om")
+            resume = False
+    elif resume:
+        print(f"⚠️ Ingen journal i {path}, börjar från början")
+        resume = False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if not resume:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'run_key': run_key}, separators=(',', ':')) + '\n')
+
+    return {'path': path, 'run_key': run_key, 'completed': completed}
+
+def is_completed(journal, parameter, timestamp, output_path):
+    """
+    Sant om enheten är journalförd och den journalförda utfilen (i output_path:s
+    katalog, under publiceringsnamnet) finns med samma innehåll
+    """
+    if journal is None:
+        return False
+    entry = journal['completed'].get(_unit_key(parameter, timestamp))
+    if entry is None:
+        return False
+    journaled_path = Path(output_path).with_name(entry['output'])
+    return journaled_path.exists() and file_fingerprint(journaled_path) == entry['sha1']
+
+def completed_output_path(journal, parameter, timestamp, directory):
+    """Sökväg till enhetens journalförda utfil i directory (publiceringsnamnet), eller None"""
+    if journal is None:
+        return None
+    entry = journal['completed'].get(_unit_key(parameter, timestamp))
+    return None if entry is None else Path(directory) / entry['output']
+
+def completed_statistics(journal, parameter, timestamp):
+    """Statistiken som journalfördes med enheten (se frame_statistics), eller None"""
+    if journal is None:
+        return None
+    entry = journal['completed'].get(_unit_key(parameter, timestamp))
+    return None if entry is None else entry.get('statistics')
+
+def record_completed(journal, parameter, timestamp, output_path, statistics=None):
+    """
+    Journalför en färdig enhet (skrivs och fsync:as direkt).
+    statistics sparas med enheten så att metadata.json blir komplett även för
+    bildrutor som hoppas över vid --resume.
+    """
+    if journal is None:
+        return
+    entry = {
+        'parameter': parameter,
+        'timestamp': timestamp,
+        'output': Path(output_path).name,
+        'sha1': file_fingerprint(output_path),
+    }
+    if statistics is not None:
+        entry['statistics'] = statistics
+    with open(journal['path'], 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    journal['completed'][_unit_key(parameter, timestamp)] = entry
+
+def build_run_key(input_path, **settings):
+    """Identifierar en körning: indatafilens innehåll plus inställningar som påverkar bilderna"""
+    payload = {'input_sha1': file_fingerprint(input_path), **settings}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+def previous_run_key(metadata_path):
+    """run_key i en tidigare skriven metadata.json, eller None"""
+    metadata_path = Path(metadata_path)
+    if not metadata_path.exists():
+        return None
+    try:
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('run_key')
+    except (OSError, json.JSONDecodeError):
+        return None
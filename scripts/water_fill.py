@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Vattenbegränsad gap-fyllning via ett glest Laplace-problem.
+
+Nearest-fallbacken och edge points fyller luckor efter rak avstånd och läcker
+därför värden över Själland, Fyn och svenska kusten in i andra bassänger.
+Här fylls istället vattenpixlar utan interpolerat värde genom att lösa
+Laplace-ekvationen (4-grannskap) bara över vattenpixlar, med de kända
+pixlarna som randvillkor. Värden sprids alltså bara längs vattenvägar.
+
+Systemet beror bara på vattenmasken och vilka pixlar som är kända (datapunkternas
+konvexa hölje), inte på värdena. LU-faktoriseringen cachas därför och återanvänds
+för alla tidssteg och parametrar med samma mask och punktmängd; varje bildruta
+kostar en bakåtsubstitution. Vattenområden utan någon känd pixel lämnas tomma (NaN).
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Antal faktoriseringar som hålls i minnet (en per mask/punktmängd)
+FILL_CACHE_SIZE = 4
+
+_operator_cache = OrderedDict()
+
+def _operator_key(water_mask, known):
+    digest = hashlib.sha1()
+    digest.update(np.asarray(water_mask.shape, dtype=np.int64).tobytes())
+    digest.update(np.packbits(water_mask).tobytes())
+    digest.update(np.packbits(known).tobytes())
+    return digest.hexdigest()
+
+def build_fill_operator(water_mask, known):
+    """
+    Faktorisera Laplace-systemet för de okända vattenpixlarna.
+    Returnerar en dict med okända pixlar (platta index), randpixlar, randmatris och LU-faktorisering.
+    """
+    from scipy import sparse
+    from scipy.sparse.linalg import splu
+    from scipy.ndimage import label
+
+    height, width = water_mask.shape
+    unknown = water_mask & ~known
+
+    # Vattenområden utan någon känd pixel saknar randvillkor och lämnas tomma
+    components, _ = label(water_mask)
+    seeded = np.unique(components[known & water_mask])
+    solvable = unknown & np.isin(components, seeded[seeded > 0])
+    orphan_count = int(np.count_nonzero(unknown)) - int(np.count_nonzero(solvable))
+
+    unknown_flat = np.flatnonzero(solvable)
+    position = np.full(height * width, -1, dtype=np.int64)
+    position[unknown_flat] = np.arange(unknown_flat.size)
+
+    rows, cols = np.divmod(unknown_flat, width)
+    degree = np.zeros(unknown_flat.size, dtype=np.float64)
+    interior_rows, interior_cols = [], []
+    boundary_rows, boundary_pixels = [], []
+
+    for d_row, d_col in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        neighbor_rows, neighbor_cols = rows + d_row, cols + d_col
+        inside = (neighbor_rows >= 0) & (neighbor_rows < height) & (neighbor_cols >= 0) & (neighbor_cols < width)
+        source = np.flatnonzero(inside)
+        neighbor = neighbor_rows[inside] * width + neighbor_cols[inside]
+
+        # Bara vattengrannar kopplar (land är en isolerande rand)
+        wet = water_mask.ravel()[neighbor]
+        source, neighbor = source[wet], neighbor[wet]
+        degree[source] += 1
+
+        is_unknown = position[neighbor] >= 0
+        interior_rows.append(source[is_unknown])
+        interior_cols.append(position[neighbor[is_unknown]])
+        boundary_rows.append(source[~is_unknown])
+        boundary_pixels.append(neighbor[~is_unknown])
+
+    interior_rows = np.concatenate(interior_rows)
+    interior_cols = np.concatenate(interior_cols)
+    matrix = sparse.csc_matrix(
+        (
+            np.concatenate([degree, -np.ones(interior_rows.size)]),
+            (np.concatenate([np.arange(unknown_flat.size), interior_rows]),
+             np.concatenate([np.arange(unknown_flat.size), interior_cols])),
+        ),
+        shape=(unknown_flat.size, unknown_flat.size),
+    )
+
+    boundary_rows = np.concatenate(boundary_rows)
+    boundary_pixels = np.concatenate(boundary_pixels)
+    boundary_index, boundary_cols = np.unique(boundary_pixels, return_inverse=True)
+    boundary_matrix = sparse.csr_matrix(
+        (np.ones(boundary_rows.size), (boundary_rows, boundary_cols)),
+        shape=(unknown_flat.size, boundary_index.size),
+    )
+
+    lu = splu(matrix) if unknown_flat.size else None
+    return {
+        'unknown_index': unknown_flat,
+        'boundary_index': boundary_index,
+        'boundary_matrix': boundary_matrix,
+        'lu': lu,
+        'orphan_count': orphan_count,
+    }
+
+def get_fill_operator(water_mask, known):
+    """Cachad fyllningsoperator för (mask, kända pixlar); faktoriseras bara vid ny kombination"""
+    key = _operator_key(water_mask, known)
+    operator = _operator_cache.get(key)
+    if operator is not None:
+        _operator_cache.move_to_end(key)
+        return operator, True
+
+    operator = build_fill_operator(water_mask, known)
+    _operator_cache[key] = operator
+    while len(_operator_cache) > FILL_CACHE_SIZE:
+        _operator_cache.popitem(last=False)
+    return operator, False
+
+def laplace_fill(grid_values, water_mask):
+    """
+    Fyll NaN-vattenpixlar i grid_values in-place via vattenbegränsad diffusion.
+    Returnerar antal fyllda pixlar.
+    """
+    known = water_mask & ~np.isnan(grid_values)
+    if np.count_nonzero(known) == np.count_nonzero(water_mask):
+        return 0
+
+    operator, cached = get_fill_operator(water_mask, known)
+    flat = grid_values.reshape(-1)
+    if operator['lu'] is not None:
+        rhs = operator['boundary_matrix'] @ flat[operator['boundary_index']].astype(np.float64)
+        flat[operator['unknown_index']] = operator['lu'].solve(rhs)
+
+    filled = operator['unknown_index'].size
+    print(f"   💧 Laplace-fyllning: {filled} vattenpixlar längs vattenvägar "
+          f"({'cachad faktorisering' if cached else 'ny faktorisering'})"
+          + (f", {operator['orphan_count']} pixlar i vatten utan data lämnas tomma" if operator['orphan_count'] else ''))
+    return filled
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Vattenmask-subsystem: rasterisering av vattenpolygoner till täckningsraster.
+
+GeoJSON-filen klipps först till bbox, slås ihop och förenklas till en tolerans
+som motsvarar pixelstorleken. Resultatet cachas som en liten GeoJSON-fil som
+alla generatorer och debug-script läser istället för hela 34MB-filen.
+
+Polygonerna rasteriseras sedan EN GÅNG till en högupplöst master-raster (scanline med
+nonzero winding, helt i numpy) som cachas på disk. Masker och kantutjämnade
+alfakanaler för varje lägre upplösning tas sedan fram genom blockmedelvärden,
+vilket ger mjuka kustlinjer i PNG-bilderna utan extra kostnad per bild.
+"""
+
+import json
+import hashlib
+import argparse
+import numpy as np
+from pathlib import Path
+
+# Standardupplösning för master-rastern (2400 → 2x2-block, 1200 → 4x4-block)
+DEFAULT_MASTER_RESOLUTION = 4800
+
+# Standardkatalog för cachade mellanresultat
+DEFAULT_CACHE_DIR = '.makrill-cache'
+
+# Max antal (kant, rad)-korsningar per batch vid rasterisering
+MAX_CROSSINGS_PER_BATCH = 4_000_000
+
+# Samma bbox som frontend Map.tsx maxBounds (lon_min, lon_max, lat_min, lat_max)
+DEFAULT_BBOX = (10.3, 16.6, 54.9, 59.6)
+
+# Förenklingstolerans i andelar av en pixel
+SIMPLIFY_PIXEL_FRACTION = 0.5
+
+# Antal decimaler för koordinater i den cachade GeoJSON-filen (~1 cm)
+CACHED_COORDINATE_DECIMALS = 7
+
+def file_fingerprint(path):
+    """SHA1 av filinnehåll (stabil över git checkout, till skillnad från mtime)"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_water_polygons(geojson_path):
+    """Ladda alla vattenpolygoner från GeoJSON (oklippt)"""
+    import geojson
+    from shapely.geometry import shape
+
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        water_geojson = geojson.load(f)
+
+    return [
+        shape(feature['geometry'])
+        for feature in water_geojson['features']
+        if feature['geometry']['type'] in ['Polygon', 'MultiPolygon']
+    ]
+
+def simplify_tolerance_for_resolution(bbox, resolution):
+    """Förenklingstolerans (grader) härledd från pixelstorleken för en upplösning"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    pixel_size = min((lon_max - lon_min) / resolution, (lat_max - lat_min) / resolution)
+    return pixel_size * SIMPLIFY_PIXEL_FRACTION
+
+def clip_and_simplify(water_polygons, bbox, tolerance):
+    """Klipp polygonerna till bbox, slå ihop dem och förenkla till given tolerans"""
+    from shapely.geometry import box
+    from shapely.ops import unary_union
+
+    lon_min, lon_max, lat_min, lat_max = bbox
+    clip_box = box(lon_min, lat_min, lon_max, lat_max)
+
+    clipped = []
+    for polygon in water_polygons:
+        # Billig bounds-koll först, exakt intersection bara för polygoner som når bbox
+        x0, y0, x1, y1 = polygon.bounds
+        if x1 < lon_min or x0 > lon_max or y1 < lat_min or y0 > lat_max:
+            continue
+        if not polygon.is_valid:
+            polygon = polygon.buffer(0)
+        part = polygon.intersection(clip_box)
+        if not part.is_empty:
+            clipped.append(part)
+
+    merged = unary_union(clipped)
+    simplified = merged.simplify(tolerance, preserve_topology=True)
+    return [
+        geometry for geometry in getattr(simplified, 'geoms', [simplified])
+        if geometry.geom_type == 'Polygon' and not geometry.is_empty
+    ]
+
+def _count_vertices(water_polygons):
+    """Antal hörn i alla ringar (för rapportering)"""
+    total = 0
+    for geometry in water_polygons:
+        for polygon in getattr(geometry, 'geoms', [geometry]):
+            if polygon.geom_type != 'Polygon':
+                continue
+            total += len(polygon.exterior.coords) + sum(len(ring.coords) for ring in polygon.interiors)
+    return total
+
+def _save_polygons_geojson(water_polygons, output_path):
+    """Spara polygoner som kompakt GeoJSON med avrundade koordinater"""
+    from shapely.geometry import mapping
+
+    def rounded(coords):
+        return [[round(x, CACHED_COORDINATE_DECIMALS), round(y, CACHED_COORDINATE_DECIMALS)] for x, y in coords]
+
+    features = []
+    for polygon in water_polygons:
+        geometry = mapping(polygon)
+        geometry = {'type': 'Polygon', 'coordinates': [rounded(ring) for ring in geometry['coordinates']]}
+        features.append({'type': 'Feature', 'properties': {}, 'geometry': geometry})
+
+    tmp_path = Path(f"{output_path}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f, separators=(',', ':'))
+    tmp_path.replace(output_path)
+
+def clipped_geometry_path(geojson_path, bbox, resolution, cache_dir=DEFAULT_CACHE_DIR):
+    """Sökväg till cachad klippt/förenklad GeoJSON för källfil, bbox och upplösning"""
+    bbox_key = '_'.join(f"{value:.4f}" for value in bbox)
+    source_key = file_fingerprint(geojson_path)
+    return Path(cache_dir) / f"water-clipped_{source_key[:12]}_{bbox_key}_{resolution}.geojson"
+
+def load_clipped_water_polygons(geojson_path, bbox=DEFAULT_BBOX, resolution=DEFAULT_MASTER_RESOLUTION,
+                                cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Ladda vattenpolygoner klippta till bbox och förenklade för given upplösning.
+    Första körningen läser hela GeoJSON-filen och skriver en liten cache-fil;
+    efterföljande körningar läser bara cache-filen.
+    """
+    cache_path = clipped_geometry_path(geojson_path, bbox, resolution, cache_dir)
+
+    if cache_path.exists():
+        water_polygons = load_water_polygons(cache_path)
+        print(f"⚡ Laddade {len(water_polygons)} klippta vattenpolygoner från {cache_path} "
+              f"({cache_path.stat().st_size / 1024:.0f} KB)")
+        return water_polygons
+
+    print(f"🌊 Förbearbetar vattenmask {geojson_path} (klipp + union + förenkling)...")
+    raw_polygons = load_water_polygons(geojson_path)
+    tolerance = simplify_tolerance_for_resolution(bbox, resolution)
+    water_polygons = clip_and_simplify(raw_polygons, bbox, tolerance)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    _save_polygons_geojson(water_polygons, cache_path)
+
+    print(f"✅ {len(raw_polygons)} polygoner ({_count_vertices(raw_polygons)} hörn) → "
+          f"{len(water_polygons)} polygoner ({_count_vertices(water_polygons)} hörn), "
+          f"tolerans {tolerance:.5f}°")
+    print(f"💾 Cachad i {cache_path} ({cache_path.stat().st_size / 1024:.0f} KB, "
+          f"källa {Path(geojson_path).stat().st_size / 1024 / 1024:.1f} MB)")
+    return water_polygons
+
+def points_in_water(lons, lats, water_polygons):
+    """Vektoriserat test av vilka punkter som ligger i vatten (bool-array)"""
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    inside = np.zeros(lons.shape, dtype=bool)
+
+    try:
+        from shapely import contains_xy
+    except ImportError:
+        contains_xy = None
+
+    for polygon in water_polygons:
+        x0, y0, x1, y1 = polygon.bounds
+        candidates = np.flatnonzero(~inside & (lons >= x0) & (lons <= x1) & (lats >= y0) & (lats <= y1))
+        if candidates.size == 0:
+            continue
+        if contains_xy is not None:
+            inside[candidates] = contains_xy(polygon, lons[candidates], lats[candidates])
+        else:
+            from shapely.geometry import Point
+            from shapely.prepared import prep
+            prepared = prep(polygon)
+            inside[candidates] = [prepared.contains(Point(x, y)) for x, y in zip(lons[candidates], lats[candidates])]
+
+    return inside
+
+def _polygon_edges(water_polygons):
+    """Samla alla kanter (x0, y0, x1, y1) från orienterade polygoner"""
+    from shapely.geometry.polygon import orient
+
+    edges = []
+    for geometry in water_polygons:
+        parts = getattr(geometry, 'geoms', [geometry])
+        for polygon in parts:
+            if polygon.is_empty or polygon.geom_type != 'Polygon':
+                continue
+            # Yttre ring moturs, hål medurs → nonzero winding ger unionen av alla polygoner
+            polygon = orient(polygon, sign=1.0)
+            for ring in [polygon.exterior, *polygon.interiors]:
+                coords = np.asarray(ring.coords)
+                edges.append(np.column_stack([coords[:-1], coords[1:]]))
+
+    if not edges:
+        return np.empty((0, 4))
+    return np.concatenate(edges)
+
+def rasterize_polygons(water_polygons, xs, ys):
+    """
+    Rasterisera polygoner till bool-raster (len(ys), len(xs)) samplad i punkterna
+    xs x ys (stigande, jämnt fördelade). En pixel är vatten om dess samplingspunkt
+    ligger inuti någon polygon.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    width, height = xs.size, ys.size
+    dx = (xs[-1] - xs[0]) / (width - 1) if width > 1 else 1.0
+    dy = (ys[-1] - ys[0]) / (height - 1) if height > 1 else 1.0
+
+    edges = _polygon_edges(water_polygons)
+    x0, y0, x1, y1 = edges.T
+    sloped = y0 != y1
+    x0, y0, x1, y1 = x0[sloped], y0[sloped], x1[sloped], y1[sloped]
+
+    # Rader i intervallet [min(y), max(y)) korsas av kanten
+    y_low = np.minimum(y0, y1)
+    y_high = np.maximum(y0, y1)
+    row_first = np.clip(np.ceil((y_low - ys[0]) / dy), 0, height).astype(np.int64)
+    row_stop = np.clip(np.ceil((y_high - ys[0]) / dy), 0, height).astype(np.int64)
+    row_counts = np.maximum(row_stop - row_first, 0)
+
+    # Differens-array: +1/-1 i första kolumnen till höger om varje korsning
+    winding_diff = np.zeros(height * (width + 1), dtype=np.int32)
+    cumulative = np.concatenate([[0], np.cumsum(row_counts)])
+
+    batch_start = 0
+    while batch_start < row_counts.size:
+        batch_end = np.searchsorted(cumulative, cumulative[batch_start] + MAX_CROSSINGS_PER_BATCH, side='right') - 1
+        batch_end = max(batch_end, batch_start + 1)
+        batch = slice(batch_start, batch_end)
+
+        counts = row_counts[batch]
+        edge_index = np.repeat(np.arange(counts.size), counts)
+        if edge_index.size:
+            offsets = np.arange(edge_index.size) - np.repeat(cumulative[batch_start:batch_end] - cumulative[batch_start], counts)
+            rows = row_first[batch][edge_index] + offsets
+
+            ex0, ey0 = x0[batch][edge_index], y0[batch][edge_index]
+            ex1, ey1 = x1[batch][edge_index], y1[batch][edge_index]
+            y_row = ys[0] + rows * dy
+            x_cross = ex0 + (y_row - ey0) * (ex1 - ex0) / (ey1 - ey0)
+
+            columns = np.clip(np.floor((x_cross - xs[0]) / dx) + 1, 0, width).astype(np.int64)
+            signs = np.where(ey1 > ey0, 1, -1)
+            winding_diff += np.bincount(
+                rows * (width + 1) + columns, weights=signs, minlength=winding_diff.size
+            ).astype(np.int32)
+
+        batch_start = batch_end
+
+    winding = np.cumsum(winding_diff.reshape(height, width + 1)[:, :width], axis=1)
+    return winding != 0
+
+def build_master_raster(water_polygons, bbox, master_resolution):
+    """Rasterisera polygonerna till cellcentrerad master-raster över bbox"""
+    lon_min, lon_max, lat_min, lat_max = bbox
+    dx = (lon_max - lon_min) / master_resolution
+    dy = (lat_max - lat_min) / master_resolution
+    xs = lon_min + (np.arange(master_resolution) + 0.5) * dx
+    ys = lat_min + (np.arange(master_resolution) + 0.5) * dy
+    return rasterize_polygons(water_polygons, xs, ys)
+
+def load_or_build_master_raster(water_polygons, bbox, master_resolution, source_key, cache_dir=DEFAULT_CACHE_DIR):
+    """Hämta master-rastern från disk-cache eller bygg och cacha den"""
+    bbox_key = '_'.join(f"{value:.4f}" for value in bbox)
+    cache_path = Path(cache_dir) / f"water-master_{source_key[:12]}_{bbox_key}_{master_resolution}.npz"
+
+    if cache_path.exists():
+        with np.load(cache_path) as cached:
+            master = np.unpackbits(cached['bits'])[:master_resolution * master_resolution]
+        print(f"⚡ Laddade cachad master-raster {master_resolution}x{master_resolution} från {cache_path}")
+        return master.reshape(master_resolution, master_resolution).astype(bool)
+
+    print(f"🌊 Rasteriserar master-raster ({master_resolution}x{master_resolution})...")
+    master = build_master_raster(water_polygons, bbox, master_resolution)
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(cache_path, bits=np.packbits(master))
+    print(f"💾 Master-raster cachad i {cache_path} ({100*master.mean():.1f}% vatten)")
+    return master
+
+def coverage_for_resolution(master, resolution):
+    """
+    Blockmedelvärde av master-rastern → andel vatten (0-1, float32) per pixel
+    i en resolution x resolution-grid.
+    """
+    master_resolution = master.shape[0]
+    if resolution > master_resolution:
+        raise ValueError(
+            f"Upplösning {resolution} är större än master-rastern ({master_resolution})"
+        )
+
+    if master_resolution % resolution == 0:
+        factor = master_resolution // resolution
+        blocks = master.reshape(resolution, factor, resolution, factor)
+        return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+    # Ojämn faktor: block med nästan lika storlek via reduceat
+    edges = (np.arange(resolution + 1) * master_resolution) // resolution
+    starts = edges[:-1]
+    sizes = np.diff(edges)
+    sums = np.add.reduceat(master.astype(np.uint32), starts, axis=0)
+    sums = np.add.reduceat(sums, starts, axis=1)
+    return (sums / np.outer(sizes, sizes)).astype(np.float32)
+
+def load_water_coverage(water_polygons, bbox, resolution, source_path,
+                        master_resolution=DEFAULT_MASTER_RESOLUTION, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Täckningsraster (andel vatten per pixel) för given upplösning.
+    Master-rastern byggs bara om vattenmasken, bbox eller master-upplösningen ändrats.
+    """
+    master_resolution = max(master_resolution, resolution)
+    source_key = file_fingerprint(source_path)
+    master = load_or_build_master_raster(water_polygons, bbox, master_resolution, source_key, cache_dir)
+
+    coverage = coverage_for_resolution(master, resolution)
+    water_pixels = int(np.count_nonzero(coverage > 0))
+    edge_pixels = int(np.count_nonzero((coverage > 0) & (coverage < 1)))
+    print(f"✅ Täckningsraster {resolution}x{resolution}: {water_pixels} vattenpixlar "
+          f"varav {edge_pixels} kantpixlar med delvis täckning")
+    return coverage
+
+def water_mask_from_coverage(coverage):
+    """Bool-mask: pixlar med någon vattentäckning får data"""
+    return coverage > 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Förbearbeta vattenmask (klipp, union, förenkling, master-raster)')
+    parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Sökväg till vattenmask GeoJSON')
+    parser.add_argument('--resolution', type=int, default=DEFAULT_MASTER_RESOLUTION,
+                       help=f'Upplösning som förenklingstoleransen härleds från (default: {DEFAULT_MASTER_RESOLUTION})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--with-raster', action='store_true',
+                       help='Bygg även master-rastern för coverage-masken')
+
+    args = parser.parse_args(argv)
+
+    water_polygons = load_clipped_water_polygons(args.water_mask, DEFAULT_BBOX, args.resolution, args.cache_dir)
+    if args.with_raster:
+        load_or_build_master_raster(
+            water_polygons, DEFAULT_BBOX, args.resolution,
+            file_fingerprint(args.water_mask), args.cache_dir
+        )
+
+if __name__ == "__main__":
+    main()
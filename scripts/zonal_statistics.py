@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Zonstatistik per namngivet havsområde (medel/min/max per timme och parameter).
+
+Zonpolygonerna (ROI-förval, en zon runt DMI-punkterna i src/lib/points.ts och
+egna polygoner från GeoJSON) rasteriseras EN gång till en heltalsraster i samma
+pixlar som gridarna (vattenmask och Mercator-radomflyttning inräknade). Zoner
+får överlappa: varje etikett står för en kombination av zoner, och etiketternas
+summor fördelas på zonerna med en liten medlemsmatris. Varje grid reduceras
+sedan med np.bincount/reduceat över zonpixlarna, så kostnaden per tidssteg är
+en gather plus några bincount oavsett antal zoner.
+
+Gridarna läses från grid-lagret (--grid-store) när det är komplett, annars
+interpoleras de med samma lågminnesväg som bildgeneratorn (med --artifact-cache
+återanvänds generatorns cachade grids). Resultatet är en liten JSON-tabell.
+"""
+
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+import numpy as np
+
+from interpolation_backends import INTERPOLATION_BACKENDS, DEFAULT_METHOD
+from water_mask import (
+    rasterize_polygons, water_mask_from_coverage, file_fingerprint,
+    DEFAULT_BBOX, DEFAULT_MASTER_RESOLUTION, DEFAULT_CACHE_DIR
+)
+from forecast_arrays import load_area_parameters
+from generate_marine_parameter_images import (
+    get_parameter_config, extract_parameter_data_from_arrays, compute_parameter_grid,
+    load_low_memory_inputs_cached, grid_settings_for, frame_artifact_keys
+)
+from extract_location_timeseries import load_locations_from_points_ts
+from roi_rendering import parse_roi, ROI_PRESETS
+from artifact_cache import open_artifact_cache, cached_artifact, report_artifact_cache
+from grid_store import grid_store_path, open_grid_store, read_store_grid
+from low_memory_grid import plan_chunk_rows
+from mercator_remap import PROJECTIONS, projection_remap, remap_rows
+from parallel_frames import run_frames
+
+ZONE_PARAMETERS = ['current', 'temperature', 'salinity']
+
+# Decimaler i JSON-tabellen per parameter
+ZONE_DECIMALS = {
+    'current': 3,
+    'temperature': 2,
+    'salinity': 2,
+}
+
+# Marginal (grader) runt DMI-punkternas konvexa hölje
+POINTS_ZONE_BUFFER = 0.02
+
+def roi_zone(name, roi_bbox):
+    """Rektangulär zon från ett ROI (lon_min, lon_max, lat_min, lat_max)"""
+    from shapely.geometry import box
+
+    lon_min, lon_max, lat_min, lat_max = roi_bbox
+    return {'name': name, 'geometry': box(lon_min, lat_min, lon_max, lat_max)}
+
+def points_zone(points_ts_path, buffer=POINTS_ZONE_BUFFER):
+    """Zon runt DMI_GRID_POINTS i points.ts (konvext hölje med marginal)"""
+    from shapely.geometry import MultiPoint
+
+    locations = load_locations_from_points_ts(points_ts_path)
+    if not locations:
+        return None
+    hull = MultiPoint([(location['lon'], location['lat']) for location in locations]).convex_hull
+    return {'name': 'DMI-punkter', 'geometry': hull.buffer(buffer)}
+
+def load_zones_geojson(geojson_path):
+    """Zoner från GeoJSON (namn från egenskapen name/namn)"""
+    from shapely.geometry import shape
+
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        features = json.load(f)['features']
+    zones = []
+    for i, feature in enumerate(features):
+        if feature['geometry']['type'] not in ['Polygon', 'MultiPolygon']:
+            continue
+        properties = feature.get('properties') or {}
+        name = properties.get('name') or properties.get('namn') or f"Zon {i+1}"
+        zones.append({'name': name, 'geometry': shape(feature['geometry'])})
+    return zones
+
+def build_zone_labels(zones, bbox, shape, water_mask, row_remap=None):
+    """
+    Etikettraster (int32, 0 = ingen zon) i gridens pixlar. Etikett k+1 är den k:te
+    unika kombinationen av zoner; combos[k] anger vilka zoner den tillhör.
+    Bara vattenpixlar (water_mask) får etikett.
+    """
+    height, width = shape
+    lon_min, lon_max, lat_min, lat_max = bbox
+    xs = np.linspace(lon_min, lon_max, width)
+    ys = np.linspace(lat_min, lat_max, height)
+
+    masks = []
+    for zone in zones:
+        mask = rasterize_polygons([zone['geometry']], xs, ys)
+        if row_remap is not None:
+            mask = remap_rows(mask, row_remap)
+        masks.append(mask.reshape(-1))
+
+    index = np.flatnonzero(np.logical_or.reduce(masks) & water_mask.reshape(-1))
+    if index.size == 0:
+        return {'labels': np.zeros(shape, dtype=np.int32), 'combos': np.zeros((0, len(zones)), dtype=bool)}
+    membership = np.column_stack([mask[index] for mask in masks])
+    combos, combo_of_pixel = np.unique(membership, axis=0, return_inverse=True)
+
+    labels = np.zeros(height * width, dtype=np.int32)
+    labels[index] = combo_of_pixel.reshape(-1) + 1
+    return {'labels': labels.reshape(height, width), 'combos': combos}
+
+def zone_reducer(zone_labels):
+    """Förberäkna pixelindex sorterade per etikett (för bincount och reduceat)"""
+    flat_labels = zone_labels['labels'].reshape(-1)
+    index = np.flatnonzero(flat_labels)
+    order = np.argsort(flat_labels[index], kind='stable')
+    index = index[order]
+    labels = flat_labels[index] - 1
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]]) if labels.size else np.zeros(0, dtype=np.intp)
+    combos = zone_labels['combos']
+    return {
+        'index': index,
+        'labels': labels,
+        'starts': starts,
+        'combos': combos,
+        'weights': combos.astype(np.float64),
+        'water_pixels': np.bincount(labels, minlength=len(combos)) @ combos.astype(np.int64),
+    }
+
+def reduce_zones(grid_values, reducer):
+    """(medel, min, max) per zon för en grid (NaN = ingen data)"""
+    combos = reducer['combos']
+    zone_count = combos.shape[1]
+    if reducer['index'].size == 0:
+        empty = np.full(zone_count, np.nan)
+        return empty, empty.copy(), empty.copy()
+
+    values = grid_values.reshape(-1)[reducer['index']].astype(np.float64)
+    finite = np.isfinite(values)
+    labels = reducer['labels']
+    counts = np.bincount(labels, weights=finite, minlength=len(combos))
+    sums = np.bincount(labels, weights=np.where(finite, values, 0.0), minlength=len(combos))
+    maxs = np.maximum.reduceat(np.where(finite, values, -np.inf), reducer['starts'])
+    mins = np.minimum.reduceat(np.where(finite, values, np.inf), reducer['starts'])
+
+    zone_counts = counts @ reducer['weights']
+    zone_sums = sums @ reducer['weights']
+    zone_max = np.where(combos, maxs[:, None], -np.inf).max(axis=0)
+    zone_min = np.where(combos, mins[:, None], np.inf).min(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        zone_mean = np.where(zone_counts > 0, zone_sums / zone_counts, np.nan)
+    zone_max[~np.isfinite(zone_max)] = np.nan
+    zone_min[~np.isfinite(zone_min)] = np.nan
+    return zone_mean, zone_min, zone_max
+
+def complete_grid_store(cache_dir, output_base_dir, parameter, bbox, input_sha1, input_timestamps):
+    """
+    Grid-lagret för parameterns bilder om det byggdes från samma indatafil (input_sha1)
+    med samma tidssteg och alla tidssteg finns sparade, annars None.
+    input_timestamps() ger indatafilens tidssteg (läses bara om ett lager kan användas).
+    """
+    output_dir = Path(output_base_dir) / get_parameter_config(parameter)['output_dir']
+    store = open_grid_store(grid_store_path(cache_dir, output_dir))
+    if store is None:
+        return None
+    meta = store['meta']
+    if meta['parameter'] != parameter or meta['bbox'] != list(bbox) or not all(meta['written']):
+        return None
+    if meta.get('input_sha1') != input_sha1 or meta['timestamps'] != input_timestamps():
+        print(f"⚠️ Grid-lagret {store['path']} gäller en annan prognos, interpolerar {parameter} istället")
+        return None
+    return store
+
+def reduce_store_frame(context, task):
+    """Zonstatistik för en grid ur grid-lagret (körs i arbetsprocess när --workers > 1)"""
+    time_index, _ = task
+    return reduce_zones(read_store_grid(context['grid_store'], time_index), context['reducer'])
+
+def reduce_interpolated_frame(context, task):
+    """Interpolera en grid och reducera den per zon (körs i arbetsprocess när --workers > 1)"""
+    time_index, timestamp = task
+    parameter = context['parameter']
+    forecast = context['forecast']
+    lons, lats, values = extract_parameter_data_from_arrays(
+        forecast, time_index, forecast['water_points'], parameter
+    )
+    if len(lons) == 0:
+        print(f"⚠️ Ingen {get_parameter_config(parameter)['name']}-data för {timestamp}")
+        return None
+
+    grid_key, _ = frame_artifact_keys(context, parameter, timestamp)
+    grid_values = cached_artifact(context.get('artifacts'), 'grid', grid_key, lambda: compute_parameter_grid(
+        lons, lats, values, context['water_mask_grid'], context['bbox'], parameter,
+        context['chunk_rows'], context['method'], row_remap=context['row_remap'], lattice=context['lattice']
+    ))
+    print(f"   📐 {parameter} {time_index+1}/{context['total']}: {timestamp}")
+    return reduce_zones(grid_values, context['reducer'])
+
+def rounded_table(rows, decimals):
+    """(zoner x tidssteg) → listor med avrundade värden och None för NaN"""
+    rounded = np.round(rows, decimals)
+    return [[None if not np.isfinite(value) else float(value) for value in row] for row in rounded]
+
+def collect_zone_table(results, zone_count, decimals):
+    """Per-tidsstegsresultat (medel, min, max) → tabeller per statistik (zoner x tidssteg)"""
+    table = {key: np.full((zone_count, len(results)), np.nan) for key in ('mean', 'min', 'max')}
+    for t, result in enumerate(results):
+        if result is None:
+            continue
+        for key, values in zip(('mean', 'min', 'max'), result):
+            table[key][:, t] = values
+    return {key: rounded_table(rows, decimals) for key, rows in table.items()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Zonstatistik (medel/min/max per timme) för namngivna havsområden')
+    parser.add_argument('--input', default='public/data/area-parameters-extended.json.gz',
+                       help='Sökväg till komprimerad area-parameters fil')
+    parser.add_argument('--water-mask', default='public/data/scandinavian-waters.geojson',
+                       help='Sökväg till vattenmask GeoJSON')
+    parser.add_argument('--zones', default=None,
+                       help='GeoJSON med egna zonpolygoner (namn från egenskapen name)')
+    parser.add_argument('--roi', action='append', default=[], metavar='ROI',
+                       help=f"Rektangulär zon ({', '.join(ROI_PRESETS)} eller namn=lon_min,lon_max,lat_min,lat_max); kan upprepas")
+    parser.add_argument('--points-ts', default='src/lib/points.ts',
+                       help='Zon runt DMI_GRID_POINTS i denna fil om inga andra zoner anges')
+    parser.add_argument('--parameter', choices=ZONE_PARAMETERS + ['all'], default='all',
+                       help='Parameter att räkna zonstatistik för (default: all)')
+    parser.add_argument('--source', choices=['auto', 'grid-store', 'interpolate'], default='auto',
+                       help='auto: grid-lagret om det är komplett och från samma prognosfil, annars interpolation (default: auto)')
+    parser.add_argument('--output-base-dir', default='public/data',
+                       help='Bildgeneratorns bas-directory (grid-lagret hör till dess parametermappar)')
+    parser.add_argument('--resolution', type=int, default=1200,
+                       help='Grid-upplösning vid interpolation (default: 1200x1200)')
+    parser.add_argument('--method', choices=list(INTERPOLATION_BACKENDS), default=DEFAULT_METHOD,
+                       help=f'Interpolationsmetod (default: {DEFAULT_METHOD})')
+    parser.add_argument('--no-lattice', action='store_true',
+                       help='Triangulera alltid punkterna som spridda, även när prognosen ligger på ett regelbundet gitter')
+    parser.add_argument('--projection', choices=list(PROJECTIONS), default='mercator',
+                       help='Projektion vid interpolation; samma som generatorn ger träffar i artefaktcachen (default: mercator)')
+    parser.add_argument('--mask-master-resolution', type=int, default=DEFAULT_MASTER_RESOLUTION,
+                       help=f'Upplösning för vattenmaskens master-raster (default: {DEFAULT_MASTER_RESOLUTION})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'Katalog för cachade mellanresultat (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--artifact-cache', action='store_true',
+                       help='Läs och spara interpolerade grids i artefaktcachen (samma nycklar som bildgeneratorn)')
+    parser.add_argument('--memory-budget-mb', type=float, default=1024,
+                       help='Minnesbudget per process vid interpolation (default: 1024 MB)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Antal processer för parallella tidssteg (default: 1)')
+    parser.add_argument('--output', default='public/data/zone-statistics.json',
+                       help='Output-fil (JSON)')
+
+    args = parser.parse_args(argv)
+    bbox = DEFAULT_BBOX
+
+    zones = []
+    if args.zones:
+        zones.extend(load_zones_geojson(args.zones))
+    try:
+        zones.extend(roi_zone(*parse_roi(spec, bbox)) for spec in args.roi)
+    except ValueError as e:
+        parser.error(str(e))
+    if not zones:
+        zones = [roi_zone(name, roi_bbox) for name, roi_bbox in ROI_PRESETS.items()]
+        if Path(args.points_ts).exists():
+            zone = points_zone(args.points_ts)
+            if zone is not None:
+                zones.append(zone)
+    if not zones:
+        parser.error('inga zoner att räkna statistik för')
+    print(f"🗺️ {len(zones)} zoner: {', '.join(zone['name'] for zone in zones)}")
+
+    parameters = ZONE_PARAMETERS if args.parameter == 'all' else [args.parameter]
+    input_sha1 = file_fingerprint(args.input)
+    loaded_timestamps = []
+
+    def input_timestamps():
+        if not loaded_timestamps:
+            timestamps = load_area_parameters(args.input)['metadata']['timestamps']
+            loaded_timestamps.append([str(timestamp) for timestamp in timestamps])
+        return loaded_timestamps[0]
+
+    stores = {
+        parameter: None if args.source == 'interpolate'
+        else complete_grid_store(args.cache_dir, args.output_base_dir, parameter, bbox, input_sha1, input_timestamps)
+        for parameter in parameters
+    }
+    if args.source == 'grid-store' and not all(stores.values()):
+        missing = [parameter for parameter, store in stores.items() if store is None]
+        parser.error(f"inget komplett grid-lager för {', '.join(missing)} (kör generatorn med --grid-store)")
+
+    # Indata för interpolation läses bara om någon parameter saknar ett komplett grid-lager
+    artifacts = open_artifact_cache(args.cache_dir) if args.artifact_cache else None
+    forecast = None
+    if not all(stores.values()):
+        forecast, water_coverage, artifact_inputs = load_low_memory_inputs_cached(
+            artifacts, args.input, args.water_mask, bbox, max(args.resolution, args.mask_master_resolution),
+            args.resolution, args.mask_master_resolution, args.cache_dir, parameters
+        )
+        water_mask_grid = water_mask_from_coverage(water_coverage)
+        row_remap = projection_remap(args.projection, bbox, args.resolution)
+        interpolation_reducer = zone_reducer(build_zone_labels(
+            zones, bbox, water_mask_grid.shape,
+            water_mask_grid if row_remap is None else remap_rows(water_mask_grid, row_remap), row_remap
+        ))
+
+    timestamps = None
+    sources = {}
+    tables = {}
+    for parameter in parameters:
+        config = get_parameter_config(parameter)
+        store = stores[parameter]
+        if store is not None:
+            meta = store['meta']
+            frame_timestamps = meta['timestamps']
+            water_index = np.load(store['path'] / 'index.npy')
+            water_mask = np.zeros(meta['shape'][0] * meta['shape'][1], dtype=bool)
+            water_mask[water_index] = True
+            store_remap = projection_remap(meta['projection'], bbox, meta['shape'][0])
+            reducer = zone_reducer(build_zone_labels(
+                zones, bbox, tuple(meta['shape']), water_mask.reshape(meta['shape']), store_remap
+            ))
+            context = {'grid_store': store, 'reducer': reducer}
+            render_frame = reduce_store_frame
+            sources[parameter] = {'source': 'grid-store', 'resolution': meta['shape'], 'projection': meta['projection']}
+            print(f"\n🗄️ {config['name'].title()}: {len(frame_timestamps)} grids från {store['path']}")
+        else:
+            frame_timestamps = forecast['timestamps']
+            reducer = interpolation_reducer
+            lattice = None if args.no_lattice else forecast['lattice']
+            context = {
+                'parameter': parameter,
+                'total': len(frame_timestamps),
+                'forecast': forecast,
+                'water_mask_grid': water_mask_grid,
+                'bbox': bbox,
+                'chunk_rows': plan_chunk_rows(args.resolution, args.memory_budget_mb),
+                'method': args.method,
+                'lattice': lattice,
+                'row_remap': row_remap,
+                'reducer': reducer,
+                'artifacts': artifacts,
+                'artifact_inputs': artifact_inputs,
+                'grid_settings': grid_settings_for(parameter, args.method, 'nearest', None, args.projection, lattice),
+            }
+            render_frame = reduce_interpolated_frame
+            sources[parameter] = {
+                'source': 'interpolation', 'resolution': list(water_mask_grid.shape), 'projection': args.projection
+            }
+            print(f"\n🔄 {config['name'].title()}: interpolerar {len(frame_timestamps)} grids ({args.method})")
+
+        if timestamps is None:
+            timestamps = list(frame_timestamps)
+        elif list(frame_timestamps) != timestamps:
+            parser.error(f"{parameter} har andra tidssteg än {parameters[0]} (grid-lagret är från en annan prognos)")
+
+        tasks = list(enumerate(frame_timestamps))
+        results = run_frames(render_frame, tasks, context, args.workers)
+        tables[parameter] = {
+            'unit': config['unit'],
+            'water_pixels': reducer['water_pixels'].tolist(),
+            **collect_zone_table(results, len(zones), ZONE_DECIMALS[parameter]),
+        }
+
+    report_artifact_cache(artifacts)
+
+    payload = {
+        'generated_at': datetime.now().isoformat(),
+        'bbox': bbox,
+        'timestamps': timestamps,
+        'zones': [zone['name'] for zone in zones],
+        'sources': sources,
+        'parameters': tables,
+    }
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+
+    print(f"✅ Sparade zonstatistik i: {output_path} ({output_path.stat().st_size / 1024:.1f} KB)")
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,13 @@ import { Source, Layer } from 'react-map-gl/maplibre';
 import React from 'react';
 import { useTimeSlider } from '../context/TimeSliderContext';
 import { useHeavyThrottle, useDraggingDetection } from '../../lib/throttleHooks';
-import { getLayerOffsetForBbox } from '../../lib/layerOffsets';
+import { getImageLayerOffset } from '../../lib/layerOffsets';
+import type { MetadataStatistics } from '../../lib/frameStatistics';
+import { frameImageUrl, type ImageManifest } from '../../lib/imageManifest';
+
+// Bildkatalog och (äldre metadata utan manifest) filnamnsprefix
+const IMAGE_DIRECTORY = '/data/current-magnitude-images';
+const IMAGE_PREFIX = 'current_magnitude';
 
 interface CurrentMagnitudeMetadata {
   bbox: [number, number, number, number]; // [lon_min, lon_max, lat_min, lat_max]
@@ -14,6 +20,9 @@ interface CurrentMagnitudeMetadata {
   timestamps: string[];
   colormap: Array<[number, string]>;
   resolution: number; // Grid-upplösning för bilderna (800, 1200, 1600, etc.)
+  projection?: string; // 'EPSG:3857' för Web Mercator-bilder, saknas i äldre metadata
+  statistics?: MetadataStatistics; // statistik per bildruta, saknas i äldre metadata
+  images?: ImageManifest; // tidsstämpel → bildruta med innehållshash i namnet, saknas i äldre metadata
   generated_at: string;
 }
 
@@ -48,17 +57,17 @@ const CurrentMagnitudeLayer = React.memo<CurrentMagnitudeLayerProps>(({
   const availableImages = useMemo(() => {
     if (!metadata?.timestamps) return [];
     
-    // Konvertera metadata timestamps till safe filenames
-    return metadata.timestamps.map(timestamp => 
-      timestamp.replaceAll(':', '-').replaceAll('+', 'plus')
-    );
-  }, [metadata?.timestamps]);
+    // Bild-URL per tidsstämpel (manifestets fingeravtrycksnamn, annars det gamla filnamnet)
+    return metadata.timestamps
+      .map(timestamp => frameImageUrl(IMAGE_DIRECTORY, IMAGE_PREFIX, timestamp, metadata.images))
+      .filter((url): url is string => url !== null);
+  }, [metadata?.timestamps, metadata?.images]);
 
   // 1) Ladda metadata FÖRST, sedan preload bilder i bakgrunden
   useEffect(() => {
     const loadMetadata = async () => {
       try {
-        const response = await fetch('/data/current-magnitude-images/metadata.json');
+        const response = await fetch(`${IMAGE_DIRECTORY}/metadata.json`);
         
         if (!response.ok) {
           // console.warn('⚠️ Current magnitude metadata inte tillgänglig än');
@@ -87,22 +96,21 @@ const CurrentMagnitudeLayer = React.memo<CurrentMagnitudeLayerProps>(({
       let loadedCount = 0;
       
       // Preload bilder gradvis för att inte blockera UI
-      for (const safeTimestamp of availableImages) {
+      for (const imageUrl of availableImages) {
         const img = new Image();
-        const imageUrl = `/data/current-magnitude-images/current_magnitude_${safeTimestamp}.png`;
         
         img.onload = () => {
-          imageMap.set(safeTimestamp, img);
+          imageMap.set(imageUrl, img);
           loadedCount++;
           if (loadedCount % 10 === 0) {
             // console.log(`✅ Preloaded ${loadedCount}/${availableImages.length} bilder`);
           }
           // Update preloaded images incrementally
-          setPreloadedImages(prev => new Map([...prev, [safeTimestamp, img]]));
+          setPreloadedImages(prev => new Map([...prev, [imageUrl, img]]));
         };
         
         img.onerror = () => {
-          // console.log(`⚠️ Kunde inte preload: ${safeTimestamp}`);
+          // console.log(`⚠️ Kunde inte preload: ${imageUrl}`);
         };
         
         img.src = imageUrl;
@@ -134,15 +142,13 @@ const CurrentMagnitudeLayer = React.memo<CurrentMagnitudeLayerProps>(({
     const now = new Date().toISOString().slice(0, 13);
     const initialTimestamp = metadata.timestamps.find(ts => ts.startsWith(now)) || metadata.timestamps[0];
     
-    if (initialTimestamp) {
-      const safeTimestamp = initialTimestamp.replaceAll(':', '-').replaceAll('+', 'plus');
-      const imageUrl = `/data/current-magnitude-images/current_magnitude_${safeTimestamp}.png`;
-      
-      // console.log('🎯 Laddar initial magnitude bild:', safeTimestamp);
+    const imageUrl = initialTimestamp ? frameImageUrl(IMAGE_DIRECTORY, IMAGE_PREFIX, initialTimestamp, metadata.images) : null;
+    if (imageUrl) {
+      // console.log('🎯 Laddar initial magnitude bild:', imageUrl);
       setCurrentImageUrl(imageUrl);
       
       // Ladda bilden direkt även om den inte är preloaded
-      const preloadedImg = preloadedImages.get(safeTimestamp);
+      const preloadedImg = preloadedImages.get(imageUrl);
       if (preloadedImg) {
         setImageLoaded(true);
       } else {
@@ -158,7 +164,7 @@ const CurrentMagnitudeLayer = React.memo<CurrentMagnitudeLayerProps>(({
         img.src = imageUrl;
       }
     }
-  }, [metadata?.timestamps, currentImageUrl, preloadedImages]);
+  }, [metadata?.timestamps, metadata?.images, currentImageUrl, preloadedImages]);
 
   // 3) Hitta rätt bild för nuvarande tidsstämpel
   const findImageForTimestamp = useCallback((prefix: string) => {
@@ -173,17 +179,12 @@ const CurrentMagnitudeLayer = React.memo<CurrentMagnitudeLayerProps>(({
       return null; // Tyst fail - inga warnings
     }
     
-    // Kolla om bilden faktiskt finns
-    const safeTimestamp = matchingTimestamp.replaceAll(':', '-').replaceAll('+', 'plus');
-    const isAvailable = availableImages.includes(safeTimestamp);
-    
-    if (!isAvailable) {
+    // URL för bilden - och kolla att den faktiskt finns
+    const imageUrl = frameImageUrl(IMAGE_DIRECTORY, IMAGE_PREFIX, matchingTimestamp, metadata.images);
+    if (!imageUrl || !availableImages.includes(imageUrl)) {
       return null; // Tyst fail för bilder som inte finns
     }
     
-    // Skapa URL för bilden baserat på tidsstämpel
-    const imageUrl = `/data/current-magnitude-images/current_magnitude_${safeTimestamp}.png`;
-    
     return imageUrl;
   }, [metadata, availableImages]);
 
@@ -197,11 +198,8 @@ const CurrentMagnitudeLayer = React.memo<CurrentMagnitudeLayerProps>(({
       setCurrentImageUrl(imageUrl);
       
       if (imageUrl) {
-        // Extrahera filename från URL för att matcha preloadad bild
-        const filename = imageUrl.split('/').pop();
-        const safeTimestamp = filename?.replace('current_magnitude_', '').replace('.png', '');
-        
-        const preloadedImg = preloadedImages.get(safeTimestamp || '');
+        // Preloadade bilder ligger under sin URL
+        const preloadedImg = preloadedImages.get(imageUrl);
         
         if (preloadedImg) {
           setImageLoaded(true); // INSTANT - bilden är redan laddad!
@@ -216,7 +214,7 @@ const CurrentMagnitudeLayer = React.memo<CurrentMagnitudeLayerProps>(({
             }
           };
           img.onerror = () => {
-            // console.log('❌ Kunde inte ladda magnitude bild:', safeTimestamp);
+            // console.log('❌ Kunde inte ladda magnitude bild:', imageUrl);
           };
           img.src = imageUrl;
         }
@@ -234,8 +232,8 @@ const CurrentMagnitudeLayer = React.memo<CurrentMagnitudeLayerProps>(({
     
     const [lon_min, lon_max, lat_min, lat_max] = metadata.bbox;
     
-    // Använd regionspecifik offset baserat på bbox
-    const offset = getLayerOffsetForBbox(lon_min, lon_max, lat_min, lat_max);
+    // Mercator-bilder passar exakt; äldre bilder får regionspecifik offset baserat på bbox
+    const offset = getImageLayerOffset(metadata.bbox, metadata.projection);
     const { lat_offset, lon_offset } = offset;
     
     return {
@@ -6,7 +6,13 @@ import { Source, Layer } from 'react-map-gl/maplibre';
 import React from 'react';
 import { useTimeSlider } from '../context/TimeSliderContext';
 import { useHeavyThrottle, useDraggingDetection } from '../../lib/throttleHooks';
-import { getLayerOffsetForBbox } from '../../lib/layerOffsets';
+import { getImageLayerOffset } from '../../lib/layerOffsets';
+import type { MetadataStatistics } from '../../lib/frameStatistics';
+import { frameImageUrl, type ImageManifest } from '../../lib/imageManifest';
+
+// Bildkatalog och (äldre metadata utan manifest) filnamnsprefix
+const IMAGE_DIRECTORY = '/data/temperature-images';
+const IMAGE_PREFIX = 'temperature';
 
 interface TemperatureMetadata {
   bbox: [number, number, number, number]; // [lon_min, lon_max, lat_min, lat_max]
@@ -14,6 +20,9 @@ interface TemperatureMetadata {
   timestamps: string[];
   colormap: Array<[number, string]>;
   resolution: number;
+  projection?: string; // 'EPSG:3857' för Web Mercator-bilder, saknas i äldre metadata
+  statistics?: MetadataStatistics; // statistik per bildruta, saknas i äldre metadata
+  images?: ImageManifest; // tidsstämpel → bildruta med innehållshash i namnet, saknas i äldre metadata
   generated_at: string;
 }
 
@@ -46,17 +55,17 @@ const TemperatureLayer = React.memo<TemperatureLayerProps>(({
   const availableImages = useMemo(() => {
     if (!metadata?.timestamps) return [];
     
-    // Konvertera metadata timestamps till safe filenames
-    return metadata.timestamps.map(timestamp => 
-      timestamp.replaceAll(':', '-').replaceAll('+', 'plus')
-    );
-  }, [metadata?.timestamps]);
+    // Bild-URL per tidsstämpel (manifestets fingeravtrycksnamn, annars det gamla filnamnet)
+    return metadata.timestamps
+      .map(timestamp => frameImageUrl(IMAGE_DIRECTORY, IMAGE_PREFIX, timestamp, metadata.images))
+      .filter((url): url is string => url !== null);
+  }, [metadata?.timestamps, metadata?.images]);
 
   // Load metadata - samma som CurrentMagnitudeLayer
   useEffect(() => {
     const loadMetadata = async () => {
       try {
-        const response = await fetch('/data/temperature-images/metadata.json');
+        const response = await fetch(`${IMAGE_DIRECTORY}/metadata.json`);
         
         if (!response.ok) {
           return;
@@ -82,15 +91,14 @@ const TemperatureLayer = React.memo<TemperatureLayerProps>(({
       let loadedCount = 0;
       
       // Preload ALLA bilder gradvis för att inte blockera UI
-      for (const safeTimestamp of availableImages) {
+      for (const imageUrl of availableImages) {
         const img = new Image();
-        const imageUrl = `/data/temperature-images/temperature_${safeTimestamp}.png`;
         
         img.onload = () => {
-          imageMap.set(safeTimestamp, img);
+          imageMap.set(imageUrl, img);
           loadedCount++;
           // Update preloaded images incrementally
-          setPreloadedImages(prev => new Map([...prev, [safeTimestamp, img]]));
+          setPreloadedImages(prev => new Map([...prev, [imageUrl, img]]));
         };
         
         img.onerror = () => {
@@ -124,14 +132,12 @@ const TemperatureLayer = React.memo<TemperatureLayerProps>(({
     const now = new Date().toISOString().slice(0, 13);
     const initialTimestamp = metadata.timestamps.find(ts => ts.startsWith(now)) || metadata.timestamps[0];
     
-    if (initialTimestamp) {
-      const safeTimestamp = initialTimestamp.replaceAll(':', '-').replaceAll('+', 'plus');
-      const imageUrl = `/data/temperature-images/temperature_${safeTimestamp}.png`;
-      
+    const imageUrl = initialTimestamp ? frameImageUrl(IMAGE_DIRECTORY, IMAGE_PREFIX, initialTimestamp, metadata.images) : null;
+    if (imageUrl) {
       setCurrentImageUrl(imageUrl);
       
       // Ladda bilden direkt även om den inte är preloaded
-      const preloadedImg = preloadedImages.get(safeTimestamp);
+      const preloadedImg = preloadedImages.get(imageUrl);
       if (preloadedImg) {
         setImageLoaded(true);
       } else {
@@ -146,7 +152,7 @@ const TemperatureLayer = React.memo<TemperatureLayerProps>(({
         img.src = imageUrl;
       }
     }
-  }, [metadata?.timestamps, currentImageUrl, preloadedImages]);
+  }, [metadata?.timestamps, metadata?.images, currentImageUrl, preloadedImages]);
 
   // Hitta rätt bild för nuvarande tidsstämpel - samma som CurrentMagnitudeLayer
   const findImageForTimestamp = useCallback((prefix: string) => {
@@ -161,17 +167,12 @@ const TemperatureLayer = React.memo<TemperatureLayerProps>(({
       return null; // Tyst fail - inga warnings
     }
     
-    // Kolla om bilden faktiskt finns
-    const safeTimestamp = matchingTimestamp.replaceAll(':', '-').replaceAll('+', 'plus');
-    const isAvailable = availableImages.includes(safeTimestamp);
-    
-    if (!isAvailable) {
+    // URL för bilden - och kolla att den faktiskt finns
+    const imageUrl = frameImageUrl(IMAGE_DIRECTORY, IMAGE_PREFIX, matchingTimestamp, metadata.images);
+    if (!imageUrl || !availableImages.includes(imageUrl)) {
       return null; // Tyst fail för bilder som inte finns
     }
     
-    // Skapa URL för bilden baserat på tidsstämpel
-    const imageUrl = `/data/temperature-images/temperature_${safeTimestamp}.png`;
-    
     return imageUrl;
   }, [metadata, availableImages]);
 
@@ -185,11 +186,8 @@ const TemperatureLayer = React.memo<TemperatureLayerProps>(({
       setCurrentImageUrl(imageUrl);
       
       if (imageUrl) {
-        // Extrahera filename från URL för att matcha preloadad bild
-        const filename = imageUrl.split('/').pop();
-        const safeTimestamp = filename?.replace('temperature_', '').replace('.png', '');
-        
-        const preloadedImg = preloadedImages.get(safeTimestamp || '');
+        // Preloadade bilder ligger under sin URL
+        const preloadedImg = preloadedImages.get(imageUrl);
         
         if (preloadedImg) {
           setImageLoaded(true); // INSTANT - bilden är redan laddad!
@@ -222,8 +220,8 @@ const TemperatureLayer = React.memo<TemperatureLayerProps>(({
     
     const [lon_min, lon_max, lat_min, lat_max] = metadata.bbox;
     
-    // Använd regionspecifik offset baserat på bbox
-    const offset = getLayerOffsetForBbox(lon_min, lon_max, lat_min, lat_max);
+    // Mercator-bilder passar exakt; äldre bilder får regionspecifik offset baserat på bbox
+    const offset = getImageLayerOffset(metadata.bbox, metadata.projection);
     const { lat_offset, lon_offset } = offset;   
     
     return {
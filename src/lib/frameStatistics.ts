@@ -0,0 +1,27 @@
+// Statistik per bildruta som bildgeneratorerna skriver till metadata.json
+// (se scripts/frame_statistics.py). Saknas i metadata från äldre körningar.
+
+export interface FrameStatistics {
+  min?: number;
+  max?: number;
+  mean?: number;
+  p5?: number;
+  p95?: number;
+  water_pixels: number;
+  filled_share: number | null; // andel vattenpixlar fyllda av fallback (nearest/Laplace)
+  histogram: number[]; // antal pixlar per fack över histogram_range
+}
+
+export interface MetadataStatistics {
+  histogram_range: [number, number];
+  histogram_bins: number;
+  summary: {
+    min: number;
+    max: number;
+    p5: number;
+    p95: number;
+    mean: number;
+    histogram: number[];
+  } | null;
+  frames: Record<string, FrameStatistics>; // tidsstämpel → statistik
+}
@@ -0,0 +1,27 @@
+// Bildmanifest som bildgeneratorerna skriver till metadata.json (se scripts/image_manifest.py).
+// Filnamnen innehåller innehållets hash, så bildrutorna kan cachas som immutable och
+// bara ändrade bildrutor laddas ner igen. Saknas i metadata från äldre körningar.
+
+export interface ImageManifestEntry {
+  file: string; // filnamn med innehållshash, relativt bildkatalogen
+  bytes: number;
+  sha1: string;
+}
+
+export type ImageManifest = Record<string, ImageManifestEntry>; // tidsstämpel → bildruta
+
+// URL för en tidsstämpels bildruta. Med manifest används fingeravtrycksnamnet (null om
+// bildrutan saknas); utan manifest det gamla namnet <prefix>_<säker tidsstämpel>.png
+export function frameImageUrl(
+  directory: string,
+  prefix: string,
+  timestamp: string,
+  images?: ImageManifest
+): string | null {
+  if (images) {
+    const entry = images[timestamp];
+    return entry ? `${directory}/${entry.file}` : null;
+  }
+  const safeTimestamp = timestamp.replaceAll(':', '-').replaceAll('+', 'plus');
+  return `${directory}/${prefix}_${safeTimestamp}.png`;
+}
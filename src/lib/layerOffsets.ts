@@ -215,6 +215,22 @@ export function getLayerOffsetForBbox(
   return getLayerOffset(centerLon, centerLat);
 }
 
+/**
+ * Offset för en förrenderad bild utifrån dess metadata.
+ * Bilder i Web Mercator (EPSG:3857) passar kartan exakt och behöver ingen offset;
+ * äldre bilder som är likformiga i latitud använder de handjusterade regionvärdena.
+ */
+export function getImageLayerOffset(
+  bbox: [number, number, number, number],
+  projection?: string
+): LayerOffset {
+  if (projection === 'EPSG:3857') {
+    return { lat_offset: 0, lon_offset: 0, region: 'EPSG:3857' };
+  }
+  const [lon_min, lon_max, lat_min, lat_max] = bbox;
+  return getLayerOffsetForBbox(lon_min, lon_max, lat_min, lat_max);
+}
+
 /**
  * Debug-funktion för att lista alla definierade regioner
  */